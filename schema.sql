@@ -159,11 +159,187 @@ CREATE TABLE IF NOT EXISTS play_by_play (
     coord_x REAL,
     coord_y REAL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Pitcher's throwing hand for this plate appearance (matchup.pitchHand); last so
+    -- databases that gain it through compact_play_by_play.ensure_play_columns match
+    pitch_hand TEXT,
     FOREIGN KEY (game_id) REFERENCES games(game_id),
     FOREIGN KEY (batter_id) REFERENCES players(player_id),
     FOREIGN KEY (pitcher_id) REFERENCES players(player_id)
 );
 
+-- Batted ball classification (see scripts/classify_batted_balls.py)
+-- One row per play_by_play.id with hit coordinates; no foreign key since play_by_play may be a view
+CREATE TABLE IF NOT EXISTS batted_ball_classes (
+    play_row_id INTEGER PRIMARY KEY,  -- play_by_play.id
+    game_id INTEGER NOT NULL,
+    spray_angle REAL,  -- degrees from center field, negative toward left
+    distance REAL,  -- feet from home plate to the hit coordinates
+    is_foul INTEGER NOT NULL,
+    is_out INTEGER,  -- NULL for event types the rules don't know
+    hit_type TEXT,  -- single, double, triple, home_run or NULL
+    clears_fence INTEGER NOT NULL  -- fair and beyond the fence of the game's park
+);
+
+-- Splits cube (see scripts/splits_cube.py): summed plate appearance outcomes per
+-- batter x season x pitcher hand x final count x starting base-out state x inning group
+CREATE TABLE IF NOT EXISTS splits_cube (
+    batter_id INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    pitch_hand TEXT NOT NULL,  -- L, R or '' if unknown
+    balls INTEGER NOT NULL,
+    strikes INTEGER NOT NULL,
+    base_state INTEGER NOT NULL,  -- runners at the start: 1B=1, 2B=2, 3B=4
+    outs INTEGER NOT NULL,  -- outs at the start
+    inning_group INTEGER NOT NULL,  -- 1: 1-3, 2: 4-6, 3: 7-9, 4: extras
+    plate_appearances INTEGER NOT NULL DEFAULT 0,
+    at_bats INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    doubles INTEGER NOT NULL DEFAULT 0,
+    triples INTEGER NOT NULL DEFAULT 0,
+    home_runs INTEGER NOT NULL DEFAULT 0,
+    walks INTEGER NOT NULL DEFAULT 0,
+    strikeouts INTEGER NOT NULL DEFAULT 0,
+    hit_by_pitch INTEGER NOT NULL DEFAULT 0,
+    sacrifice_hits INTEGER NOT NULL DEFAULT 0,
+    sacrifice_flies INTEGER NOT NULL DEFAULT 0,
+    batted_balls INTEGER NOT NULL DEFAULT 0,
+    launch_speed_sum REAL NOT NULL DEFAULT 0,
+    launch_angle_sum REAL NOT NULL DEFAULT 0,
+    hard_hit INTEGER NOT NULL DEFAULT 0,  -- launch speed >= 95 mph
+    PRIMARY KEY (batter_id, season, pitch_hand, balls, strikes, base_state, outs, inning_group)
+) WITHOUT ROWID;
+
+-- Games whose plays are summed into splits_cube
+CREATE TABLE IF NOT EXISTS splits_games (
+    game_id INTEGER PRIMARY KEY
+);
+
+-- Run expectancy (see scripts/run_expectancy.py): start/end base-out state and runs for
+-- every play_by_play row, and the per-season matrix averaged over them
+CREATE TABLE IF NOT EXISTS play_run_values (
+    play_row_id INTEGER PRIMARY KEY,  -- play_by_play.id
+    game_id INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    batter_id INTEGER,
+    pitcher_id INTEGER,
+    is_pa INTEGER NOT NULL,  -- 0 for stolen bases, pickoffs and other non-PA plays
+    base_state INTEGER NOT NULL,  -- runners at the start: 1B=1, 2B=2, 3B=4
+    outs INTEGER NOT NULL,
+    end_base_state INTEGER NOT NULL,
+    end_outs INTEGER NOT NULL,
+    runs INTEGER NOT NULL,  -- runs scored on the play
+    runs_to_end INTEGER,  -- runs from this play to the end of the half inning; NULL if it didn't reach 3 outs
+    run_value REAL  -- RE(end) - RE(start) + runs
+);
+
+CREATE TABLE IF NOT EXISTS run_expectancy (
+    season INTEGER NOT NULL,
+    base_state INTEGER NOT NULL,
+    outs INTEGER NOT NULL,
+    occurrences INTEGER NOT NULL,  -- plate appearances starting in this state
+    runs_to_end INTEGER NOT NULL,
+    run_expectancy REAL NOT NULL,  -- runs_to_end / occurrences
+    PRIMARY KEY (season, base_state, outs)
+) WITHOUT ROWID;
+
+-- Expected outcome per batted ball (see scripts/x_outcome.py)
+CREATE TABLE IF NOT EXISTS x_outcome (
+    play_row_id INTEGER PRIMARY KEY,  -- play_by_play.id
+    game_id INTEGER NOT NULL,
+    model_version INTEGER NOT NULL,  -- data/models/x_outcome_v<N>.pkl; 0 = lookup grid
+    p_out REAL NOT NULL,  -- outs, errors and fielder's choices
+    p_single REAL NOT NULL,
+    p_double REAL NOT NULL,
+    p_triple REAL NOT NULL,
+    p_home_run REAL NOT NULL,
+    xba REAL NOT NULL,  -- P(hit)
+    xslg REAL NOT NULL  -- expected bases
+);
+
+-- Batted balls allowed per pitcher and season (see scripts/pitcher_summary.py)
+CREATE TABLE IF NOT EXISTS pitcher_batted_balls (
+    pitcher_id INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    batted_balls INTEGER NOT NULL DEFAULT 0,
+    with_coords INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    singles INTEGER NOT NULL DEFAULT 0,
+    doubles INTEGER NOT NULL DEFAULT 0,
+    triples INTEGER NOT NULL DEFAULT 0,
+    home_runs INTEGER NOT NULL DEFAULT 0,
+    ground_balls INTEGER NOT NULL DEFAULT 0,
+    line_drives INTEGER NOT NULL DEFAULT 0,
+    fly_balls INTEGER NOT NULL DEFAULT 0,
+    popups INTEGER NOT NULL DEFAULT 0,
+    hard_hit INTEGER NOT NULL DEFAULT 0,  -- launch speed >= 95 mph
+    launch_count INTEGER NOT NULL DEFAULT 0,
+    launch_speed_sum REAL NOT NULL DEFAULT 0,
+    launch_angle_sum REAL NOT NULL DEFAULT 0,
+    distance_count INTEGER NOT NULL DEFAULT 0,
+    distance_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (pitcher_id, season)
+) WITHOUT ROWID;
+
+-- Games whose plays are summed into pitcher_batted_balls
+CREATE TABLE IF NOT EXISTS pitcher_summary_games (
+    game_id INTEGER PRIMARY KEY
+);
+
+-- Per-game data quality audit (see scripts/audit_games.py)
+CREATE TABLE IF NOT EXISTS game_audit (
+    game_id INTEGER PRIMARY KEY,
+    has_boxscore INTEGER NOT NULL,  -- batting and pitching rows present
+    batting_rows INTEGER NOT NULL,
+    pitching_rows INTEGER NOT NULL,
+    pbp_rows INTEGER NOT NULL,
+    rows_missing_coords INTEGER NOT NULL,  -- balls in play without hit coordinates
+    duplicate_pbp_rows INTEGER NOT NULL,  -- rows beyond one per at_bat_index
+    player_refs_missing INTEGER NOT NULL,  -- distinct player ids not in players
+    audited_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-season totals over games and game_audit, refreshed by the write path
+CREATE TABLE IF NOT EXISTS season_counters (
+    season INTEGER PRIMARY KEY,
+    games INTEGER NOT NULL DEFAULT 0,
+    completed_games INTEGER NOT NULL DEFAULT 0,
+    audited_games INTEGER NOT NULL DEFAULT 0,
+    games_with_boxscore INTEGER NOT NULL DEFAULT 0,
+    completed_with_boxscore INTEGER NOT NULL DEFAULT 0,
+    games_with_pbp INTEGER NOT NULL DEFAULT 0,
+    batting_rows INTEGER NOT NULL DEFAULT 0,
+    pitching_rows INTEGER NOT NULL DEFAULT 0,
+    pbp_rows INTEGER NOT NULL DEFAULT 0,
+    rows_missing_coords INTEGER NOT NULL DEFAULT 0,
+    duplicate_pbp_rows INTEGER NOT NULL DEFAULT 0,
+    games_missing_players INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Highest id of each fact table covered by the last audit run
+CREATE TABLE IF NOT EXISTS audit_watermark (
+    table_name TEXT PRIMARY KEY,
+    max_id INTEGER NOT NULL
+);
+
+-- Change counters per player, team, season and 'all' (key 0), bumped by every
+-- write of a game; cached query results are reused only while these are unchanged
+-- (see scripts/result_cache.py)
+CREATE TABLE IF NOT EXISTS data_versions (
+    scope TEXT NOT NULL,  -- player, team, season, all
+    key INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (scope, key)
+) WITHOUT ROWID;
+
+-- Games whose plays carry full base occupancy (game_feed.parse_plays keeps every
+-- runner on base through the half inning). Plays stored before that only list the
+-- runners who moved on each play, so base-out states are trusted only for games
+-- listed here (see scripts/splits_cube.py, scripts/run_expectancy.py)
+CREATE TABLE IF NOT EXISTS runner_state_games (
+    game_id INTEGER PRIMARY KEY
+);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_games_date ON games(game_date);
 CREATE INDEX IF NOT EXISTS idx_games_season ON games(season);
@@ -173,3 +349,13 @@ CREATE INDEX IF NOT EXISTS idx_batting_player ON box_scores_batting(player_id);
 CREATE INDEX IF NOT EXISTS idx_pitching_game ON box_scores_pitching(game_id);
 CREATE INDEX IF NOT EXISTS idx_pitching_player ON box_scores_pitching(player_id);
 CREATE INDEX IF NOT EXISTS idx_pbp_game ON play_by_play(game_id);
+CREATE INDEX IF NOT EXISTS idx_pbp_batter ON play_by_play(batter_id);
+CREATE INDEX IF NOT EXISTS idx_pbp_pitcher ON play_by_play(pitcher_id, batter_id);
+CREATE INDEX IF NOT EXISTS idx_bbc_foul_out ON batted_ball_classes(is_foul, is_out);
+CREATE INDEX IF NOT EXISTS idx_bbc_game ON batted_ball_classes(game_id);
+CREATE INDEX IF NOT EXISTS idx_bbc_hit_type ON batted_ball_classes(hit_type);
+CREATE INDEX IF NOT EXISTS idx_prv_game ON play_run_values(game_id);
+CREATE INDEX IF NOT EXISTS idx_prv_batter ON play_run_values(batter_id, season);
+CREATE INDEX IF NOT EXISTS idx_prv_pitcher ON play_run_values(pitcher_id, season);
+CREATE INDEX IF NOT EXISTS idx_prv_state ON play_run_values(season, base_state, outs);
+CREATE INDEX IF NOT EXISTS idx_xo_game ON x_outcome(game_id);
@@ -0,0 +1,413 @@
+"""
+Async Collector
+asyncio ingestion pipeline for a season: schedule -> live feed fetches -> parse -> one writer.
+
+Bounded queues connect the stages, so when the writer falls behind the fetchers
+wait instead of piling payloads up in memory:
+
+    games -> [fetchers x N] -> queue -> [parsers x M] -> queue -> [writer] -> SQLite
+
+- Fetches run on threads through the shared keep-alive http_session pool, which
+  is sized to --fetchers. The Stats API live feed holds the box score and the
+  play-by-play in one response, so each game is one request and concurrency comes
+  from fetching many games at once. --max-rps spaces request starts.
+- Parsers run on threads too, so the event loop keeps moving.
+- One writer task owns the SQLite connection, on its own thread. It writes each
+  game with game_feed.write_game, with up to --commit-every games per transaction.
+
+Ctrl-C stops handing out new games. Games already fetched are parsed, written
+and committed before exit. A second Ctrl-C cancels in-flight fetches. The writer
+still finishes or rolls back its current transaction, so every committed game is
+complete.
+
+get_all_games_stats.py --feed runs season collection through this pipeline.
+
+Usage:
+    python async_collector.py --season 2025 --fetchers 16
+    python async_collector.py --season 2025 --resume 777001
+    python async_collector.py --benchmark --games 300 --latency-ms 100   # against fake_stats_api
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import signal
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import batted_ball_store
+import game_feed
+import http_session
+import schedule_sync
+
+
+DB_PATH = "../data/mlb_data.db"
+SCHEMA_PATH = "../schema.sql"
+
+DEFAULT_FETCHERS = 8
+DEFAULT_PARSERS = 2
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_COMMIT_EVERY = 10
+DEFAULT_MAX_RPS = 10.0
+PROGRESS_EVERY = 50
+
+logger = logging.getLogger(__name__)
+
+# End-of-stage marker passed down the queues
+_DONE = object()
+
+
+def sync_schedule(db_path, season):
+    """Fetch the season schedule and upsert changed games; returns sync_games counts"""
+    rows = schedule_sync.schedule_rows(schedule_sync.fetch_season_schedule(season))
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    counts = schedule_sync.sync_games(conn, rows)
+    conn.close()
+    return counts
+
+
+def games_to_collect(conn, season, resume_from_game=None, refetch=False):
+    """
+    (game_pk, game_id, game_date) for completed regular season games, in date order.
+    Games that already have box scores are left out unless resuming or refetching,
+    same as collect_season_stats.
+    """
+    query = """
+        SELECT game_pk, game_id, game_date FROM games g
+        WHERE season = ?
+          AND status IN ('Final', 'Completed', 'Game Over')
+          AND game_type = 'R'
+    """
+    params = [season]
+    if resume_from_game:
+        query += " AND game_pk >= ?"
+        params.append(resume_from_game)
+    elif not refetch:
+        query += " AND NOT EXISTS (SELECT 1 FROM box_scores_batting b WHERE b.game_id = g.game_id)"
+    query += " ORDER BY game_date, game_pk"
+    return conn.execute(query, params).fetchall()
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/max_rps seconds apart (no limit when max_rps is 0)"""
+
+    def __init__(self, max_rps):
+        self.interval = 1.0 / max_rps if max_rps else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            now = loop.time()
+            delay = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Pipeline:
+    """One run of the fetch -> parse -> write pipeline over a list of games"""
+
+    def __init__(self, db_path, fetchers=DEFAULT_FETCHERS, parsers=DEFAULT_PARSERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, commit_every=DEFAULT_COMMIT_EVERY, max_rps=DEFAULT_MAX_RPS):
+        self.db_path = db_path
+        self.fetchers = fetchers
+        self.parsers = parsers
+        self.queue_size = queue_size
+        self.commit_every = commit_every
+        self.max_rps = max_rps
+        self.counts = {'fetched': 0, 'parsed': 0, 'written': 0, 'no_data': 0, 'errors': 0,
+                       'plays': 0, 'stats': 0, 'not_started': 0}
+        self.total = 0
+        self.started = None
+        self.stopping = None
+        self.producer = None
+        self.fetch_tasks = []
+
+    async def run(self, games):
+        """Collect (game_pk, game_id, game_date) games; returns the counts dict"""
+        loop = asyncio.get_running_loop()
+        self.total = len(games)
+        self.started = time.perf_counter()
+        self.stopping = asyncio.Event()
+        self.limiter = RateLimiter(self.max_rps)
+        fetch_q = asyncio.Queue(self.queue_size)
+        parse_q = asyncio.Queue(self.queue_size)
+        write_q = asyncio.Queue(self.queue_size)
+        remaining = {'fetch': self.fetchers, 'parse': self.parsers}
+        self.fetch_pool = ThreadPoolExecutor(self.fetchers, thread_name_prefix='fetch')
+        self.parse_pool = ThreadPoolExecutor(self.parsers, thread_name_prefix='parse')
+        self.write_pool = ThreadPoolExecutor(1, thread_name_prefix='write')
+        handles_signal = self._install_signal_handler(loop)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                self.producer = tg.create_task(self.produce(games, fetch_q))
+                self.fetch_tasks = [
+                    tg.create_task(self.stage(fetch_q, parse_q, self.fetch, remaining, 'fetch', self.parsers))
+                    for _ in range(self.fetchers)
+                ]
+                for _ in range(self.parsers):
+                    tg.create_task(self.stage(parse_q, write_q, self.parse, remaining, 'parse', 1))
+                tg.create_task(self.write(write_q))
+        finally:
+            if handles_signal:
+                loop.remove_signal_handler(signal.SIGINT)
+            for pool in (self.fetch_pool, self.parse_pool, self.write_pool):
+                pool.shutdown(wait=False, cancel_futures=True)
+        return self.counts
+
+    def _install_signal_handler(self, loop):
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.interrupt)
+        except (NotImplementedError, RuntimeError):
+            return False  # Windows, or not the main thread
+        return True
+
+    def interrupt(self):
+        """First Ctrl-C drains the pipeline; the second also cancels fetches in flight"""
+        if not self.stopping.is_set():
+            logger.warning("Stopping: finishing games already fetched (Ctrl-C again to cancel fetches in flight)")
+            self.stopping.set()
+            return
+        logger.warning("Cancelling fetches in flight; committed games are kept")
+        for task in [self.producer] + self.fetch_tasks:
+            task.cancel()
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGINT)
+
+    async def produce(self, games, fetch_q):
+        for index, game in enumerate(games):
+            if self.stopping.is_set():
+                self.counts['not_started'] += len(games) - index
+                break
+            await fetch_q.put(game)
+        for _ in range(self.fetchers):
+            await fetch_q.put(_DONE)
+
+    async def stage(self, inbox, outbox, handle, remaining, name, next_workers):
+        """Run handle() on each inbox item; the last worker of the stage closes the next one"""
+        try:
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    break
+                result = await handle(item)
+                if result is not None:
+                    await outbox.put(result)
+        finally:
+            remaining[name] -= 1
+            if remaining[name] == 0:
+                for _ in range(next_workers):
+                    await outbox.put(_DONE)
+
+    async def fetch(self, game):
+        game_pk, game_id, game_date = game
+        if self.stopping.is_set():
+            self.counts['not_started'] += 1
+            return None
+        await self.limiter.wait()
+        loop = asyncio.get_running_loop()
+        try:
+            feed = await loop.run_in_executor(self.fetch_pool, game_feed.fetch_game_feed, game_pk)
+        except Exception as e:
+            logger.error(f"Error fetching live feed for game {game_pk}: {e}")
+            self.counts['errors'] += 1
+            return None
+        self.counts['fetched'] += 1
+        return game_pk, game_id, game_date, feed
+
+    async def parse(self, item):
+        game_pk, game_id, game_date, feed = item
+        loop = asyncio.get_running_loop()
+        try:
+            parsed = await loop.run_in_executor(self.parse_pool, game_feed.parse_feed, feed, game_id)
+        except Exception as e:
+            logger.error(f"Error parsing live feed for game {game_pk}: {e}")
+            self.counts['errors'] += 1
+            return None
+        if not parsed['batting'] and not parsed['plays']:
+            logger.warning(f"No box score or play-by-play data in feed for game {game_pk}")
+            self.counts['no_data'] += 1
+            return None
+        self.counts['parsed'] += 1
+        return game_pk, game_id, game_date, parsed
+
+    async def write(self, write_q):
+        """The only task that touches the database: batches parsed games into transactions"""
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(self.write_pool, self._connect)
+        try:
+            done = False
+            while not done:
+                item = await write_q.get()
+                if item is _DONE:
+                    break
+                batch = [item]
+                while len(batch) < self.commit_every and not write_q.empty():
+                    item = write_q.get_nowait()
+                    if item is _DONE:
+                        done = True
+                        break
+                    batch.append(item)
+                # shield: a cancelled writer still lets the transaction in progress finish
+                written, errors = await asyncio.shield(
+                    loop.run_in_executor(self.write_pool, self._write_batch, conn, batch))
+                for parsed in written:
+                    self.counts['written'] += 1
+                    self.counts['stats'] += len(parsed['batting']) + len(parsed['pitching'])
+                    self.counts['plays'] += len(parsed['plays'])
+                self.counts['errors'] += errors
+                self._progress(len(written))
+        finally:
+            await loop.run_in_executor(self.write_pool, conn.close)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30.0)
+
+    def _write_batch(self, conn, batch):
+        """Write a batch in one transaction; returns (parsed games written, errors)"""
+        try:
+            with conn:
+                cursor = conn.cursor()
+                for _, game_id, _, parsed in batch:
+                    game_feed.write_game(cursor, game_id, parsed)
+            return [parsed for _, _, _, parsed in batch], 0
+        except Exception:
+            pass
+        # Don't let one bad game lose the rest of the batch: write them one per transaction
+        written, errors = [], 0
+        for game_pk, game_id, _, parsed in batch:
+            try:
+                with conn:
+                    game_feed.write_game(conn.cursor(), game_id, parsed)
+            except Exception as e:
+                logger.error(f"Error writing game {game_pk}: {e}")
+                errors += 1
+                continue
+            written.append(parsed)
+        return written, errors
+
+    def _progress(self, batch_size):
+        written = self.counts['written']
+        if written // PROGRESS_EVERY == (written - batch_size) // PROGRESS_EVERY:
+            return
+        elapsed = time.perf_counter() - self.started
+        rate = written / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - written
+        logger.info(f"Progress: {written}/{self.total} games written ({rate:.1f} games/s, "
+                    f"ETA {remaining / rate / 60 if rate else 0:.1f} min), {self.counts['errors']} errors")
+
+    def summary_line(self):
+        elapsed = time.perf_counter() - self.started
+        c = self.counts
+        return (f"{c['written']:,} games written ({c['stats']:,} stats, {c['plays']:,} plays) in {elapsed:.1f}s "
+                f"= {c['written'] / elapsed if elapsed else 0:.1f} games/s; {c['no_data']} without data, "
+                f"{c['errors']} errors, {c['not_started']} not started")
+
+
+def collect_games(db_path, games, **options):
+    """Run the pipeline over (game_pk, game_id, game_date) games; returns the Pipeline (counts, summary_line)"""
+    pipeline = Pipeline(db_path, **options)
+    asyncio.run(pipeline.run(games))
+    return pipeline
+
+
+def collect_season(db_path, season, resume_from_game=None, refetch=False, limit=None, **options):
+    """Sync the schedule, then collect every completed game that still needs it"""
+    counts = sync_schedule(db_path, season)
+    logger.info(f"{season} schedule: {counts['inserted']} inserted, {counts['updated']} updated, "
+                f"{counts['unchanged']} unchanged")
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    games = games_to_collect(conn, season, resume_from_game, refetch)
+    conn.close()
+    if limit:
+        games = games[:limit]
+    logger.info(f"Found {len(games)} completed games to process")
+    return collect_games(db_path, games, **options)
+
+
+def benchmark(games, latency_ms, fetcher_counts, parsers, commit_every):
+    """Collect the same fake season at several fetcher counts and report games/s"""
+    from compact_play_by_play import apply_schema
+    from fake_stats_api import start_fake_api
+
+    season = 2025
+    games_per_day = 15
+    server, url = start_fake_api(latency_ms=latency_ms, games_per_day=games_per_day,
+                                 days=math.ceil(games / games_per_day))
+    http_session.configure(pool_size=max(fetcher_counts), base_url=url)
+    http_session.install_statsapi()
+    with open(SCHEMA_PATH) as f:
+        schema_sql = f.read()
+    print(f"{games} fake games, {latency_ms:.0f} ms API latency, {parsers} parser(s), commit every {commit_every}")
+    print(f"{'fetchers':>9}{'games/s':>10}{'plays/s':>10}{'seconds':>9}{'speedup':>9}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for fetchers in fetcher_counts:
+            db_path = os.path.join(tmp, f"bench_{fetchers}.db")
+            conn = sqlite3.connect(db_path)
+            apply_schema(conn, schema_sql)
+            conn.commit()
+            conn.close()
+            pipeline = collect_season(db_path, season, limit=games, fetchers=fetchers, parsers=parsers,
+                                      commit_every=commit_every, max_rps=0)
+            elapsed = time.perf_counter() - pipeline.started
+            rate = pipeline.counts['written'] / elapsed
+            baseline = baseline or rate
+            print(f"{fetchers:>9}{rate:>10.1f}{pipeline.counts['plays'] / elapsed:>10,.0f}{elapsed:>9.1f}"
+                  f"{rate / baseline:>8.1f}x")
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Collect a season with the asyncio fetch/parse/write pipeline')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--season', type=int, help='Season year (e.g., 2025)')
+    parser.add_argument('--resume', type=int, help='Resume from game_pk (re-collects games from there on)')
+    parser.add_argument('--refetch', action='store_true', help='Re-collect games that already have box scores')
+    parser.add_argument('--limit', type=int, help='Collect at most this many games')
+    parser.add_argument('--fetchers', type=int, default=DEFAULT_FETCHERS, help='Concurrent live feed requests')
+    parser.add_argument('--parsers', type=int, default=DEFAULT_PARSERS, help='Parse worker threads')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help='Capacity of each stage queue')
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY, help='Games per write transaction')
+    parser.add_argument('--max-rps', type=float, default=DEFAULT_MAX_RPS, help='Request starts per second (0 = no limit)')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='Write to the per-season database (data/mlb_<season>.db) instead of mlb_data.db')
+    parser.add_argument('--benchmark', action='store_true', help='Measure throughput against the local fake API')
+    parser.add_argument('--games', type=int, default=300, help='Games for --benchmark')
+    parser.add_argument('--latency-ms', type=float, default=100, help='Fake API latency for --benchmark')
+    parser.add_argument('--fetcher-counts', default='1,4,16', help='Comma-separated fetcher counts for --benchmark')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+        benchmark(args.games, args.latency_ms, [int(n) for n in args.fetcher_counts.split(',')],
+                  args.parsers, args.commit_every)
+        return
+    if not args.season:
+        parser.error('--season is required (or pass --benchmark)')
+
+    import season_db
+    from get_all_games_stats import setup_logging
+
+    os.makedirs('../logs', exist_ok=True)
+    setup_logging()
+    http_session.configure(pool_size=args.fetchers)
+    http_session.install_statsapi()
+    db_path = season_db.ensure_season_db(args.season) if args.partitioned else args.db
+    pipeline = collect_season(db_path, args.season, args.resume, args.refetch, args.limit,
+                              fetchers=args.fetchers, parsers=args.parsers, queue_size=args.queue_size,
+                              commit_every=args.commit_every, max_rps=args.max_rps)
+    logger.info(pipeline.summary_line())
+    logger.info(http_session.stats.summary_line())
+    batted_ball_store.refresh(db_path, logger.info)
+
+
+if __name__ == '__main__':
+    main()
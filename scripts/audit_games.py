@@ -0,0 +1,331 @@
+"""
+Data Quality Audit
+Keeps one completeness row per game in game_audit (box score rows, play-by-play rows,
+batted balls missing coordinates, duplicate plays, player ids missing from players),
+so status and gap reports read a small table instead of scanning the fact tables.
+
+Rows are computed with set-based SQL for a queue of games at a time:
+  - ingestion audits each game as it is written (game_feed.write_game, collect_game)
+  - update() audits every game with rows above the per-table id watermark in
+    audit_watermark, games not audited yet, and games still missing player refs
+  - --full re-audits everything
+
+Work lists come straight from game_audit in the formats the backfill scripts read.
+
+Usage:
+    python audit_games.py                                   # incremental update + summary
+    python audit_games.py --gaps                            # completed games with gaps
+    python audit_games.py --work-list boxscore --output ../data/missing_boxscore_game_ids.txt
+    python audit_games.py --work-list coords --output ../data/missing_batted_ball_coords.csv
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+
+from classify_batted_balls import IN_PLAY_EVENTS
+
+
+DB_PATH = "../data/mlb_data.db"
+
+COMPLETED_STATUSES = ('Final', 'Completed', 'Game Over')
+
+# Fact tables whose new rows (by id) mark a game for re-audit
+WATERMARK_TABLES = {
+    'box_scores_batting': 'id',
+    'box_scores_pitching': 'id',
+    'play_by_play': 'id',
+}
+
+# Per-season totals in season_counters, so status reads never scan games or the fact tables
+COUNTER_COLUMNS = [
+    'games', 'completed_games', 'audited_games', 'games_with_boxscore', 'completed_with_boxscore',
+    'games_with_pbp', 'batting_rows', 'pitching_rows', 'pbp_rows', 'rows_missing_coords',
+    'duplicate_pbp_rows', 'games_missing_players',
+]
+
+AUDIT_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS game_audit (
+        game_id INTEGER PRIMARY KEY,
+        has_boxscore INTEGER NOT NULL,
+        batting_rows INTEGER NOT NULL,
+        pitching_rows INTEGER NOT NULL,
+        pbp_rows INTEGER NOT NULL,
+        rows_missing_coords INTEGER NOT NULL,
+        duplicate_pbp_rows INTEGER NOT NULL,
+        player_refs_missing INTEGER NOT NULL,
+        audited_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS audit_watermark (
+        table_name TEXT PRIMARY KEY,
+        max_id INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS season_counters (
+        season INTEGER PRIMARY KEY,
+        {', '.join(f'{column} INTEGER NOT NULL DEFAULT 0' for column in COUNTER_COLUMNS)},
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE TEMP TABLE IF NOT EXISTS audit_queue (game_id INTEGER PRIMARY KEY)",
+    "CREATE TEMP TABLE IF NOT EXISTS counter_queue (season INTEGER PRIMARY KEY)",
+]
+
+_in_play = ', '.join(f"'{event}'" for event in sorted(IN_PLAY_EVENTS))
+_queued = "game_id IN (SELECT game_id FROM temp.audit_queue)"
+
+
+def _player_refs(games):
+    """(game_id, player_id) for every player a set of games references"""
+    return f"""
+        SELECT game_id, batter_id AS player_id FROM play_by_play WHERE {games}
+        UNION SELECT game_id, pitcher_id FROM play_by_play WHERE {games}
+        UNION SELECT game_id, player_id FROM box_scores_batting WHERE {games}
+        UNION SELECT game_id, player_id FROM box_scores_pitching WHERE {games}
+    """
+
+
+AUDIT_SQL = f"""
+    INSERT OR REPLACE INTO game_audit (
+        game_id, has_boxscore, batting_rows, pitching_rows, pbp_rows,
+        rows_missing_coords, duplicate_pbp_rows, player_refs_missing, audited_at
+    )
+    SELECT q.game_id,
+           COALESCE(b.n, 0) > 0 AND COALESCE(p.n, 0) > 0,
+           COALESCE(b.n, 0),
+           COALESCE(p.n, 0),
+           COALESCE(pbp.n, 0),
+           COALESCE(pbp.missing_coords, 0),
+           COALESCE(pbp.n - pbp.at_bats, 0),
+           COALESCE(refs.n, 0),
+           CURRENT_TIMESTAMP
+    FROM temp.audit_queue q
+    JOIN games g ON g.game_id = q.game_id
+    LEFT JOIN (
+        SELECT game_id, COUNT(*) AS n FROM box_scores_batting WHERE {_queued} GROUP BY game_id
+    ) b ON b.game_id = q.game_id
+    LEFT JOIN (
+        SELECT game_id, COUNT(*) AS n FROM box_scores_pitching WHERE {_queued} GROUP BY game_id
+    ) p ON p.game_id = q.game_id
+    LEFT JOIN (
+        SELECT game_id,
+               COUNT(*) AS n,
+               COUNT(DISTINCT at_bat_index) AS at_bats,
+               SUM(coord_x IS NULL AND event_type IN ({_in_play})) AS missing_coords
+        FROM play_by_play WHERE {_queued} GROUP BY game_id
+    ) pbp ON pbp.game_id = q.game_id
+    LEFT JOIN (
+        SELECT game_id, COUNT(DISTINCT player_id) AS n
+        FROM ({_player_refs(_queued)}) refs
+        WHERE player_id IS NOT NULL AND player_id NOT IN (SELECT player_id FROM players)
+        GROUP BY game_id
+    ) refs ON refs.game_id = q.game_id
+"""
+
+COUNTERS_SQL = f"""
+    INSERT OR REPLACE INTO season_counters (season, {', '.join(COUNTER_COLUMNS)}, updated_at)
+    SELECT g.season,
+           COUNT(*),
+           COALESCE(SUM(g.status IN {COMPLETED_STATUSES}), 0),
+           COUNT(a.game_id),
+           COALESCE(SUM(a.has_boxscore), 0),
+           COALESCE(SUM(g.status IN {COMPLETED_STATUSES} AND a.has_boxscore), 0),
+           COALESCE(SUM(a.pbp_rows > 0), 0),
+           COALESCE(SUM(a.batting_rows), 0),
+           COALESCE(SUM(a.pitching_rows), 0),
+           COALESCE(SUM(a.pbp_rows), 0),
+           COALESCE(SUM(a.rows_missing_coords), 0),
+           COALESCE(SUM(a.duplicate_pbp_rows), 0),
+           COALESCE(SUM(a.player_refs_missing > 0), 0),
+           CURRENT_TIMESTAMP
+    FROM games g
+    LEFT JOIN game_audit a ON a.game_id = g.game_id
+    WHERE g.season IN (SELECT season FROM temp.counter_queue)
+    GROUP BY g.season
+"""
+
+_gap_games = f"""
+    FROM game_audit a
+    JOIN games g ON g.game_id = a.game_id
+    WHERE g.status IN {COMPLETED_STATUSES} AND COALESCE(g.game_type, '') != 'S'
+"""
+
+# name -> (query, one value per line?)
+WORK_LISTS = {
+    'boxscore': (f"SELECT a.game_id {_gap_games} AND a.has_boxscore = 0 ORDER BY g.game_date, a.game_id", True),
+    'playbyplay': (f"SELECT a.game_id {_gap_games} AND a.pbp_rows = 0 ORDER BY g.game_date, a.game_id", True),
+    'duplicates': ("SELECT game_id FROM game_audit WHERE duplicate_pbp_rows > 0 ORDER BY game_id", True),
+    'players': (f"""
+        SELECT DISTINCT refs.player_id
+        FROM ({_player_refs('game_id IN (SELECT game_id FROM game_audit WHERE player_refs_missing > 0)')}) refs
+        WHERE refs.player_id IS NOT NULL AND refs.player_id NOT IN (SELECT player_id FROM players)
+        ORDER BY refs.player_id
+    """, True),
+    # Same layout as data/missing_batted_ball_coords.csv (recollect_missing_batted_ball_coords.py)
+    'coords': (f"""
+        SELECT game_id, at_bat_index, event_type, batter_id, pitcher_id, event_description
+        FROM play_by_play
+        WHERE game_id IN (SELECT game_id FROM game_audit WHERE rows_missing_coords > 0)
+          AND coord_x IS NULL AND event_type IN ({_in_play})
+        ORDER BY game_id, at_bat_index
+    """, False),
+}
+
+
+def ensure_schema(cursor):
+    """Create the audit tables if needed (plain statements, safe inside a transaction)"""
+    for statement in AUDIT_SCHEMA:
+        cursor.execute(statement)
+
+
+def _refresh_counter_queue(cursor):
+    cursor.execute(COUNTERS_SQL)
+    cursor.execute("DELETE FROM temp.counter_queue")
+
+
+def _audit_queue(cursor):
+    cursor.execute(AUDIT_SQL)
+    count = cursor.execute("SELECT COUNT(*) FROM temp.audit_queue").fetchone()[0]
+    cursor.execute("""
+        INSERT OR IGNORE INTO temp.counter_queue
+        SELECT DISTINCT season FROM games WHERE game_id IN (SELECT game_id FROM temp.audit_queue)
+    """)
+    cursor.execute("DELETE FROM temp.audit_queue")
+    _refresh_counter_queue(cursor)
+    return count
+
+
+def refresh_counters(cursor, seasons):
+    """Recompute season_counters rows for some seasons (after games are added or change status)"""
+    ensure_schema(cursor)
+    cursor.executemany("INSERT OR IGNORE INTO temp.counter_queue (season) VALUES (?)", [(s,) for s in seasons])
+    _refresh_counter_queue(cursor)
+
+
+def audit_game(cursor, game_id):
+    """Audit one game in the caller's transaction (used at ingest)"""
+    ensure_schema(cursor)
+    cursor.execute("INSERT OR IGNORE INTO temp.audit_queue (game_id) VALUES (?)", (game_id,))
+    return _audit_queue(cursor)
+
+
+def update(conn, full=False):
+    """Audit games changed since the last run (or all games with full); returns the number audited"""
+    cursor = conn.cursor()
+    with conn:
+        ensure_schema(cursor)
+        cursor.execute("DELETE FROM temp.audit_queue")
+        if full:
+            cursor.execute("INSERT INTO temp.audit_queue SELECT game_id FROM games")
+        else:
+            # Games never audited, and games that may have gained their missing players
+            cursor.execute("""
+                INSERT OR IGNORE INTO temp.audit_queue
+                SELECT game_id FROM games WHERE game_id NOT IN (SELECT game_id FROM game_audit)
+                UNION SELECT game_id FROM game_audit WHERE player_refs_missing > 0
+            """)
+        # Seasons without counters yet (e.g. the first run after upgrading)
+        cursor.execute("""
+            INSERT OR IGNORE INTO temp.counter_queue
+            SELECT DISTINCT season FROM games WHERE season NOT IN (SELECT season FROM season_counters)
+        """)
+        for table, id_column in WATERMARK_TABLES.items():
+            row = cursor.execute("SELECT max_id FROM audit_watermark WHERE table_name = ?", (table,)).fetchone()
+            watermark = row[0] if row else 0
+            max_id = cursor.execute(f"SELECT MAX({id_column}) FROM {table}").fetchone()[0] or 0
+            if not full and max_id > watermark:
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO temp.audit_queue
+                    SELECT DISTINCT game_id FROM {table} WHERE {id_column} > ?
+                """, (watermark,))
+            cursor.execute("INSERT OR REPLACE INTO audit_watermark (table_name, max_id) VALUES (?, ?)",
+                           (table, max_id))
+        return _audit_queue(cursor)
+
+
+def season_totals(conn):
+    """season_counters rows as dicts, newest season first"""
+    cursor = conn.execute(f"SELECT season, {', '.join(COUNTER_COLUMNS)}, updated_at FROM season_counters ORDER BY season DESC")
+    columns = [d[0] for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+
+def summary(conn):
+    """Totals over all seasons for status reports, read from season_counters"""
+    row = conn.execute(f"SELECT {', '.join(f'SUM({c})' for c in COUNTER_COLUMNS)} FROM season_counters").fetchone()
+    return {column: value or 0 for column, value in zip(COUNTER_COLUMNS, row)}
+
+
+def gaps(conn):
+    """Completed (non-spring) games with any gap, as (game_id, game_pk, game_date, audit columns...)"""
+    return conn.execute(f"""
+        SELECT a.game_id, g.game_pk, g.game_date, a.has_boxscore, a.pbp_rows,
+               a.rows_missing_coords, a.duplicate_pbp_rows, a.player_refs_missing
+        {_gap_games}
+          AND (a.has_boxscore = 0 OR a.pbp_rows = 0 OR a.rows_missing_coords > 0
+               OR a.duplicate_pbp_rows > 0 OR a.player_refs_missing > 0)
+        ORDER BY g.game_date, a.game_id
+    """).fetchall()
+
+
+def write_work_list(conn, name, output=None):
+    sql, single_column = WORK_LISTS[name]
+    rows = conn.execute(sql).fetchall()
+    f = open(output, 'w', newline='') if output else sys.stdout
+    try:
+        if single_column:
+            for (value,) in rows:
+                f.write(f"{value}\n")
+        else:
+            csv.writer(f, delimiter='|').writerows(rows)
+    finally:
+        if output:
+            f.close()
+    if output:
+        print(f"{len(rows):,} {name} entries written to {output}")
+    return len(rows)
+
+
+def print_summary(totals):
+    print(f"  Games audited: {totals['audited_games']:,}")
+    print(f"  Games with box scores: {totals['games_with_boxscore']:,}")
+    print(f"  Games with play-by-play: {totals['games_with_pbp']:,}")
+    print(f"  Batted balls missing coordinates: {totals['rows_missing_coords']:,}")
+    print(f"  Duplicate play-by-play rows: {totals['duplicate_pbp_rows']:,}")
+    print(f"  Games referencing unknown players: {totals['games_missing_players']:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain and report the per-game data quality audit')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--full', action='store_true', help='Re-audit every game')
+    parser.add_argument('--gaps', action='store_true', help='List completed games with gaps')
+    parser.add_argument('--work-list', choices=sorted(WORK_LISTS), help='Print a backfill work list')
+    parser.add_argument('--output', help='Write the work list to this file')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    t0 = time.perf_counter()
+    audited = update(conn, args.full)
+    if args.work_list:
+        write_work_list(conn, args.work_list, args.output)
+    elif args.gaps:
+        rows = gaps(conn)
+        print("game_id | game_pk | date | boxscore | pbp_rows | missing_coords | duplicates | missing_players")
+        for row in rows:
+            print(" | ".join(str(v) for v in row))
+        print(f"Total: {len(rows):,}")
+    else:
+        print(f"Audited {audited:,} games in {time.perf_counter() - t0:.2f}s")
+        print_summary(summary(conn))
+    conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
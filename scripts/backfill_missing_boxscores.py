@@ -2,6 +2,7 @@
 """
 Backfill script for games missing both box score batting and pitching data.
 Reads game_ids from missing_boxscore_game_ids.txt and runs get_all_games_stats.py for each.
+Generate the list with `audit_games.py --work-list boxscore --output ../data/missing_boxscore_game_ids.txt`.
 """
 game_ids = []
 import subprocess
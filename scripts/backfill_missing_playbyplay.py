@@ -3,6 +3,7 @@
 Backfill script for games missing play-by-play data.
 Reads game_ids from missing_playbyplay_game_ids.txt, looks up the season for each,
 and runs get_all_games_stats.py for each game_id/season pair.
+Generate the list with `audit_games.py --work-list playbyplay --output ../data/missing_playbyplay_game_ids.txt`.
 """
 import subprocess
 import time
@@ -4,6 +4,9 @@ Backfill players table from box_scores_batting and box_scores_pitching
 import sqlite3
 import statsapi
 
+import http_session
+import result_cache
+
 DB_PATH = 'data/mlb_data.db'
 
 def get_player_info(player_id):
@@ -23,6 +26,7 @@ def get_player_info(player_id):
         return None
 
 def main():
+    http_session.install_statsapi()
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     # Get all unique player_ids from box_scores_batting and box_scores_pitching
@@ -33,6 +37,7 @@ def main():
     all_ids = batting_ids | pitching_ids
     print(f"Found {len(all_ids)} unique player IDs to backfill.")
     inserted = 0
+    inserted_ids = []
     for player_id in all_ids:
         info = get_player_info(player_id)
         if info and info['full_name']:
@@ -49,7 +54,11 @@ def main():
                 info['bat_side'],
                 info['pitch_hand']
             ))
+            if cursor.rowcount:
+                inserted_ids.append(player_id)
             inserted += 1
+    # Queries that join players may have dropped these players' rows until now
+    result_cache.bump_keys(cursor, 'player', inserted_ids)
     conn.commit()
     conn.close()
     print(f"Inserted {inserted} player records into players table.")
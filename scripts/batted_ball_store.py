@@ -0,0 +1,450 @@
+"""
+Batted Ball Store
+A compact, memory-mapped copy of the batted balls spray charts read, so a chart
+query is a binary search and a slice instead of a SQLite join.
+
+Each batted ball with coordinates in play_by_play becomes one fixed-width record
+(ROW_DTYPE, 29 bytes): batter, pitcher, game date (yyyymmdd), event code,
+hit coordinates, launch speed and angle. Records are sorted by batter and date
+and saved with np.save next to the database (data/mlb_data_batted_balls/ for
+data/mlb_data.db). Two small index files go with them: each batter's first and
+last record, and the record numbers per pitcher in (pitcher, date) order.
+
+current_store() memory-maps the files read-only (reopened after a rebuild), so
+every process shares the same pages and only the slices a chart touches are read:
+
+    batter  -> searchsorted in the batter index -> date range by searchsorted
+               inside the batter's block -> a view of the mapped records
+
+update() is incremental per game day: it keeps a (batted balls, latest play id)
+signature for every day, and re-reads only the days whose signature changed
+(new games, re-collected games, backfilled coordinates). The collectors call it
+after a run when a store has been built. Files are written under a new
+generation and switched by rewriting meta.json, so readers never see a mix.
+
+Usage:
+    python batted_ball_store.py --build
+    python batted_ball_store.py --update
+    python batted_ball_store.py --info
+    python batted_ball_store.py --benchmark --queries 200
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+
+DB_PATH = "../data/mlb_data.db"
+# Parameters per IN (...) chunk when re-reading changed days
+DAY_CHUNK = 200
+
+# numpy is imported where it is used so --help exits without loading it; ROW_DTYPE
+# is the dtype spec, row_dtype() the numpy dtype.
+ROW_DTYPE = [
+    ('batter_id', '<i4'),
+    ('pitcher_id', '<i4'),
+    ('game_date', '<i4'),  # yyyymmdd
+    ('event', 'u1'),  # index into meta['events']
+    ('coord_x', '<f4'),
+    ('coord_y', '<f4'),
+    ('launch_speed', '<f4'),  # NaN when not measured
+    ('launch_angle', '<f4'),
+]
+BATTER_DTYPE = [('batter_id', '<i4'), ('start', '<i8'), ('stop', '<i8'), ('generation', '<i4')]
+PITCHER_DTYPE = [('pitcher_id', '<i4'), ('start', '<i8'), ('stop', '<i8')]
+
+DAY_SIGNATURES_SQL = """
+    SELECT substr(g.game_date, 1, 10), COUNT(*), MAX(pbp.id)
+    FROM play_by_play pbp
+    JOIN games g ON pbp.game_id = g.game_id
+    WHERE pbp.coord_x IS NOT NULL AND pbp.coord_y IS NOT NULL
+    GROUP BY substr(g.game_date, 1, 10)
+"""
+
+ROWS_SQL = """
+    SELECT COALESCE(pbp.batter_id, 0), COALESCE(pbp.pitcher_id, 0),
+           CAST(replace(substr(g.game_date, 1, 10), '-', '') AS INTEGER), pbp.event_type,
+           pbp.coord_x, pbp.coord_y, pbp.launch_speed, pbp.launch_angle
+    FROM play_by_play pbp
+    JOIN games g ON pbp.game_id = g.game_id
+    WHERE pbp.coord_x IS NOT NULL AND pbp.coord_y IS NOT NULL
+      AND substr(g.game_date, 1, 10) IN ({days})
+    ORDER BY pbp.id
+"""
+
+# Mapped store for this process: (meta path, mtime, Store)
+_store = None
+
+
+class Store:
+    """Memory-mapped records and their indexes for one generation"""
+
+    def __init__(self, path, meta, rows, batters, pitchers, pitcher_rows):
+        import numpy as np
+
+        self.path = path
+        self.meta = meta
+        self.generation = meta['generation']
+        self.rows = rows
+        self.batters = batters
+        self.pitchers = pitchers
+        self.pitcher_rows = pitcher_rows
+        self.events = np.array(meta['events'], dtype=object)
+
+    def batter_generation(self, batter_id):
+        """Generation that last changed this batter's records (0 if the batter has none)"""
+        import numpy as np
+
+        i = np.searchsorted(self.batters['batter_id'], batter_id)
+        if i < len(self.batters) and self.batters['batter_id'][i] == batter_id:
+            return int(self.batters['generation'][i])
+        return 0
+
+
+def row_dtype():
+    import numpy as np
+    return np.dtype(ROW_DTYPE)
+
+
+def store_dir(db_path=DB_PATH):
+    """Store directory for a database: data/mlb_data.db -> data/mlb_data_batted_balls/"""
+    base, _ = os.path.splitext(os.path.abspath(db_path))
+    return base + '_batted_balls'
+
+
+def date_key(date):
+    """'YYYY-MM-DD' -> yyyymmdd int"""
+    return int(date[:10].replace('-', ''))
+
+
+def date_strings(keys):
+    """yyyymmdd ints -> 'YYYY-MM-DD' strings (formats each distinct date once)"""
+    import numpy as np
+
+    unique, inverse = np.unique(keys, return_inverse=True)
+    labels = np.array([f"{k // 10000:04d}-{k // 100 % 100:02d}-{k % 100:02d}" for k in unique.tolist()], dtype=object)
+    return labels[inverse]
+
+
+def read_meta(path):
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _file(path, name, generation):
+    return os.path.join(path, f"{name}-{generation}.npy")
+
+
+def open_store(path):
+    """Memory-map the generation meta.json points at, or None if no store is built"""
+    import numpy as np
+
+    for _ in range(3):
+        meta = read_meta(path)
+        if meta is None:
+            return None
+        generation = meta['generation']
+        try:
+            return Store(path, meta,
+                         np.load(_file(path, 'rows', generation), mmap_mode='r'),
+                         np.load(_file(path, 'batters', generation)),
+                         np.load(_file(path, 'pitchers', generation)),
+                         np.load(_file(path, 'pitcher_rows', generation), mmap_mode='r'))
+        except FileNotFoundError:
+            # Replaced by a newer generation between reading meta.json and opening
+            continue
+    raise RuntimeError(f"Batted ball store at {path} keeps changing while opening")
+
+
+def current_store(db_path=DB_PATH):
+    """The store for a database memory-mapped read-only (reopened if rebuilt), or None if there is none"""
+    global _store
+    path = store_dir(db_path)
+    meta_path = os.path.join(path, 'meta.json')
+    try:
+        mtime = os.path.getmtime(meta_path)
+    except OSError:
+        return None
+    if _store is None or _store[:2] != (meta_path, mtime):
+        store = open_store(path)
+        if store is None:
+            return None
+        _store = (meta_path, mtime, store)
+    return _store[2]
+
+
+def select(store, player_id, start_date, end_date, pitcher_id=None):
+    """
+    Records for a batter, allowed by a pitcher (player_id None), or their matchup, in
+    a date range; every record in the range when both are None. A batter's records
+    are a view of the mapped file; the other cases gather a copy.
+    """
+    import numpy as np
+
+    rows = store.rows
+    lo, hi = date_key(start_date), date_key(end_date)
+    if player_id is not None:
+        index = store.batters
+        i = np.searchsorted(index['batter_id'], player_id)
+        if i == len(index) or index['batter_id'][i] != player_id:
+            return rows[:0]
+        block = rows[index['start'][i]:index['stop'][i]]
+        dates = block['game_date']
+        block = block[np.searchsorted(dates, lo, 'left'):np.searchsorted(dates, hi, 'right')]
+        if pitcher_id is not None:
+            block = block[block['pitcher_id'] == pitcher_id]
+        return block
+    if pitcher_id is not None:
+        index = store.pitchers
+        i = np.searchsorted(index['pitcher_id'], pitcher_id)
+        if i == len(index) or index['pitcher_id'][i] != pitcher_id:
+            return rows[:0]
+        order = store.pitcher_rows[index['start'][i]:index['stop'][i]]
+        dates = rows['game_date'][order]
+        return rows[order[np.searchsorted(dates, lo, 'left'):np.searchsorted(dates, hi, 'right')]]
+    dates = rows['game_date']
+    return rows[(dates >= lo) & (dates <= hi)]
+
+
+def to_frame(store, records):
+    """
+    DataFrame with the columns the charts read from query_batted_balls. The
+    numeric columns wrap the record fields without copying; event_type and
+    game_date are decoded to strings.
+    """
+    import pandas as pd
+
+    return pd.DataFrame({
+        'coord_x': records['coord_x'],
+        'coord_y': records['coord_y'],
+        'event_type': store.events[records['event']],
+        'game_date': date_strings(records['game_date']),
+        'launch_speed': records['launch_speed'],
+        'launch_angle': records['launch_angle'],
+    }, copy=False)
+
+
+def query_batted_balls(store, player_id, start_date, end_date, pitcher_id=None):
+    """spray_chart_by_player_and_date.query_batted_balls, answered from the store"""
+    return to_frame(store, select(store, player_id, start_date, end_date, pitcher_id))
+
+
+def day_signatures(conn):
+    """{game date: [batted balls with coordinates, latest play id]} from the database"""
+    return {day: [count, max_id] for day, count, max_id in conn.execute(DAY_SIGNATURES_SQL)}
+
+
+def read_days(conn, days, events):
+    """Records for the batted balls of these game days; new event types are appended to events"""
+    import numpy as np
+
+    codes = {event: i for i, event in enumerate(events)}
+    records = []
+    for i in range(0, len(days), DAY_CHUNK):
+        chunk = days[i:i + DAY_CHUNK]
+        sql = ROWS_SQL.format(days=','.join('?' * len(chunk)))
+        for batter_id, pitcher_id, game_date, event, x, y, speed, angle in conn.execute(sql, chunk):
+            code = codes.get(event)
+            if code is None:
+                code = codes[event] = len(events)
+                events.append(event)
+            records.append((batter_id, pitcher_id, game_date, code, x, y,
+                            float('nan') if speed is None else speed,
+                            float('nan') if angle is None else angle))
+    if len(events) > 256:
+        raise ValueError(f"{len(events)} event types do not fit the one-byte event code")
+    return np.array(records, dtype=row_dtype())
+
+
+def block_index(keys, dtype):
+    """(key, start, stop) of each run of equal keys in a sorted key array"""
+    import numpy as np
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+    index = np.zeros(len(starts), dtype=dtype)
+    index[dtype[0][0]] = keys[starts]
+    index['start'] = starts
+    index['stop'] = np.r_[starts[1:], len(keys)]
+    return index
+
+
+def _save(path, name, generation, array):
+    import numpy as np
+
+    tmp = os.path.join(path, f".{name}-{generation}.{os.getpid()}.tmp.npy")
+    np.save(tmp, array)
+    os.replace(tmp, _file(path, name, generation))
+
+
+def write_store(path, meta, rows, batters, pitchers, pitcher_rows):
+    """Save a new generation, switch meta.json to it, and remove all but the previous generation"""
+    os.makedirs(path, exist_ok=True)
+    generation = meta['generation']
+    _save(path, 'rows', generation, rows)
+    _save(path, 'batters', generation, batters)
+    _save(path, 'pitchers', generation, pitchers)
+    _save(path, 'pitcher_rows', generation, pitcher_rows)
+    tmp = os.path.join(path, f".meta.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(path, 'meta.json'))
+    # Readers that mapped the previous generation keep it; older ones go
+    for old in glob.glob(os.path.join(path, '*-*.npy')):
+        if int(os.path.basename(old).rsplit('-', 1)[1].split('.')[0]) < generation - 1:
+            os.remove(old)
+
+
+def update(conn, db_path=DB_PATH, rebuild=False):
+    """
+    Bring the store up to date with the database, re-reading only game days whose
+    batted balls changed (every day with rebuild, or when no store exists yet).
+    Returns the number of days re-read.
+    """
+    import numpy as np
+
+    path = store_dir(db_path)
+    old = open_store(path)
+    signatures = day_signatures(conn)
+    if old is None or rebuild:
+        # Generations keep counting up across rebuilds so cached versions never repeat
+        meta = {'generation': old.generation if old else 0, 'events': [], 'days': {}}
+        rows = np.zeros(0, dtype=row_dtype())
+        batters = np.zeros(0, dtype=BATTER_DTYPE)
+    else:
+        meta = {key: old.meta[key] for key in ('generation', 'events', 'days')}
+        rows, batters = old.rows, old.batters
+    stale = sorted(day for day in set(signatures) | set(meta['days']) if signatures.get(day) != meta['days'].get(day))
+    if not stale and not (rebuild or old is None):
+        return 0
+
+    generation = meta['generation'] + 1
+    stale_keys = np.array([date_key(day) for day in stale], dtype=np.int32)
+    drop = np.isin(rows['game_date'], stale_keys)
+    events = list(meta['events'])
+    new = read_days(conn, [day for day in stale if day in signatures], events)
+    touched = np.union1d(rows['batter_id'][drop], new['batter_id'])
+
+    rows = np.concatenate([rows[~drop], new])
+    rows = rows[np.lexsort((rows['game_date'], rows['batter_id']))]
+    new_batters = block_index(rows['batter_id'], BATTER_DTYPE)
+    # Batters whose records did not change keep their generation (chart caches stay valid)
+    previous = dict(zip(batters['batter_id'].tolist(), batters['generation'].tolist()))
+    touched_set = set(touched.tolist())
+    if len(new_batters):
+        new_batters['generation'] = [
+            generation if batter_id in touched_set else previous.get(batter_id, generation)
+            for batter_id in new_batters['batter_id'].tolist()
+        ]
+    pitcher_rows = np.lexsort((rows['game_date'], rows['pitcher_id'])).astype(np.int32 if len(rows) < 2**31 else np.int64)
+    pitchers = block_index(rows['pitcher_id'][pitcher_rows], PITCHER_DTYPE)
+
+    write_store(path, {
+        'generation': generation,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': int(len(rows)),
+        'batters': int(len(new_batters)),
+        'pitchers': int(len(pitchers)),
+        'events': events,
+        'days': {day: signatures[day] for day in sorted(signatures)},
+    }, rows, new_batters, pitchers, pitcher_rows)
+    return len(stale)
+
+
+def refresh(db_path, log=print):
+    """update() after a collection run, if a store has been built for this database"""
+    if read_meta(store_dir(db_path)) is None:
+        return
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        t0 = time.perf_counter()
+        days = update(conn, db_path)
+    finally:
+        conn.close()
+    if days:
+        log(f"Batted ball store: re-read {days} game days in {time.perf_counter() - t0:.1f}s")
+
+
+def benchmark(conn, db_path, queries):
+    """Time batter chart queries from SQLite against the store, for random batters and seasons"""
+    import random
+    import statistics
+
+    from spray_chart_by_player_and_date import query_batted_balls as sql_query_batted_balls
+
+    store = current_store(db_path)
+    if store is None:
+        print("No batted ball store; run --build first")
+        return
+    seasons = sorted({day[:4] for day in store.meta['days']})
+    batters = store.batters[(store.batters['stop'] - store.batters['start']) >= 10]['batter_id'].tolist()
+    if not batters:
+        print("No batters with 10+ batted balls in the store")
+        return
+    rng = random.Random(0)
+    cases = [(rng.choice(batters), rng.choice(seasons)) for _ in range(queries)]
+
+    def timed(func):
+        times, count = [], 0
+        for batter_id, season in cases:
+            t0 = time.perf_counter()
+            count += len(func(batter_id, f"{season}-01-01", f"{season}-12-31"))
+            times.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(times), max(times), count
+
+    print(f"{queries} batter-season queries, {len(store.rows):,} batted balls in the store")
+    print(f"{'source':<22}{'median ms':>11}{'max ms':>9}{'balls':>10}")
+    for name, func in [
+        ('SQLite', lambda *q: sql_query_batted_balls(conn, *q)),
+        ('store (DataFrame)', lambda *q: query_batted_balls(store, *q)),
+        ('store (records)', lambda *q: select(store, *q)),
+    ]:
+        median, worst, count = timed(func)
+        print(f"{name:<22}{median:>11.3f}{worst:>9.3f}{count:>10,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and update the memory-mapped batted ball store')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--build', action='store_true', help='Rebuild the store from every batted ball')
+    parser.add_argument('--update', action='store_true', help='Re-read game days that changed since the last update')
+    parser.add_argument('--info', action='store_true', help='Show what the store holds')
+    parser.add_argument('--benchmark', action='store_true', help='Time chart queries from SQLite and from the store')
+    parser.add_argument('--queries', type=int, default=200, help='Queries for --benchmark')
+    args = parser.parse_args()
+    if not (args.build or args.update or args.info or args.benchmark):
+        parser.error('pass --build, --update, --info or --benchmark')
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    if args.build or args.update:
+        t0 = time.perf_counter()
+        days = update(conn, args.db, rebuild=args.build)
+        print(f"Re-read {days} game days in {time.perf_counter() - t0:.1f}s")
+    if args.info or args.build or args.update:
+        meta = read_meta(store_dir(args.db))
+        if meta is None:
+            print("No batted ball store built yet")
+        else:
+            days = sorted(meta['days'])
+            span = f"{days[0]} to {days[-1]}" if days else "no days"
+            size = sum(os.path.getsize(f) for f in glob.glob(os.path.join(store_dir(args.db), f"*-{meta['generation']}.npy")))
+            print(f"{store_dir(args.db)}: generation {meta['generation']}, {meta['rows']:,} batted balls, "
+                  f"{meta['batters']:,} batters, {meta['pitchers']:,} pitchers, {span}, "
+                  f"{size / 1024 / 1024:.1f} MB")
+    if args.benchmark:
+        benchmark(conn, args.db, args.queries)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
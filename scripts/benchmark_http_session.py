@@ -0,0 +1,93 @@
+"""
+Benchmark the shared HTTP session against one-connection-per-request calls.
+Starts a local keep-alive test server (or uses --url) and reports connect vs transfer time.
+"""
+
+import argparse
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_session
+
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    """Serves a fixed JSON payload over HTTP/1.1 so connections can be kept alive"""
+
+    protocol_version = 'HTTP/1.1'
+    # Send headers and body in one segment so keep-alive isn't held up by delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    payload = b'{}'
+    payload_gz = gzip.compress(payload)
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        body = self.payload
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = self.payload_gz
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_test_server(payload_kb, latency_ms):
+    plays = [{'atBatIndex': i, 'result': {'eventType': 'field_out', 'description': 'x' * 80}}
+             for i in range(max(1, payload_kb * 1024 // 120))]
+    PayloadHandler.payload = json.dumps({'allPlays': plays}).encode()
+    PayloadHandler.payload_gz = gzip.compress(PayloadHandler.payload)
+    PayloadHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PayloadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def run(label, url, n, pooled=None):
+    """Time n GETs, through `pooled` if given, else through a new session per request"""
+    http_session.stats.reset()
+    start = time.perf_counter()
+    for _ in range(n):
+        session = pooled or http_session.TimedSession()
+        session.get(url).raise_for_status()
+        if session is not pooled:
+            session.close()
+    elapsed = time.perf_counter() - start
+    s = http_session.stats.summary()
+    print(f"{label:<22} {elapsed / n * 1000:8.2f} ms/req  connect {s['avg_connect_ms']:7.2f} ms  "
+          f"transfer {s['avg_transfer_ms']:7.2f} ms  new conns {s['new_connections']:>4}  "
+          f"bytes {s['bytes_received']:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pooled vs per-request HTTP connections')
+    parser.add_argument('--url', help='Benchmark against this URL instead of the local test server')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+    parser.add_argument('--payload-kb', type=int, default=64, help='Test server payload size')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Simulated server think time')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_test_server(args.payload_kb, args.latency_ms)
+    print(f"Benchmarking {args.requests} requests against {url}\n")
+
+    run('new connection each', url, args.requests)
+    run('shared pooled session', url, args.requests, pooled=http_session.configure(pool_size=1))
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
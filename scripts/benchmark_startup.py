@@ -0,0 +1,119 @@
+"""
+Benchmark CLI startup time.
+
+For each script this reports:
+  - import time of the module, from `python -X importtime -c "import <module>"`
+  - wall time of `<script> --help`, the cost of a run that never touches data
+  - the heaviest packages pulled in at import
+
+Use --csv to append the numbers to a history file so regressions show up over time.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 10 --csv logs/startup_times.csv
+"""
+
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TARGETS = [
+    'mlb',
+    'spray_chart_by_player_and_date',
+    'spray_chart_by_player_and_date_interactive',
+    'get_all_games_stats',
+    'spray_chart_server',
+]
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output into [(module, self_us, cumulative_us, depth)].
+    Lines look like "import time:       301 |     718218 |   numpy".
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_profile(module):
+    """(total import ms, heaviest top-level packages) for importing module in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    rows = parse_importtime(result.stderr)
+    end = max(i for i, (name, _, _, depth) in enumerate(rows) if name == module and depth == 0)
+    total_ms = rows[end][2] / 1000
+    # A module's line comes after everything it imported, so its imports are the rows
+    # between the previous top-level line (e.g. site and its children) and its own
+    start = max((i for i, row in enumerate(rows[:end]) if row[3] == 0), default=-1) + 1
+    direct = sorted(
+        ((name, cum / 1000) for name, _, cum, depth in rows[start:end] if depth == 1),
+        key=lambda item: item[1], reverse=True,
+    )
+    return total_ms, direct[:3]
+
+
+def help_time(module, runs):
+    """Median wall time in ms of `python <module>.py --help`"""
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, f'{module}.py', '--help'], cwd=SCRIPTS_DIR, capture_output=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times)
+
+
+def git_revision():
+    result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR, capture_output=True, text=True)
+    return result.stdout.strip() or 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CLI import and startup time')
+    parser.add_argument('--runs', type=int, default=5, help='--help runs per script (median is reported)')
+    parser.add_argument('--module', action='append', help='Module(s) to measure (default: the main CLIs)')
+    parser.add_argument('--csv', help='Append results to this CSV file')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'module':<45} {'import ms':>10} {'--help ms':>10}  heaviest imports")
+    for module in args.module or TARGETS:
+        import_ms, heaviest = import_profile(module)
+        help_ms = help_time(module, args.runs)
+        results.append((module, import_ms, help_ms))
+        top = ', '.join(f"{name} {ms:.0f}" for name, ms in heaviest)
+        print(f"{module:<45} {import_ms:>10.1f} {help_ms:>10.1f}  {top}")
+
+    if args.csv:
+        new_file = not os.path.exists(args.csv)
+        revision = git_revision()
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        with open(args.csv, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['timestamp', 'revision', 'python', 'module', 'import_ms', 'help_ms'])
+            for module, import_ms, help_ms in results:
+                writer.writerow([timestamp, revision, sys.version.split()[0], module,
+                                 f"{import_ms:.1f}", f"{help_ms:.1f}"])
+        print(f"Appended {len(results)} rows to {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
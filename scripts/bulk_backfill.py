@@ -0,0 +1,309 @@
+"""
+Bulk Backfill
+Multi-process parsing for large backfills once network wait is out of the way.
+
+With the payloads already on disk, collection is CPU-bound. Decoding each live
+feed (hundreds of KB) and walking its plays in Python runs on one core under the
+GIL. This splits the work:
+
+    archived feeds -> [parse processes x N] -> row tuples -> writer (main process) -> SQLite
+
+--download saves raw live feed payloads, gzipped and never decoded, to
+data/feeds/<season>/<game_pk>.json.gz using concurrent requests. --load parses
+the archived feeds in a process pool. Each worker reads, decompresses and decodes
+one payload (orjson when installed, else json), runs game_feed.parse_feed and
+sends back only the row tuples. The main process is the single writer: it writes
+each game with game_feed.write_game, --commit-every games per transaction (a batch
+that fails is retried one game per transaction, so one bad game only loses itself).
+
+Usage:
+    python bulk_backfill.py --download --season 2025 --fetchers 16
+    python bulk_backfill.py --load --season 2025 --workers 8
+    python bulk_backfill.py --benchmark --games 400 --workers 1,2,4,8
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import batted_ball_store
+import game_feed
+import http_session
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+DB_PATH = "../data/mlb_data.db"
+FEED_DIR = "../data/feeds"
+SCHEMA_PATH = "../schema.sql"
+DEFAULT_FETCHERS = 8
+DEFAULT_COMMIT_EVERY = 50
+# Parses queued per worker; bounds how many parsed games wait in memory for the writer
+IN_FLIGHT_PER_WORKER = 4
+
+FEED_URL = http_session.STATSAPI_BASE + "/api/v1.1/game/{game_pk}/feed/live"
+
+COMPLETED_GAMES_SQL = """
+    SELECT game_pk, game_id FROM games
+    WHERE season = ? AND status IN ('Final', 'Completed', 'Game Over') AND game_type = 'R'
+    ORDER BY game_date, game_pk
+"""
+
+
+def loads(data):
+    """Decode a JSON payload (bytes) with orjson if it's installed"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def feed_path(feed_dir, season, game_pk):
+    return os.path.join(feed_dir, str(season), f"{game_pk}.json.gz")
+
+
+def save_feed(path, payload):
+    """Write a raw payload gzipped, via a temp file so readers never see half a file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, 'wb', compresslevel=5) as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+def download(conn, season, feed_dir=FEED_DIR, fetchers=DEFAULT_FETCHERS, refetch=False):
+    """Archive the raw live feed of every completed game not archived yet; returns (saved, errors)"""
+    games = [(game_pk, feed_path(feed_dir, season, game_pk))
+             for game_pk, _ in conn.execute(COMPLETED_GAMES_SQL, (season,))]
+    if not refetch:
+        games = [(game_pk, path) for game_pk, path in games if not os.path.exists(path)]
+    print(f"Downloading {len(games):,} live feeds for {season} with {fetchers} fetchers...")
+
+    def fetch(game):
+        game_pk, path = game
+        response = http_session.get(FEED_URL.format(game_pk=game_pk))
+        response.raise_for_status()
+        save_feed(path, response.content)
+
+    saved = errors = 0
+    with ThreadPoolExecutor(fetchers) as pool:
+        for (game_pk, _), future in zip(games, [pool.submit(fetch, game) for game in games]):
+            try:
+                future.result()
+                saved += 1
+            except Exception as e:
+                print(f"  Error downloading game {game_pk}: {e}")
+                errors += 1
+            if (saved + errors) % 100 == 0:
+                print(f"  {saved + errors:,}/{len(games):,}", end='\r')
+    print()
+    return saved, errors
+
+
+def parse_payload(task):
+    """Worker: read, decode and parse one archived feed -> (game_pk, game_id, parsed or None, error)"""
+    game_pk, game_id, path = task
+    try:
+        with gzip.open(path, 'rb') as f:
+            feed = loads(f.read())
+        return game_pk, game_id, game_feed.parse_feed(feed, game_id), None
+    except Exception as e:
+        return game_pk, game_id, None, str(e)
+
+
+def parsed_games(tasks, workers):
+    """parse_payload results in task order, from a process pool (or inline with one worker)"""
+    if workers <= 1:
+        yield from map(parse_payload, tasks)
+        return
+    # pool.map would submit every task up front and hold all results until they're consumed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+            pending.append(pool.submit(parse_payload, task))
+        while pending:
+            yield pending.popleft().result()
+
+
+def archived_tasks(conn, season, feed_dir=FEED_DIR):
+    """(game_pk, game_id, path) for the season's completed games that have an archived feed"""
+    tasks = []
+    for game_pk, game_id in conn.execute(COMPLETED_GAMES_SQL, (season,)):
+        path = feed_path(feed_dir, season, game_pk)
+        if os.path.exists(path):
+            tasks.append((game_pk, game_id, path))
+    return tasks
+
+
+def write_batch(conn, batch):
+    """Write (game_pk, game_id, parsed) games in one transaction; returns (games written, errors)"""
+    try:
+        with conn:
+            cursor = conn.cursor()
+            for _, game_id, parsed in batch:
+                game_feed.write_game(cursor, game_id, parsed)
+        return list(batch), 0
+    except Exception:
+        pass
+    # Don't let one bad game lose the rest of the batch: write them one per transaction
+    written, errors = [], 0
+    for game in batch:
+        game_pk, game_id, parsed = game
+        try:
+            with conn:
+                game_feed.write_game(conn.cursor(), game_id, parsed)
+        except Exception as e:
+            print(f"  Error writing game {game_pk}: {e}")
+            errors += 1
+            continue
+        written.append(game)
+    return written, errors
+
+
+def load(conn, tasks, workers=None, commit_every=DEFAULT_COMMIT_EVERY, verbose=True):
+    """Parse archived feeds in `workers` processes and write them from this process; returns counts"""
+    workers = workers or os.cpu_count() or 1
+    counts = {'written': 0, 'plays': 0, 'no_data': 0, 'errors': 0}
+    batch = []
+
+    def flush():
+        written, errors = write_batch(conn, batch)
+        counts['written'] += len(written)
+        counts['plays'] += sum(len(parsed['plays']) for _, _, parsed in written)
+        counts['errors'] += errors
+        batch.clear()
+        if verbose:
+            print(f"  wrote {counts['written']:,}/{len(tasks):,} games", end='\r')
+
+    for game_pk, game_id, parsed, error in parsed_games(tasks, workers):
+        if error is not None:
+            print(f"  Error parsing game {game_pk}: {error}")
+            counts['errors'] += 1
+        elif not parsed['batting'] and not parsed['plays']:
+            counts['no_data'] += 1
+        else:
+            batch.append((game_pk, game_id, parsed))
+            if len(batch) >= commit_every:
+                flush()
+    if batch:
+        flush()
+    if verbose:
+        print()
+    return counts
+
+
+def benchmark(games, worker_counts, commit_every):
+    """Archive fake feeds, then time decoding and parsing, and the full load, at each worker count"""
+    from compact_play_by_play import apply_schema
+    import fake_stats_api
+    import schedule_sync
+
+    season = 2025
+    days = -(-games // 15)
+    with tempfile.TemporaryDirectory() as tmp:
+        feed_dir = os.path.join(tmp, 'feeds')
+        template = os.path.join(tmp, 'template.db')
+        conn = sqlite3.connect(template)
+        with open(SCHEMA_PATH) as f:
+            apply_schema(conn, f.read())
+        schedule = fake_stats_api.make_schedule(f"{season}-01-01", f"{season}-12-31", 15, days)
+        rows = schedule_sync.schedule_rows(schedule)
+        schedule_sync.sync_games(conn, dict(list(rows.items())[:games]))
+        game_pks = [game_pk for game_pk, _ in conn.execute(COMPLETED_GAMES_SQL, (season,))]
+        for game_pk in game_pks:
+            save_feed(feed_path(feed_dir, season, game_pk), json.dumps(fake_stats_api.make_feed(game_pk)).encode())
+        tasks = archived_tasks(conn, season, feed_dir)
+        conn.close()
+
+        with gzip.open(tasks[0][2], 'rb') as f:
+            payload = f.read()
+        decoders = [('json', json.loads)] + ([('orjson', orjson.loads)] if orjson is not None else [])
+        print(f"{len(tasks)} archived fake games, {len(payload) // 1024} KB per feed, {os.cpu_count()} CPU(s)")
+        for name, decode in decoders:
+            t0 = time.perf_counter()
+            for _ in range(50):
+                decode(payload)
+            print(f"  {name:<7} decode {(time.perf_counter() - t0) / 50 * 1000:.2f} ms/feed")
+        if orjson is None:
+            print("  (pip install orjson for faster decoding)")
+
+        print(f"{'workers':>8}{'parse games/s':>15}{'speedup':>9}{'load games/s':>14}{'speedup':>9}")
+        parse_base = load_base = None
+        for workers in worker_counts:
+            t0 = time.perf_counter()
+            for _ in parsed_games(tasks, workers):
+                pass
+            parse_rate = len(tasks) / (time.perf_counter() - t0)
+
+            db_path = os.path.join(tmp, f"load_{workers}.db")
+            shutil.copy(template, db_path)
+            conn = sqlite3.connect(db_path)
+            t0 = time.perf_counter()
+            counts = load(conn, tasks, workers, commit_every, verbose=False)
+            load_rate = counts['written'] / (time.perf_counter() - t0)
+            conn.close()
+
+            parse_base = parse_base or parse_rate
+            load_base = load_base or load_rate
+            print(f"{workers:>8}{parse_rate:>15.1f}{parse_rate / parse_base:>8.1f}x"
+                  f"{load_rate:>14.1f}{load_rate / load_base:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive raw live feeds and load them with parallel parsing')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--feed-dir', default=FEED_DIR, help='Raw feed archive directory')
+    parser.add_argument('--season', type=int, help='Season year (e.g., 2025)')
+    parser.add_argument('--download', action='store_true', help='Archive raw live feeds for completed games')
+    parser.add_argument('--refetch', action='store_true', help='Download feeds that are already archived')
+    parser.add_argument('--fetchers', type=int, default=DEFAULT_FETCHERS, help='Concurrent downloads')
+    parser.add_argument('--load', action='store_true', help='Parse archived feeds and write them')
+    parser.add_argument('--workers', default=None,
+                        help='Parse processes (default: CPU count); comma-separated list with --benchmark')
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY, help='Games per write transaction')
+    parser.add_argument('--benchmark', action='store_true', help='Measure parse/load scaling on fake feeds')
+    parser.add_argument('--games', type=int, default=400, help='Games for --benchmark')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        cpus = os.cpu_count() or 1
+        worker_counts = [int(n) for n in args.workers.split(',')] if args.workers else \
+            sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))) or [1]
+        benchmark(args.games, worker_counts, args.commit_every)
+        return
+    if not (args.download or args.load) or not args.season:
+        parser.error('pass --season with --download and/or --load (or --benchmark)')
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    if args.download:
+        http_session.configure(pool_size=args.fetchers)
+        t0 = time.perf_counter()
+        saved, errors = download(conn, args.season, args.feed_dir, args.fetchers, args.refetch)
+        print(f"Saved {saved:,} feeds ({errors} errors) in {time.perf_counter() - t0:.1f}s")
+        print(http_session.stats.summary_line())
+    if args.load:
+        tasks = archived_tasks(conn, args.season, args.feed_dir)
+        workers = int(args.workers) if args.workers else None
+        print(f"Loading {len(tasks):,} archived feeds (decoder: {'orjson' if orjson is not None else 'json'})...")
+        t0 = time.perf_counter()
+        counts = load(conn, tasks, workers, args.commit_every)
+        elapsed = time.perf_counter() - t0
+        print(f"Wrote {counts['written']:,} games ({counts['plays']:,} plays) in {elapsed:.1f}s "
+              f"= {counts['written'] / elapsed if elapsed else 0:.1f} games/s; "
+              f"{counts['no_data']} without data, {counts['errors']} errors")
+    conn.close()
+    if args.load:
+        batted_ball_store.refresh(args.db)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,71 +1,138 @@
 """
 Check MLB Data Collection Status
+
+Reads per-season totals from season_counters (maintained by the collector's write
+path, see audit_games.py), so no fact table is scanned. A plain run first catches
+the audit up with anything written outside the collector; --watch only reads, so it
+can run next to a collection without contending with the writer.
+
+Usage:
+    python check_status.py
+    python check_status.py --watch --interval 5   # live coverage, ingest rate and ETA
 """
 
+import argparse
 import sqlite3
-
-DB_PATH = "../data/mlb_data.db"
-
-conn = sqlite3.connect(DB_PATH)
-
-print("\n" + "="*70)
-print(" MLB DATABASE STATUS")
-print("="*70)
-
-# Teams
-team_count = conn.execute("SELECT COUNT(*) FROM teams").fetchone()[0]
-print(f"\nTeams: {team_count}")
-
-# Games by season
-print("\nGames by Season:")
-seasons = conn.execute("""
-    SELECT season, COUNT(*) as games, 
-           SUM(CASE WHEN status IN ('Final', 'Completed', 'Game Over') THEN 1 ELSE 0 END) as completed
-    FROM games
-    GROUP BY season
-    ORDER BY season DESC
-""").fetchall()
-
-for season, games, completed in seasons:
-    print(f"  {season}: {games} games ({completed} completed)")
-
-# Total stats
-batting_stats = conn.execute("SELECT COUNT(*) FROM box_scores_batting").fetchone()[0]
-pitching_stats = conn.execute("SELECT COUNT(*) FROM box_scores_pitching").fetchone()[0]
-
-print(f"\nPlayer Stats:")
-print(f"  Batting records: {batting_stats:,}")
-print(f"  Pitching records: {pitching_stats:,}")
-
-# Games with stats
-games_with_stats = conn.execute("""
-    SELECT COUNT(DISTINCT game_id) 
-    FROM box_scores_batting
-""").fetchone()[0]
-
-total_completed = conn.execute("""
-    SELECT COUNT(*) FROM games 
-    WHERE status IN ('Final', 'Completed', 'Game Over')
-""").fetchone()[0]
-
-print(f"\nCoverage:")
-print(f"  Games with box scores: {games_with_stats}")
-print(f"  Total completed games: {total_completed}")
-if total_completed > 0:
-    print(f"  Coverage: {games_with_stats/total_completed*100:.1f}%")
-
-# Recent games
-print("\nMost Recent Games:")
-recent = conn.execute("""
-    SELECT game_pk, game_date, status
-    FROM games
-    ORDER BY game_date DESC, game_pk DESC
-    LIMIT 5
-""").fetchall()
-
-for game_pk, game_date, status in recent:
-    print(f"  {game_date} - Game {game_pk} ({status})")
-
-print("="*70 + "\n")
-
-conn.close()
+import time
+from collections import deque
+from pathlib import Path
+
+import audit_games
+import query_api
+
+DB_PATH = query_api.DB_PATH
+
+# Samples kept for the ingest rate (interval * RATE_WINDOW seconds)
+RATE_WINDOW = 12
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m {seconds:02d}s"
+
+
+def print_seasons(seasons):
+    print(f"\n{'Season':<8}{'Games':>7}{'Final':>7}{'Box scores':>16}{'PBP':>7}"
+          f"{'Batting':>10}{'Pitching':>10}{'Plays':>11}")
+    for s in seasons:
+        coverage = s['completed_with_boxscore'] / s['completed_games'] * 100 if s['completed_games'] else 0
+        print(f"{s['season']:<8}{s['games']:>7,}{s['completed_games']:>7,}"
+              f"{s['completed_with_boxscore']:>8,} ({coverage:5.1f}%){s['games_with_pbp']:>7,}"
+              f"{s['batting_rows']:>10,}{s['pitching_rows']:>10,}{s['pbp_rows']:>11,}")
+
+
+def print_status(conn):
+    print("\n" + "="*70)
+    print(" MLB DATABASE STATUS")
+    print("="*70)
+
+    team_count = conn.execute("SELECT COUNT(*) FROM teams").fetchone()[0]
+    print(f"\nTeams: {team_count}")
+
+    print_seasons(audit_games.season_totals(conn))
+
+    totals = audit_games.summary(conn)
+    total_completed = totals['completed_games']
+    games_with_stats = totals['completed_with_boxscore']
+    print(f"\nCoverage:")
+    print(f"  Completed games with box scores: {games_with_stats:,}")
+    print(f"  Total completed games: {total_completed:,}")
+    if total_completed > 0:
+        print(f"  Coverage: {games_with_stats/total_completed*100:.1f}%")
+
+    print("\nData Quality:")
+    audit_games.print_summary(totals)
+    print("  Details: audit_games.py --gaps; backfill lists: audit_games.py --work-list ...")
+
+    print("\nMost Recent Games:")
+    recent = conn.execute("""
+        SELECT game_pk, game_date, status
+        FROM games
+        ORDER BY game_date DESC, game_pk DESC
+        LIMIT 5
+    """).fetchall()
+    for game_pk, game_date, status in recent:
+        print(f"  {game_date} - Game {game_pk} ({status})")
+
+    print("="*70 + "\n")
+
+
+def watch(db_path, interval):
+    """Redraw per-season coverage every interval seconds with ingest rate and ETA (read-only)"""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=30.0)
+    samples = deque(maxlen=RATE_WINDOW)
+    try:
+        while True:
+            try:
+                seasons = audit_games.season_totals(conn)
+            except sqlite3.OperationalError:
+                print("No season_counters yet; run check_status.py once without --watch.")
+                return
+            totals = audit_games.summary(conn)
+            now = time.monotonic()
+            samples.append((now, totals['games_with_boxscore'], totals['pbp_rows']))
+
+            print("\033[2J\033[H", end='')  # clear screen
+            print(f"MLB collection status  {time.strftime('%H:%M:%S')}  (every {interval:g}s, Ctrl-C to stop)")
+            print_seasons(seasons)
+
+            remaining = totals['completed_games'] - totals['completed_with_boxscore']
+            first_time, first_games, first_plays = samples[0]
+            elapsed = now - first_time
+            if elapsed > 0:
+                games_per_min = (totals['games_with_boxscore'] - first_games) / elapsed * 60
+                plays_per_sec = (totals['pbp_rows'] - first_plays) / elapsed
+                eta = format_duration(remaining / games_per_min * 60) if games_per_min > 0 else "-"
+                print(f"\nIngest rate: {games_per_min:.1f} games/min, {plays_per_sec:.0f} plays/s")
+                print(f"Remaining completed games without box scores: {remaining:,}  ETA: {eta}")
+            else:
+                print(f"\nRemaining completed games without box scores: {remaining:,}  (measuring rate...)")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database collection status')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--watch', action='store_true', help='Refresh live during a collection run (read-only)')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between refreshes with --watch')
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(args.db, args.interval)
+        return
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    # Catch up with rows written outside the collector (only re-counts changed games)
+    audit_games.update(conn)
+    print_status(conn)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
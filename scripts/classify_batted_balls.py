@@ -0,0 +1,241 @@
+"""
+Batted Ball Classification
+Computes spray angle, distance, fair/foul, out/non-out, hit type and whether the ball
+cleared the fence for every play with hit coordinates, into the indexed
+batted_ball_classes table (one row per play_by_play.id).
+
+Geometry comes from field_geometry: the shared coordinate frame, and the fence of
+the park each game was played in (games.venue_id). Outcomes come from frozenset
+and dict lookups on event_type. Everything is vectorized with NumPy per batch.
+
+Ingestion classifies each game as it is written (game_feed.write_game); run this
+script to classify existing rows or rebuild after changing the rules.
+
+Usage:
+    python classify_batted_balls.py                        # classify plays not yet classified
+    python classify_batted_balls.py --rebuild              # reclassify everything
+    python classify_batted_balls.py --report foul-nonouts  # balls landing foul that weren't outs
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+
+import field_geometry
+
+
+DB_PATH = "../data/mlb_data.db"
+BATCH_SIZE = 50_000
+
+# Outs recorded on a batted ball or elsewhere in the play
+OUT_EVENTS = frozenset([
+    'field_out', 'force_out', 'grounded_into_double_play', 'double_play', 'triple_play',
+    'strikeout', 'strikeout_double_play', 'sac_fly', 'sac_bunt', 'sac_fly_double_play',
+    'sac_bunt_double_play', 'fielders_choice_out', 'other_out',
+    'pickoff_1b', 'pickoff_2b', 'pickoff_3b', 'pickoff_caught_stealing_2b',
+    'pickoff_caught_stealing_3b', 'pickoff_caught_stealing_home',
+    'caught_stealing_2b', 'caught_stealing_3b', 'caught_stealing_home',
+    'batter_interference', 'runner_interference',
+])
+
+# Events that are neither a hit nor an out
+NON_OUT_EVENTS = frozenset([
+    'field_error', 'fielders_choice', 'catcher_interf', 'fan_interference',
+    'walk', 'intent_walk', 'hit_by_pitch',
+])
+
+# Events where the batter put the ball in play, so the play should have hit coordinates
+IN_PLAY_EVENTS = frozenset([
+    'single', 'double', 'triple', 'home_run', 'field_out', 'force_out', 'grounded_into_double_play',
+    'double_play', 'triple_play', 'sac_fly', 'sac_bunt', 'sac_fly_double_play', 'sac_bunt_double_play',
+    'fielders_choice', 'fielders_choice_out', 'field_error',
+])
+
+# hit_type values (bases reached)
+HIT_EVENTS = {'single': 1, 'double': 2, 'triple': 3, 'home_run': 4}
+
+COLUMNS = ['play_row_id', 'game_id', 'spray_angle', 'distance', 'is_foul', 'is_out', 'hit_type', 'clears_fence']
+
+CLASS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS batted_ball_classes (
+        play_row_id INTEGER PRIMARY KEY,
+        game_id INTEGER NOT NULL,
+        spray_angle REAL,
+        distance REAL,
+        is_foul INTEGER NOT NULL,
+        is_out INTEGER,
+        hit_type TEXT,
+        clears_fence INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_bbc_foul_out ON batted_ball_classes(is_foul, is_out)",
+    "CREATE INDEX IF NOT EXISTS idx_bbc_game ON batted_ball_classes(game_id)",
+    "CREATE INDEX IF NOT EXISTS idx_bbc_hit_type ON batted_ball_classes(hit_type)",
+]
+
+SELECT_SQL = """
+    SELECT pbp.id, pbp.game_id, pbp.coord_x, pbp.coord_y, pbp.event_type, g.venue_id
+    FROM play_by_play pbp
+    JOIN games g ON pbp.game_id = g.game_id
+    WHERE pbp.coord_x IS NOT NULL AND pbp.coord_y IS NOT NULL
+"""
+
+INSERT_SQL = f"""
+    INSERT OR REPLACE INTO batted_ball_classes ({', '.join(COLUMNS)})
+    VALUES ({', '.join(['?'] * len(COLUMNS))})
+"""
+
+# Anomaly reports: name -> query over batted_ball_classes
+REPORTS = {
+    'foul-nonouts': """
+        SELECT c.play_row_id, g.game_date, g.game_pk, pbp.batter_id, pbp.event_type,
+               ROUND(c.spray_angle, 1) AS spray_angle, ROUND(c.distance, 1) AS distance
+        FROM batted_ball_classes c
+        JOIN play_by_play pbp ON pbp.id = c.play_row_id
+        JOIN games g ON g.game_id = c.game_id
+        WHERE c.is_foul = 1 AND c.is_out = 0
+        ORDER BY g.game_date
+    """,
+    'short-home-runs': """
+        SELECT c.play_row_id, g.game_date, g.game_pk, g.venue_name, pbp.batter_id,
+               ROUND(c.spray_angle, 1) AS spray_angle, ROUND(c.distance, 1) AS distance
+        FROM batted_ball_classes c
+        JOIN play_by_play pbp ON pbp.id = c.play_row_id
+        JOIN games g ON g.game_id = c.game_id
+        WHERE c.hit_type = 'home_run' AND c.clears_fence = 0
+        ORDER BY g.game_date
+    """,
+    'unknown-events': """
+        SELECT pbp.event_type, COUNT(*) AS plays
+        FROM batted_ball_classes c
+        JOIN play_by_play pbp ON pbp.id = c.play_row_id
+        WHERE c.is_out IS NULL
+        GROUP BY pbp.event_type
+        ORDER BY plays DESC
+    """,
+}
+
+
+def ensure_schema(cursor):
+    """Create batted_ball_classes if needed (plain statements, safe inside a transaction)"""
+    for statement in CLASS_SCHEMA:
+        cursor.execute(statement)
+
+
+def out_flag(event_type):
+    """1 for outs, 0 for hits and other non-outs, None for events the rules don't know"""
+    if event_type in OUT_EVENTS:
+        return 1
+    if event_type in HIT_EVENTS or event_type in NON_OUT_EVENTS:
+        return 0
+    return None
+
+
+def classify_rows(rows):
+    """
+    Classify (id, game_id, coord_x, coord_y, event_type, venue_id) rows.
+    Returns batted_ball_classes tuples in COLUMNS order.
+    """
+    import numpy as np
+
+    if not rows:
+        return []
+    ids, game_ids, coord_x, coord_y, event_types, venue_ids = zip(*rows)
+    x, y = field_geometry.statcast_transform(np.asarray(coord_x, dtype=float), np.asarray(coord_y, dtype=float))
+    angle = field_geometry.spray_angle(x, y)
+    dist = field_geometry.distance(x, y)
+    foul = field_geometry.is_foul(x, y)
+    cleared = field_geometry.clears_fence(x, y, venue_ids)
+    return [
+        (play_id, game_id, round(float(a), 2), round(float(d), 1), int(f), out_flag(event),
+         event if event in HIT_EVENTS else None, int(c))
+        for play_id, game_id, a, d, f, event, c
+        in zip(ids, game_ids, angle, dist, foul, event_types, cleared)
+    ]
+
+
+def classify_game(cursor, game_id):
+    """Classify one game's plays in the caller's transaction (used at ingest)"""
+    ensure_schema(cursor)
+    rows = cursor.execute(SELECT_SQL + " AND pbp.game_id = ?", (game_id,)).fetchall()
+    classes = classify_rows(rows)
+    cursor.executemany(INSERT_SQL, classes)
+    return len(classes)
+
+
+def delete_game(cursor, game_id):
+    """Drop a game's classifications before its plays are replaced"""
+    ensure_schema(cursor)
+    cursor.execute("DELETE FROM batted_ball_classes WHERE game_id = ?", (game_id,))
+
+
+def classify_all(conn, rebuild=False, batch_size=BATCH_SIZE):
+    """Classify every play with coordinates that has no classification yet (all of them with rebuild)"""
+    cursor = conn.cursor()
+    ensure_schema(cursor)
+    if rebuild:
+        cursor.execute("DELETE FROM batted_ball_classes")
+        conn.commit()
+    sql = SELECT_SQL + """
+        AND NOT EXISTS (SELECT 1 FROM batted_ball_classes c WHERE c.play_row_id = pbp.id)
+        AND pbp.id > ?
+        ORDER BY pbp.id
+        LIMIT ?
+    """
+    total = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(sql, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        classes = classify_rows(rows)
+        with conn:
+            conn.executemany(INSERT_SQL, classes)
+        total += len(classes)
+        last_id = rows[-1][0]
+        print(f"  classified {total:,} batted balls", end='\r')
+    print()
+    return total
+
+
+def print_report(conn, name, output=None):
+    cursor = conn.execute(REPORTS[name])
+    headers = [d[0] for d in cursor.description]
+    rows = cursor.fetchall()
+    if output:
+        with open(output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            writer.writerows(rows)
+        print(f"{len(rows):,} rows written to {output}")
+        return
+    print(" | ".join(headers))
+    for row in rows:
+        print(" | ".join(str(v) for v in row))
+    print(f"Total: {len(rows):,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify batted balls into the batted_ball_classes table')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--rebuild', action='store_true', help='Reclassify every play')
+    parser.add_argument('--report', choices=sorted(REPORTS), help='Print an anomaly report instead of classifying')
+    parser.add_argument('--output', help='Write the report to this CSV file')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    if args.report:
+        ensure_schema(conn.cursor())
+        print_report(conn, args.report, args.output)
+    else:
+        t0 = time.perf_counter()
+        total = classify_all(conn, args.rebuild)
+        print(f"Classified {total:,} batted balls in {time.perf_counter() - t0:.1f}s")
+    conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
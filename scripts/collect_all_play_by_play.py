@@ -5,10 +5,15 @@ import sqlite3
 import statsapi
 import time
 
+import http_session
+import result_cache
+import splits_cube
+
 DB_PATH = 'data/mlb_data.db'
 LOG_PATH = 'logs/collect_pbp.log'
 
 def collect_pbp_for_all_games():
+    http_session.install_statsapi()
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('SELECT game_pk, game_id FROM games')
@@ -117,13 +122,17 @@ def collect_pbp_for_all_games():
                     location,
                     coord_x,
                     coord_y,
-                    None  # created_at
+                    None,  # created_at
+                    matchup.get('pitchHand', {}).get('code'),
                 ]
                 # Truncate or pad values to match insert_columns length
                 values = values[:len(insert_columns)]
                 while len(values) < len(insert_columns):
                     values.append(None)
                 cursor2.execute(insert_sql, values)
+            # Runners here are only those who moved on each play
+            splits_cube.mark_runner_state(cursor2, game_id, trusted=False)
+            result_cache.bump_game(cursor2, game_id)
             conn2.commit()
             conn2.close()
             inserted_total += len(all_plays)
@@ -133,6 +142,7 @@ def collect_pbp_for_all_games():
             print(f"[{idx}/{len(games)}] Error for game {game_pk}: {e}")
             continue
     print(f"Inserted total {inserted_total} play-by-play events.")
+    print(http_session.stats.summary_line())
 
 if __name__ == '__main__':
     collect_pbp_for_all_games()
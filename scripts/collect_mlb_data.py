@@ -9,6 +9,10 @@ from datetime import datetime, timedelta
 import time
 import argparse
 
+import http_session
+import result_cache
+import schedule_sync
+
 
 DB_PATH = "../data/mlb_data.db"
 
@@ -18,6 +22,7 @@ class MLBDataCollector:
     
     def __init__(self, db_path=DB_PATH):
         self.db_path = db_path
+        http_session.install_statsapi()
         
     def collect_teams(self):
         """Collect all MLB teams"""
@@ -33,6 +38,7 @@ class MLBDataCollector:
         cursor = conn.cursor()
         
         inserted = 0
+        written_ids = []
         for team in teams:
             try:
                 cursor.execute("""
@@ -47,9 +53,11 @@ class MLBDataCollector:
                     team.get('league', {}).get('name', '')
                 ))
                 inserted += 1
+                written_ids.append(team['id'])
             except Exception as e:
                 print(f"Error inserting team {team.get('name')}: {e}")
         
+        result_cache.bump_keys(cursor, 'team', written_ids)
         conn.commit()
         conn.close()
         
@@ -62,45 +70,15 @@ class MLBDataCollector:
         print(f" COLLECTING SCHEDULE: {start_date} to {end_date}")
         print(f"{'='*70}")
         
-        # Get schedule
-        schedule = statsapi.schedule(start_date=start_date, end_date=end_date)
+        # Get schedule in one request
+        rows = schedule_sync.schedule_rows(schedule_sync.fetch_schedule(start_date, end_date))
         
         conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        
-        inserted = 0
-        for game in schedule:
-            try:
-                # Parse game date
-                game_date = datetime.strptime(game['game_date'], '%Y-%m-%d').date()
-                
-                cursor.execute("""
-                    INSERT OR REPLACE INTO games (
-                        game_pk, game_date, season, game_type, status,
-                        home_team_id, away_team_id, home_score, away_score,
-                        venue_name
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    game['game_id'],
-                    game_date,
-                    game.get('season', game_date.year),
-                    game.get('game_type', 'R'),
-                    game.get('status', 'Unknown'),
-                    game['home_id'],
-                    game['away_id'],
-                    game.get('home_score', None),
-                    game.get('away_score', None),
-                    game.get('venue_name', '')
-                ))
-                inserted += 1
-            except Exception as e:
-                print(f"Error inserting game {game.get('game_id')}: {e}")
-        
-        conn.commit()
+        counts = schedule_sync.sync_games(conn, rows)
         conn.close()
         
-        print(f"✅ Inserted {inserted} games")
-        return inserted
+        print(f"✅ {counts['inserted']} games inserted, {counts['updated']} updated, {counts['unchanged']} unchanged")
+        return counts['inserted'] + counts['updated']
     
     def collect_boxscore(self, game_pk):
         """Collect box score for a specific game"""
@@ -224,6 +202,7 @@ class MLBDataCollector:
                     except Exception as e:
                         continue
             
+            result_cache.bump_game(cursor, game_id)
             conn.commit()
             conn.close()
             
@@ -266,6 +245,7 @@ class MLBDataCollector:
         
         print(f"\n{'='*70}")
         print(f"✅ Collected {total_stats} player stats from {len(games)} games")
+        print(http_session.stats.summary_line())
         print(f"{'='*70}")
 
 
@@ -276,8 +256,11 @@ def main():
     parser.add_argument('--days', type=int, default=7, help='Number of days to collect')
     parser.add_argument('--season', type=int, help='Collect entire season (e.g., 2024)')
     parser.add_argument('--teams', action='store_true', help='Collect teams only')
+    parser.add_argument('--pool-size', type=int, default=http_session.DEFAULT_POOL_SIZE,
+                        help='HTTP connection pool size (match the number of concurrent workers)')
     
     args = parser.parse_args()
+    http_session.configure(pool_size=args.pool_size)
     
     collector = MLBDataCollector()
     
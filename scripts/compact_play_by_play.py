@@ -0,0 +1,389 @@
+"""
+Compact play_by_play Storage
+Migrates play_by_play to a dictionary-encoded layout and reports size and scan speed before/after.
+
+Layout after migration:
+    pbp_codes              one row per distinct (field, value) for the repeated text columns
+                           (event_type, result_type, pitch_type, trajectory, hardness, location)
+    play_by_play_compact   the plays, with those columns stored as small integer codes,
+                           half_inning as is_bottom (0/1) and count dropped (it is balls-strikes)
+    play_descriptions      event_description, kept out of the scanned table
+    play_by_play           a view with the original columns, plus INSTEAD OF triggers so
+                           existing INSERT / UPDATE / DELETE statements keep working
+
+Usage:
+    python compact_play_by_play.py [--db ../data/mlb_data.db] [--no-vacuum] [--report-only]
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+
+DB_PATH = "../data/mlb_data.db"
+
+COMPACT_TABLE = 'play_by_play_compact'
+
+# play_by_play text columns stored as pbp_codes codes
+CODED_FIELDS = ['event_type', 'result_type', 'pitch_type', 'trajectory', 'hardness', 'location']
+
+# Original play_by_play columns, in order, and how the compact table stores each
+PBP_COLUMNS = [
+    'id', 'game_id', 'play_id', 'inning', 'half_inning', 'at_bat_index', 'pitch_number',
+    'event_type', 'event_description', 'result_type', 'batter_id', 'pitcher_id',
+    'runner_on_first_id', 'runner_on_second_id', 'runner_on_third_id',
+    'outs', 'balls', 'strikes', 'count', 'pitch_type', 'pitch_speed', 'runs_scored', 'rbi',
+    'launch_speed', 'launch_angle', 'total_distance', 'trajectory', 'hardness', 'location',
+    'coord_x', 'coord_y', 'created_at', 'pitch_hand',
+]
+
+# Columns added to play_by_play after databases were first created:
+# (column, type, backfill expression over the physical table {table})
+ADDED_COLUMNS = [
+    # Snapshot of the pitcher's current players row; new plays take it from the feed
+    ('pitch_hand', 'TEXT', "(SELECT pitch_hand FROM players WHERE players.player_id = {table}.pitcher_id)"),
+]
+
+COMPACT_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS pbp_codes (
+    code INTEGER PRIMARY KEY,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    UNIQUE(field, value)
+);
+
+CREATE TABLE IF NOT EXISTS {COMPACT_TABLE} (
+    id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL,
+    play_id TEXT,
+    inning INTEGER,
+    is_bottom INTEGER,  -- 0 top, 1 bottom
+    at_bat_index INTEGER,
+    pitch_number TEXT,
+    event_type_code INTEGER,
+    result_type_code INTEGER,
+    batter_id INTEGER,
+    pitcher_id INTEGER,
+    runner_on_first_id INTEGER,
+    runner_on_second_id INTEGER,
+    runner_on_third_id INTEGER,
+    outs INTEGER,
+    balls INTEGER,
+    strikes INTEGER,
+    pitch_type_code INTEGER,
+    pitch_speed REAL,
+    runs_scored INTEGER DEFAULT 0,
+    rbi INTEGER DEFAULT 0,
+    launch_speed REAL,
+    launch_angle REAL,
+    total_distance REAL,
+    trajectory_code INTEGER,
+    hardness_code INTEGER,
+    location_code INTEGER,
+    coord_x REAL,
+    coord_y REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    pitch_hand TEXT,
+    FOREIGN KEY (game_id) REFERENCES games(game_id),
+    FOREIGN KEY (batter_id) REFERENCES players(player_id),
+    FOREIGN KEY (pitcher_id) REFERENCES players(player_id)
+);
+
+CREATE TABLE IF NOT EXISTS play_descriptions (
+    play_row_id INTEGER PRIMARY KEY,
+    event_description TEXT NOT NULL
+);
+"""
+
+
+def _code_of(field, value_expr):
+    return f"(SELECT code FROM pbp_codes WHERE field = '{field}' AND value = {value_expr})"
+
+
+def _column_exprs(prefix):
+    """Compact-table value expressions for the original columns, reading from prefix (NEW / src)"""
+    exprs = {
+        'is_bottom': f"CASE {prefix}.half_inning WHEN 'bottom' THEN 1 WHEN 'top' THEN 0 END",
+        'runs_scored': f"COALESCE({prefix}.runs_scored, 0)",
+        'rbi': f"COALESCE({prefix}.rbi, 0)",
+        'created_at': f"COALESCE({prefix}.created_at, CURRENT_TIMESTAMP)",
+    }
+    for field in CODED_FIELDS:
+        exprs[f'{field}_code'] = _code_of(field, f"{prefix}.{field}")
+    for col in PBP_COLUMNS:
+        if col not in CODED_FIELDS and col not in ('half_inning', 'count', 'event_description', 'id'):
+            exprs.setdefault(col, f"{prefix}.{col}")
+    return exprs
+
+
+def _register_codes_sql(prefix):
+    values = "\n            UNION ALL ".join(f"SELECT '{f}' AS field, {prefix}.{f} AS value" for f in CODED_FIELDS)
+    return f"""
+    INSERT OR IGNORE INTO pbp_codes (field, value)
+    SELECT field, value FROM (
+            {values}
+    ) WHERE value IS NOT NULL;"""
+
+
+def compat_view_sql():
+    """play_by_play view with the original column names and order"""
+    select = []
+    joins = []
+    for col in PBP_COLUMNS:
+        if col in CODED_FIELDS:
+            select.append(f"c_{col}.value AS {col}")
+            joins.append(f"LEFT JOIN pbp_codes c_{col} ON c_{col}.code = p.{col}_code")
+        elif col == 'half_inning':
+            select.append("CASE p.is_bottom WHEN 1 THEN 'bottom' WHEN 0 THEN 'top' END AS half_inning")
+        elif col == 'count':
+            select.append("CASE WHEN p.balls IS NOT NULL AND p.strikes IS NOT NULL "
+                          "THEN p.balls || '-' || p.strikes END AS count")
+        elif col == 'event_description':
+            select.append("d.event_description AS event_description")
+        else:
+            select.append(f"p.{col} AS {col}")
+    joins.append("LEFT JOIN play_descriptions d ON d.play_row_id = p.id")
+    return (f"CREATE VIEW play_by_play AS\nSELECT\n    " + ",\n    ".join(select) +
+            f"\nFROM {COMPACT_TABLE} p\n" + "\n".join(joins) + ";")
+
+
+def compat_triggers_sql():
+    """INSTEAD OF triggers that route writes on the view to the compact tables"""
+    exprs = _column_exprs('NEW')
+    cols = list(exprs)
+    insert = f"""
+CREATE TRIGGER play_by_play_insert INSTEAD OF INSERT ON play_by_play
+BEGIN{_register_codes_sql('NEW')}
+    INSERT INTO {COMPACT_TABLE} (id, {', '.join(cols)})
+    VALUES (NEW.id, {', '.join(exprs[c] for c in cols)});
+    INSERT INTO play_descriptions (play_row_id, event_description)
+    SELECT last_insert_rowid(), NEW.event_description WHERE NEW.event_description IS NOT NULL;
+END;"""
+    update = f"""
+CREATE TRIGGER play_by_play_update INSTEAD OF UPDATE ON play_by_play
+BEGIN{_register_codes_sql('NEW')}
+    UPDATE {COMPACT_TABLE} SET {', '.join(f'{c} = {exprs[c]}' for c in cols)}
+    WHERE id = OLD.id;
+    DELETE FROM play_descriptions WHERE play_row_id = OLD.id;
+    INSERT INTO play_descriptions (play_row_id, event_description)
+    SELECT OLD.id, NEW.event_description WHERE NEW.event_description IS NOT NULL;
+END;"""
+    delete = f"""
+CREATE TRIGGER play_by_play_delete INSTEAD OF DELETE ON play_by_play
+BEGIN
+    DELETE FROM {COMPACT_TABLE} WHERE id = OLD.id;
+    DELETE FROM play_descriptions WHERE play_row_id = OLD.id;
+END;"""
+    return [insert, update, delete]
+
+
+def is_compacted(conn):
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'play_by_play'").fetchone()
+    return row is not None and row[0] == 'view'
+
+
+def physical_pbp_table(conn):
+    """Name of the table that actually stores plays (for indexes and bulk scans)"""
+    return COMPACT_TABLE if is_compacted(conn) else 'play_by_play'
+
+
+def compact_column(column):
+    """Compact-table column holding an original play_by_play column"""
+    if column in CODED_FIELDS:
+        return f'{column}_code'
+    if column == 'half_inning':
+        return 'is_bottom'
+    return column
+
+
+def ensure_play_columns(conn):
+    """
+    Add ADDED_COLUMNS missing from an older play_by_play (either layout) and backfill
+    them; safe inside a transaction. Returns the columns added.
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(play_by_play)")}
+    missing = [column for column in ADDED_COLUMNS if column[0] not in existing]
+    if not existing or not missing:
+        return []
+    compacted = is_compacted(conn)
+    table = COMPACT_TABLE if compacted else 'play_by_play'
+    for column, column_type, backfill in missing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        conn.execute(f"UPDATE {table} SET {column} = {backfill.format(table=table)}")
+    if compacted:
+        # The view and its triggers list every column; dropping the view drops the triggers
+        conn.execute("DROP VIEW play_by_play")
+        conn.execute(compat_view_sql())
+        for stmt in compat_triggers_sql():
+            conn.execute(stmt)
+    return [column for column, _, _ in missing]
+
+
+PBP_INDEX_RE = re.compile(
+    r'CREATE\s+(UNIQUE\s+)?INDEX\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+play_by_play\s*\(([^)]*)\)', re.I)
+
+
+def apply_schema(conn, schema_sql):
+    """Run schema.sql; on a compacted database its play_by_play indexes go on the compact table"""
+    if is_compacted(conn):
+        def translate(m):
+            columns = ', '.join(compact_column(c.strip()) for c in m.group(3).split(','))
+            return f"CREATE {m.group(1) or ''}INDEX IF NOT EXISTS {m.group(2)} ON {COMPACT_TABLE} ({columns})"
+        schema_sql = PBP_INDEX_RE.sub(translate, schema_sql)
+    conn.executescript(schema_sql)
+    ensure_play_columns(conn)
+
+
+def _pbp_indexes(conn):
+    """(name, columns, unique) for the user-created indexes on play_by_play"""
+    indexes = []
+    for _, name, unique, origin, _ in conn.execute("PRAGMA index_list(play_by_play)"):
+        if origin != 'c':
+            continue
+        columns = [row[2] for row in conn.execute(f"PRAGMA index_info({name})")]
+        indexes.append((name, columns, unique))
+    return indexes
+
+
+def migrate(conn):
+    """Move play_by_play into the compact layout; the original table is dropped"""
+    if is_compacted(conn):
+        print("play_by_play is already compacted")
+        return
+    ensure_play_columns(conn)
+    conn.commit()
+    indexes = _pbp_indexes(conn)
+    exprs = _column_exprs('src')
+    cols = list(exprs)
+
+    # Statements run one at a time: executescript() would commit half way through
+    conn.execute("BEGIN")
+    try:
+        for stmt in COMPACT_SCHEMA.split(';'):
+            if stmt.strip():
+                conn.execute(stmt)
+        for field in CODED_FIELDS:
+            conn.execute(f"""
+                INSERT OR IGNORE INTO pbp_codes (field, value)
+                SELECT DISTINCT '{field}', {field} FROM play_by_play WHERE {field} IS NOT NULL
+            """)
+        conn.execute(f"""
+            INSERT INTO {COMPACT_TABLE} (id, {', '.join(cols)})
+            SELECT src.id, {', '.join(exprs[c] for c in cols)} FROM play_by_play src
+        """)
+        conn.execute("""
+            INSERT INTO play_descriptions (play_row_id, event_description)
+            SELECT id, event_description FROM play_by_play WHERE event_description IS NOT NULL
+        """)
+        conn.execute("DROP TABLE play_by_play")
+        conn.execute(compat_view_sql())
+        for stmt in compat_triggers_sql():
+            conn.execute(stmt)
+        # Same index names, so schema.sql's CREATE INDEX IF NOT EXISTS stays a no-op
+        for name, columns, unique in indexes:
+            conn.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {COMPACT_TABLE} "
+                         f"({', '.join(compact_column(c) for c in columns)})")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def storage_bytes(conn):
+    """Bytes used by play_by_play tables and their indexes (whole file if dbstat isn't compiled in)"""
+    tables = ('play_by_play', COMPACT_TABLE, 'play_descriptions', 'pbp_codes')
+    names = {name for name, tbl in conn.execute("SELECT name, tbl_name FROM sqlite_master") if tbl in tables}
+    try:
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    except sqlite3.OperationalError:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        return {'(database file)': page_size * page_count}
+    return {name: nbytes for name, nbytes in rows if name in names}
+
+
+EVENT_CODE = "(SELECT code FROM pbp_codes WHERE field = 'event_type' AND value = 'home_run')"
+
+# (label, query on the original columns, same query written against the compact table)
+SCAN_QUERIES = [
+    ('full scan (numeric)',
+     "SELECT COUNT(*), SUM(coord_x), AVG(launch_speed) FROM play_by_play",
+     f"SELECT COUNT(*), SUM(coord_x), AVG(launch_speed) FROM {COMPACT_TABLE}"),
+    ('filter by event_type',
+     "SELECT COUNT(*) FROM play_by_play WHERE event_type = 'home_run'",
+     f"SELECT COUNT(*) FROM {COMPACT_TABLE} WHERE event_type_code = {EVENT_CODE}"),
+    ('group by event/trajectory',
+     "SELECT event_type, trajectory, COUNT(*) FROM play_by_play GROUP BY 1, 2",
+     f"""SELECT e.value, t.value, n FROM (
+             SELECT event_type_code, trajectory_code, COUNT(*) AS n FROM {COMPACT_TABLE} GROUP BY 1, 2
+         ) g LEFT JOIN pbp_codes e ON e.code = g.event_type_code
+             LEFT JOIN pbp_codes t ON t.code = g.trajectory_code"""),
+    ('chart rows (all columns)',
+     "SELECT * FROM play_by_play WHERE coord_x IS NOT NULL",
+     None),
+]
+
+
+def _best_time(conn, sql, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql).fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_scans(conn, repeat=3):
+    """{label: (seconds via play_by_play, seconds via the compact table or None)}"""
+    compacted = is_compacted(conn)
+    timings = {}
+    for label, sql, compact_sql in SCAN_QUERIES:
+        native = _best_time(conn, compact_sql, repeat) if compacted and compact_sql else None
+        timings[label] = (_best_time(conn, sql, repeat), native)
+    return timings
+
+
+def print_report(title, sizes, timings):
+    print(f"\n{title}")
+    for name, nbytes in sorted(sizes.items()):
+        print(f"  {name:<32} {nbytes / 1e6:10.2f} MB")
+    print(f"  {'total':<32} {sum(sizes.values()) / 1e6:10.2f} MB")
+    print(f"  {'scan':<32} {'play_by_play':>12} {'compact':>12}")
+    for label, (seconds, native) in timings.items():
+        native_ms = f"{native * 1000:10.1f} ms" if native is not None else f"{'-':>13}"
+        print(f"  {label:<32} {seconds * 1000:10.1f} ms {native_ms}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate play_by_play to the compact dictionary-encoded layout')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip VACUUM after migrating (file will not shrink)')
+    parser.add_argument('--report-only', action='store_true', help='Only report current size and scan speed')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    print(f"Database: {args.db} ({os.path.getsize(args.db) / 1e6:.1f} MB)")
+    before_sizes, before_times = storage_bytes(conn), time_scans(conn)
+    print_report("Current layout" if args.report_only else "Before", before_sizes, before_times)
+    if args.report_only:
+        return
+
+    start = time.perf_counter()
+    migrate(conn)
+    print(f"\nMigrated in {time.perf_counter() - start:.1f}s")
+    if not args.no_vacuum:
+        conn.execute("VACUUM")
+    conn.execute("ANALYZE")
+
+    after_sizes, after_times = storage_bytes(conn), time_scans(conn)
+    print_report("After", after_sizes, after_times)
+    print(f"\nplay_by_play storage: {sum(before_sizes.values()) / 1e6:.1f} MB -> {sum(after_sizes.values()) / 1e6:.1f} MB")
+    print(f"Database file: {os.path.getsize(args.db) / 1e6:.1f} MB")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,421 @@
+"""
+Fake Stats API
+Local stand-in for the MLB Stats API endpoints the collectors use, for testing and
+throughput benchmarks without touching statsapi.mlb.com.
+
+Serves /api/v1/schedule (games_per_day games on each of `days` days from opening
+day, every one Final) and /api/v1.1/game/<gamePk>/feed/live (a simulated nine
+inning game with box scores, runners and batted ball data, consistent between
+plays and box score). Everything is generated from the gamePk, so the same game
+always comes back the same. --latency-ms adds server wait to each response, like
+the real API.
+
+Point the collectors at it with MLB_API_BASE (see http_session.py):
+
+    python fake_stats_api.py --port 8765 --latency-ms 150
+    MLB_API_BASE=http://127.0.0.1:8765 python async_collector.py --season 2025
+
+Usage:
+    python fake_stats_api.py [--port 8765] [--latency-ms 100] [--games-per-day 15] [--days 180]
+"""
+
+import argparse
+import gzip
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+DEFAULT_PORT = 8765
+OPENING_DAY = "03-27"
+
+TEAM_IDS = [108, 109, 110, 111, 112, 113, 114, 115, 116, 117, 118, 119, 120, 121, 133,
+            134, 135, 136, 137, 138, 139, 140, 141, 142, 143, 144, 145, 146, 147, 158]
+BATTERS_PER_TEAM = 9
+PITCHERS_PER_TEAM = 2
+
+# Plate appearance outcomes and weights
+EVENTS = [
+    ('strikeout', 23), ('field_out', 40), ('walk', 8), ('single', 15),
+    ('double', 5), ('triple', 1), ('home_run', 3),
+]
+BASES_ADVANCED = {'walk': 1, 'single': 1, 'double': 2, 'triple': 3, 'home_run': 4}
+EXTRA_BASE_STATS = {'double': 'doubles', 'triple': 'triples', 'home_run': 'homeRuns'}
+
+# (launch speed, launch angle, distance) ranges per event for balls in play
+BATTED_BALL = {
+    'field_out': ((60, 105), (-20, 60), (20, 380)),
+    'single': ((70, 105), (-5, 20), (80, 250)),
+    'double': ((90, 110), (10, 30), (250, 380)),
+    'triple': ((90, 110), (10, 30), (300, 400)),
+    'home_run': ((100, 115), (22, 35), (370, 450)),
+}
+
+# Home plate in Stats API hit coordinates and feet per coordinate unit
+HOME_X, HOME_Y, FEET_PER_UNIT = 125.42, 198.27, 2.5
+
+
+def game_pk_for(season, day, slot):
+    return season * 100000 + day * 100 + slot
+
+
+def decode_game_pk(game_pk):
+    """(season, day index, slot) for a gamePk from game_pk_for"""
+    return game_pk // 100000, game_pk // 100 % 1000, game_pk % 100
+
+
+def _matchups(season, day):
+    teams = list(TEAM_IDS)
+    random.Random(season * 1000 + day).shuffle(teams)
+    return [(teams[i], teams[i + 1]) for i in range(0, len(teams), 2)]
+
+
+def _game_date(season, day):
+    return date.fromisoformat(f"{season}-{OPENING_DAY}") + timedelta(days=day)
+
+
+def make_schedule(start_date, end_date, games_per_day, days):
+    """Schedule response listing the fake games between two dates"""
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    dates = []
+    for season in range(start.year, end.year + 1):
+        for day in range(days):
+            game_date = _game_date(season, day)
+            if not start <= game_date <= end:
+                continue
+            games = []
+            for slot, (home, away) in enumerate(_matchups(season, day)[:games_per_day]):
+                game_pk = game_pk_for(season, day, slot)
+                home_score, away_score = _final_score(game_pk)
+                games.append({
+                    'gamePk': game_pk,
+                    'gameType': 'R',
+                    'season': str(season),
+                    'gameDate': f"{game_date.isoformat()}T23:05:00Z",
+                    'officialDate': game_date.isoformat(),
+                    'status': {'detailedState': 'Final'},
+                    'teams': {
+                        'home': {'team': {'id': home}, 'score': home_score},
+                        'away': {'team': {'id': away}, 'score': away_score},
+                    },
+                    'venue': {'id': home, 'name': f"Park {home}"},
+                })
+            dates.append({'date': game_date.isoformat(), 'games': games})
+    return {'dates': dates}
+
+
+@lru_cache(maxsize=None)
+def _final_score(game_pk):
+    line = make_feed(game_pk)['liveData']['linescore']['teams']
+    return line['home']['runs'], line['away']['runs']
+
+
+def _roster(team_id):
+    batters = [team_id * 100 + i for i in range(BATTERS_PER_TEAM)]
+    pitchers = [team_id * 100 + 50 + i for i in range(PITCHERS_PER_TEAM)]
+    return batters, pitchers
+
+
+def _person(player_id, pitcher):
+    rnd = random.Random(player_id)
+    return {
+        'id': player_id,
+        'fullName': f"{'Pitcher' if pitcher else 'Batter'} {player_id}",
+        'firstName': 'Pitcher' if pitcher else 'Batter',
+        'lastName': str(player_id),
+        'primaryPosition': {'abbreviation': 'P' if pitcher else rnd.choice(['C', '1B', '2B', '3B', 'SS', 'LF', 'CF', 'RF', 'DH'])},
+        'batSide': {'code': rnd.choice('LRRS')},
+        'pitchHand': {'code': rnd.choice('LRR')},
+    }
+
+
+def _hit_data(rnd, event):
+    speed, angle, distance = (rnd.uniform(*r) for r in BATTED_BALL[event])
+    spray = math.radians(rnd.uniform(-45, 45))
+    if angle < 10:
+        trajectory = 'ground_ball'
+    elif angle < 25:
+        trajectory = 'line_drive'
+    elif angle < 50:
+        trajectory = 'fly_ball'
+    else:
+        trajectory = 'popup'
+    return {
+        'launchSpeed': round(speed, 1),
+        'launchAngle': round(angle, 1),
+        'totalDistance': round(distance),
+        'trajectory': trajectory,
+        'hardness': 'hard' if speed >= 95 else 'medium' if speed >= 80 else 'soft',
+        'location': str(rnd.randint(1, 9)),
+        'coordinates': {
+            'coordX': round(HOME_X + distance / FEET_PER_UNIT * math.sin(spray), 2),
+            'coordY': round(HOME_Y - distance / FEET_PER_UNIT * math.cos(spray), 2),
+        },
+    }
+
+
+def _batting_line():
+    return {key: 0 for key in ('atBats', 'runs', 'hits', 'doubles', 'triples', 'homeRuns', 'rbi',
+                               'baseOnBalls', 'strikeOuts', 'stolenBases', 'caughtStealing',
+                               'hitByPitch', 'sacBunts', 'sacFlies', 'leftOnBase')}
+
+
+def _pitching_line():
+    return {key: 0 for key in ('outs', 'hits', 'runs', 'earnedRuns', 'baseOnBalls', 'strikeOuts',
+                               'homeRuns', 'hitBatsmen', 'numberOfPitches', 'strikes', 'balls',
+                               'wins', 'losses', 'saves', 'holds', 'blownSaves')}
+
+
+def _half_inning(rnd, inning, half, lineup, order, pitcher, batting, pitching, plays):
+    """Simulate one half inning; returns (runs, next lineup position)"""
+    bases = {'1B': None, '2B': None, '3B': None}
+    outs = runs = 0
+    while outs < 3:
+        batter = lineup[order % len(lineup)]
+        order += 1
+        event = rnd.choices([e for e, _ in EVENTS], weights=[w for _, w in EVENTS])[0]
+        runners = []
+        scored = 0
+        if event in BASES_ADVANCED:
+            advance = BASES_ADVANCED[event]
+            new_bases = {'1B': None, '2B': None, '3B': None}
+            for base in ('3B', '2B', '1B'):
+                runner = bases[base]
+                if runner is None:
+                    continue
+                start = int(base[0])
+                if event == 'walk':
+                    # Only runners forced by the batter move up
+                    forced = all(bases[f'{b}B'] is not None for b in range(1, start))
+                    end = start + 1 if forced else start
+                else:
+                    end = start + advance
+                if end == start:
+                    new_bases[base] = runner
+                    continue
+                runners.append((runner, base, 'score' if end > 3 else f'{end}B', False))
+                if end <= 3:
+                    new_bases[f'{end}B'] = runner
+            runners.append((batter, None, 'score' if advance == 4 else f'{advance}B', False))
+            if advance < 4:
+                new_bases[f'{advance}B'] = batter
+            bases = new_bases
+            for runner, _, end, _ in runners:
+                if end == 'score':
+                    scored += 1
+                    batting[runner]['runs'] += 1
+        else:
+            outs += 1
+            runners.append((batter, None, None, True))
+
+        line = batting[batter]
+        pitched = pitching[pitcher]
+        if event == 'walk':
+            line['baseOnBalls'] += 1
+            pitched['baseOnBalls'] += 1
+        else:
+            line['atBats'] += 1
+        if event == 'strikeout':
+            line['strikeOuts'] += 1
+            pitched['strikeOuts'] += 1
+        if event in ('single', 'double', 'triple', 'home_run'):
+            line['hits'] += 1
+            pitched['hits'] += 1
+        if event in EXTRA_BASE_STATS:
+            line[EXTRA_BASE_STATS[event]] += 1
+        if event == 'home_run':
+            pitched['homeRuns'] += 1
+        line['rbi'] += scored
+        pitched['runs'] += scored
+        pitched['earnedRuns'] += scored
+        pitched['outs'] += event in ('strikeout', 'field_out')
+        pitches = rnd.randint(1, 7)
+        pitched['numberOfPitches'] += pitches
+        pitched['strikes'] += (pitches + 1) // 2
+        pitched['balls'] += pitches // 2
+        runs += scored
+
+        play_events = [{'pitchNumber': n + 1} for n in range(pitches)]
+        if event in BATTED_BALL:
+            play_events[-1]['hitData'] = _hit_data(rnd, event)
+        plays.append({
+            'atBatIndex': len(plays),
+            'playEndTime': None,
+            'result': {
+                'type': 'atBat',
+                'eventType': event,
+                'description': f"Batter {batter} {event.replace('_', ' ')}.",
+                'rbi': scored,
+            },
+            'about': {'inning': inning, 'halfInning': half},
+            'count': {'balls': min(pitches // 2, 3), 'strikes': min((pitches + 1) // 2, 2), 'outs': outs},
+            'matchup': {'batter': {'id': batter}, 'pitcher': {'id': pitcher},
+                        'pitchHand': _person(pitcher, True)['pitchHand']},
+            'pitchData': {'pitchType': rnd.choice(['FF', 'SL', 'CH', 'CU', 'SI']), 'startSpeed': round(rnd.uniform(78, 99), 1)},
+            'playEvents': play_events,
+            'runners': [
+                {
+                    'movement': {'start': start, 'end': end, 'isOut': is_out},
+                    'details': {'runner': {'id': runner}},
+                }
+                for runner, start, end, is_out in runners
+            ],
+        })
+    return runs, order
+
+
+def make_feed(game_pk):
+    """Live feed payload for a fake game (same gamePk, same game)"""
+    season, day, slot = decode_game_pk(game_pk)
+    home, away = _matchups(season, day)[slot]
+    rnd = random.Random(game_pk)
+    rosters = {side: _roster(team) for side, team in (('home', home), ('away', away))}
+    batting = {b: _batting_line() for side in rosters for b in rosters[side][0]}
+    pitching = {p: _pitching_line() for side in rosters for p in rosters[side][1]}
+    order = {'home': 0, 'away': 0}
+    score = {'home': 0, 'away': 0}
+    plays = []
+    for inning in range(1, 10):
+        for half, bat, field in (('top', 'away', 'home'), ('bottom', 'home', 'away')):
+            if inning == 9 and half == 'bottom' and score['home'] > score['away']:
+                continue
+            pitcher = rosters[field][1][0 if inning <= 6 else 1]
+            runs, order[bat] = _half_inning(rnd, inning, half, rosters[bat][0], order[bat], pitcher,
+                                            batting, pitching, plays)
+            score[bat] += runs
+
+    players = {}
+    box_teams = {}
+    for side, team_id in (('home', home), ('away', away)):
+        batters, pitchers = rosters[side]
+        box_players = {}
+        for i, batter in enumerate(batters):
+            person = _person(batter, False)
+            players[f'ID{batter}'] = person
+            box_players[f'ID{batter}'] = {
+                'person': {'id': batter, 'fullName': person['fullName']},
+                'position': person['primaryPosition'],
+                'battingOrder': str((i + 1) * 100),
+                'stats': {'batting': batting[batter], 'pitching': {}},
+            }
+        for pitcher in pitchers:
+            person = _person(pitcher, True)
+            players[f'ID{pitcher}'] = person
+            line = dict(pitching[pitcher])
+            outs = line.pop('outs')
+            line['inningsPitched'] = f"{outs // 3}.{outs % 3}"
+            box_players[f'ID{pitcher}'] = {
+                'person': {'id': pitcher, 'fullName': person['fullName']},
+                'position': {'abbreviation': 'P'},
+                'stats': {'batting': {}, 'pitching': line},
+            }
+        box_teams[side] = {'team': {'id': team_id}, 'batters': batters, 'pitchers': pitchers, 'players': box_players}
+
+    game_date = _game_date(season, day)
+    return {
+        'gamePk': game_pk,
+        'gameData': {
+            'game': {'pk': game_pk, 'season': str(season), 'type': 'R'},
+            'datetime': {'officialDate': game_date.isoformat(), 'dateTime': f"{game_date.isoformat()}T23:05:00Z"},
+            'status': {'detailedState': 'Final'},
+            'teams': {'home': {'id': home}, 'away': {'id': away}},
+            'venue': {'id': home, 'name': f"Park {home}"},
+            'weather': {'condition': rnd.choice(['Clear', 'Cloudy', 'Sunny', 'Overcast']),
+                        'temp': str(rnd.randint(55, 95)), 'wind': f"{rnd.randint(0, 20)} mph, Out To CF"},
+            'gameInfo': {'attendance': rnd.randint(15000, 45000), 'gameDurationMinutes': rnd.randint(140, 200)},
+            'players': players,
+        },
+        'liveData': {
+            'plays': {'allPlays': plays},
+            'linescore': {'teams': {'home': {'runs': score['home']}, 'away': {'runs': score['away']}}},
+            'boxscore': {'teams': box_teams},
+        },
+    }
+
+
+FEED_RE = re.compile(r'^/api/v1(?:\.1)?/game/(\d+)/feed/live$')
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    """Keep-alive JSON handler for the schedule and live feed endpoints"""
+
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    latency = 0.0
+    games_per_day = 15
+    days = 180
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        match = FEED_RE.match(url.path)
+        if url.path.endswith('/schedule') and 'startDate' in params and 'endDate' in params:
+            payload = make_schedule(params['startDate'], params['endDate'], self.games_per_day, self.days)
+        elif match:
+            game_pk = int(match.group(1))
+            season, day, slot = decode_game_pk(game_pk)
+            if day >= self.days or slot >= min(self.games_per_day, len(TEAM_IDS) // 2):
+                return self.send_json(404, {'message': f"Object not found: game {game_pk}"})
+            payload = make_feed(game_pk)
+        else:
+            return self.send_json(404, {'message': f"Unknown endpoint {url.path}"})
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_json(200, payload)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_api(port=0, latency_ms=0, games_per_day=15, days=180):
+    """Serve the fake API from a daemon thread; returns (server, base URL for MLB_API_BASE)"""
+    handler = type('Handler', (FakeApiHandler,), {
+        'latency': latency_ms / 1000,
+        'games_per_day': games_per_day,
+        'days': days,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake MLB Stats API (schedule and live feeds)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=float, default=100, help='Added server wait per response')
+    parser.add_argument('--games-per-day', type=int, default=15, help='Games per scheduled day (max 15)')
+    parser.add_argument('--days', type=int, default=180, help='Days of games from opening day')
+    args = parser.parse_args()
+
+    server, url = start_fake_api(args.port, args.latency_ms, args.games_per_day, args.days)
+    print(f"Fake Stats API on {url} ({args.games_per_day} games/day for {args.days} days, "
+          f"{args.latency_ms:.0f} ms latency); set MLB_API_BASE={url}. Ctrl-C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
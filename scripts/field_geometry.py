@@ -0,0 +1,171 @@
+"""
+Field Geometry
+Shared coordinate frame and per-park field geometry for spray charts and batted-ball classification.
+
+Coordinates are feet with home plate at (0, 0), +y toward center field and +x
+toward right field. statcast_transform() converts the stored hit coordinates
+(play_by_play.coord_x / coord_y) into this frame.
+
+Each park's fence is built once from its published distances (left field line,
+left-center, center, right-center, right field line) as a NumPy polyline and
+cached by venue_id, so batch rendering and classification reuse the same arrays.
+Parks without an entry get DEFAULT_DIMENSIONS.
+"""
+
+from functools import lru_cache
+
+
+FOUL_LINE_ANGLE = 45.0
+BASE_DISTANCE = 90.0
+MOUND_DISTANCE = 60.5
+FENCE_POINTS = 181  # every half degree from foul line to foul line
+
+# Spray angle of each published distance: LF line, LC, CF, RC, RF line
+CONTROL_ANGLES = (-45.0, -22.5, 0.0, 22.5, 45.0)
+DEFAULT_DIMENSIONS = (330, 375, 400, 375, 330)
+
+# venue_id -> (name, (LF, LC, CF, RC, RF) in feet)
+PARK_DIMENSIONS = {
+    1: ('Angel Stadium', (347, 390, 396, 370, 350)),
+    2: ('Oriole Park at Camden Yards', (333, 384, 400, 373, 318)),
+    3: ('Fenway Park', (310, 379, 390, 380, 302)),
+    4: ('Rate Field', (330, 375, 400, 375, 335)),
+    5: ('Progressive Field', (325, 370, 400, 375, 325)),
+    7: ('Kauffman Stadium', (330, 387, 410, 387, 330)),
+    10: ('Oakland Coliseum', (330, 388, 400, 388, 330)),
+    12: ('Tropicana Field', (315, 370, 404, 370, 322)),
+    14: ('Rogers Centre', (328, 368, 400, 359, 328)),
+    15: ('Chase Field', (330, 374, 407, 374, 334)),
+    17: ('Wrigley Field', (355, 368, 400, 368, 353)),
+    19: ('Coors Field', (347, 390, 415, 375, 350)),
+    22: ('Dodger Stadium', (330, 375, 395, 375, 330)),
+    31: ('PNC Park', (325, 389, 399, 375, 320)),
+    32: ('American Family Field', (344, 371, 400, 374, 345)),
+    680: ('T-Mobile Park', (331, 378, 401, 381, 326)),
+    2392: ('Daikin Park', (315, 362, 409, 373, 326)),
+    2394: ('Comerica Park', (342, 370, 412, 365, 330)),
+    2395: ('Oracle Park', (339, 364, 391, 415, 309)),
+    2523: ('George M. Steinbrenner Field', (318, 399, 408, 385, 314)),
+    2529: ('Sutter Health Park', (330, 388, 403, 388, 325)),
+    2602: ('Great American Ball Park', (328, 379, 404, 370, 325)),
+    2680: ('Petco Park', (334, 357, 396, 382, 322)),
+    2681: ('Citizens Bank Park', (329, 374, 401, 369, 330)),
+    2889: ('Busch Stadium', (336, 375, 400, 375, 335)),
+    3289: ('Citi Field', (335, 358, 408, 375, 330)),
+    3309: ('Nationals Park', (336, 377, 402, 370, 335)),
+    3312: ('Target Field', (339, 377, 404, 367, 328)),
+    3313: ('Yankee Stadium', (318, 399, 408, 385, 314)),
+    4169: ('loanDepot park', (344, 386, 400, 387, 335)),
+    4705: ('Truist Park', (335, 385, 400, 375, 325)),
+    5325: ('Globe Life Field', (329, 372, 407, 374, 326)),
+}
+
+
+def statcast_transform(hc_x, hc_y):
+    """Stored hit coordinates -> feet from home plate (scalars or arrays)"""
+    x = 2.5 * (hc_x - 125.42)
+    y = 2.5 * (198.27 - hc_y)
+    return x, y
+
+
+def spray_angle(x, y):
+    """Degrees from straight-away center; negative toward left field"""
+    import numpy as np
+
+    return np.degrees(np.arctan2(x, y))
+
+
+def distance(x, y):
+    import numpy as np
+
+    return np.hypot(x, y)
+
+
+def is_foul(x, y):
+    """True outside the foul lines (or behind home plate)"""
+    import numpy as np
+
+    return (np.abs(spray_angle(x, y)) > FOUL_LINE_ANGLE) | (np.asarray(y) < 0)
+
+
+class VenueGeometry:
+    """Fence polyline and diamond for one park, in the shared frame (read-only arrays)"""
+
+    def __init__(self, venue_id, name, dimensions):
+        import numpy as np
+
+        self.venue_id = venue_id
+        self.name = name
+        self.dimensions = tuple(dimensions)
+        self.fence_angles = np.linspace(-FOUL_LINE_ANGLE, FOUL_LINE_ANGLE, FENCE_POINTS)
+        self.fence_distances = np.interp(self.fence_angles, CONTROL_ANGLES, self.dimensions)
+        rad = np.deg2rad(self.fence_angles)
+        self.fence = np.column_stack([self.fence_distances * np.sin(rad), self.fence_distances * np.cos(rad)])
+        side = BASE_DISTANCE / np.sqrt(2)
+        # home, first, second, third
+        self.bases = np.array([[0.0, 0.0], [side, side], [0.0, 2 * side], [-side, side]])
+        self.mound = np.array([0.0, MOUND_DISTANCE])
+        for arr in (self.fence_angles, self.fence_distances, self.fence, self.bases, self.mound):
+            arr.flags.writeable = False
+
+    def fence_distance(self, angle):
+        """Fence distance in feet at a spray angle (NaN in foul territory)"""
+        import numpy as np
+
+        return np.interp(angle, self.fence_angles, self.fence_distances, left=np.nan, right=np.nan)
+
+    def clears_fence(self, x, y):
+        """True where a batted ball landed fair and beyond this park's fence"""
+        import numpy as np
+
+        with np.errstate(invalid='ignore'):
+            return ~is_foul(x, y) & (distance(x, y) >= self.fence_distance(spray_angle(x, y)))
+
+    def __repr__(self):
+        return f"VenueGeometry({self.venue_id!r}, {self.name!r}, {self.dimensions})"
+
+
+@lru_cache(maxsize=None)
+def get_venue(venue_id=None):
+    """Geometry for a venue_id, built on first use; None or unknown parks get the generic field"""
+    if venue_id in PARK_DIMENSIONS:
+        name, dimensions = PARK_DIMENSIONS[venue_id]
+        return VenueGeometry(venue_id, name, dimensions)
+    return VenueGeometry(venue_id, 'Generic field', DEFAULT_DIMENSIONS)
+
+
+def find_venue(venue, conn=None):
+    """
+    Resolve a --venue argument (venue_id or part of a park name) to its geometry.
+    Names are matched against the registry, then games.venue_name when conn is given.
+    """
+    if venue is None:
+        return get_venue()
+    if str(venue).isdigit():
+        return get_venue(int(venue))
+    needle = venue.lower()
+    for venue_id, (name, _) in PARK_DIMENSIONS.items():
+        if needle in name.lower():
+            return get_venue(venue_id)
+    if conn is not None:
+        row = conn.execute(
+            "SELECT venue_id FROM games WHERE venue_name LIKE ? AND venue_id IS NOT NULL LIMIT 1", (f"%{venue}%",)
+        ).fetchone()
+        if row:
+            return get_venue(row[0])
+    raise ValueError(f"Unknown venue '{venue}'")
+
+
+def clears_fence(x, y, venue_ids):
+    """Per-ball fence check against the park each ball was hit in (arrays of equal length)"""
+    import numpy as np
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Missing venue_ids (None/NaN) use the generic field
+    venue_ids = np.array([None if v is None or v != v else int(v) for v in venue_ids], dtype=object)
+    result = np.zeros(len(x), dtype=bool)
+    for venue_id in set(venue_ids.tolist()):
+        mask = venue_ids == venue_id
+        result[mask] = get_venue(venue_id).clears_fence(x[mask], y[mask])
+    return result
@@ -1,33 +1,36 @@
 import numpy as np
 import csv
 
-# Foul territory check: returns True if point is outside the lines from home to 1st/3rd base to outfield fence
-# We'll use the same transformation as the plot
+import field_geometry
+from classify_batted_balls import OUT_EVENTS
 
-def is_foul(x, y):
-    # Foul lines: from home (0,0) to fence_x[0], fence_y[0] (left) and fence_x[-1], fence_y[-1] (right)
-    # For simplicity, use angles: left = -45 deg, right = 45 deg
-    # A point is fair if between these angles and y > 0
-    angle = np.degrees(np.arctan2(x, y))
-    return (angle < -45 or angle > 45 or y < 0)
+# Foul territory check uses the shared field frame (field_geometry), the same one the
+# charts and the batted_ball_classes table use. For the whole database, prefer:
+#   python scripts/classify_batted_balls.py --report foul-nonouts
 
-results = []
+rows = []
 with open('data/harper_2025_batted_balls_with_type.csv') as f:
     reader = csv.reader(f, delimiter='|')
     for row in reader:
         if len(row) >= 3:
             try:
-                hc_x = float(row[0])
-                hc_y = float(row[1])
-                event_type = row[2].strip()
-                location_x = 2.5 * (hc_x - 125.42)
-                location_y = 2.5 * (198.27 - hc_y)
-                if is_foul(location_x, location_y) and 'out' not in event_type:
-                    results.append((location_x, location_y, event_type))
+                rows.append((float(row[0]), float(row[1]), row[2].strip()))
             except ValueError:
                 continue
 
+hc_x = np.array([r[0] for r in rows], dtype=float)
+hc_y = np.array([r[1] for r in rows], dtype=float)
+x, y = field_geometry.statcast_transform(hc_x, hc_y)
+angle = field_geometry.spray_angle(x, y)
+foul = field_geometry.is_foul(x, y)
+
+results = [
+    (x[i], y[i], angle[i], event_type)
+    for i, (_, _, event_type) in enumerate(rows)
+    if foul[i] and event_type not in OUT_EVENTS
+]
+
 print('Non-out batted balls in foul territory:')
-for x, y, event in results:
-    print(f'Event: {event:12s}  x: {x:7.2f}  y: {y:7.2f}  angle: {np.degrees(np.arctan2(x, y)):.1f}')
+for px, py, a, event in results:
+    print(f'Event: {event:12s}  x: {px:7.2f}  y: {py:7.2f}  angle: {a:.1f}')
 print(f'Total: {len(results)}')
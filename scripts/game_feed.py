@@ -0,0 +1,356 @@
+"""
+Game Feed Parsing
+Builds the games row, box scores and play-by-play for a game from a single live feed request.
+
+statsapi.boxscore_data already downloads the full live feed and turns it into
+display strings, and play-by-play is a second request on top of that. The live
+feed (/api/v1.1/game/{gamePk}/feed/live) has everything as typed numbers, so one
+request per game is enough.
+"""
+
+import statsapi
+
+import audit_games
+import classify_batted_balls
+import compact_play_by_play
+import pitcher_summary
+import result_cache
+import run_expectancy
+import splits_cube
+import x_outcome
+
+
+PLAY_COLUMNS = [
+    'game_id', 'play_id', 'inning', 'half_inning', 'at_bat_index', 'pitch_number',
+    'event_type', 'event_description', 'result_type', 'batter_id', 'pitcher_id', 'pitch_hand',
+    'runner_on_first_id', 'runner_on_second_id', 'runner_on_third_id',
+    'outs', 'balls', 'strikes', 'count', 'pitch_type', 'pitch_speed', 'runs_scored', 'rbi',
+    'launch_speed', 'launch_angle', 'total_distance', 'trajectory', 'hardness', 'location', 'coord_x', 'coord_y',
+]
+
+BATTING_COLUMNS = [
+    'game_id', 'player_id', 'team_id', 'batting_order', 'position',
+    'at_bats', 'runs', 'hits', 'doubles', 'triples', 'home_runs', 'rbi', 'walks', 'strikeouts',
+    'stolen_bases', 'caught_stealing', 'hit_by_pitch', 'sacrifice_hits', 'sacrifice_flies', 'left_on_base',
+]
+
+PITCHING_COLUMNS = [
+    'game_id', 'player_id', 'team_id',
+    'innings_pitched', 'hits_allowed', 'runs_allowed', 'earned_runs', 'walks', 'strikeouts',
+    'home_runs_allowed', 'hit_batsmen', 'pitches_thrown', 'strikes', 'balls',
+    'win', 'loss', 'save', 'hold', 'blown_save',
+]
+
+PLAYER_COLUMNS = ['player_id', 'full_name', 'first_name', 'last_name', 'position', 'bat_side', 'pitch_hand']
+
+# live feed stat key -> box_scores_batting column
+BATTING_STATS = [
+    ('atBats', 'at_bats'), ('runs', 'runs'), ('hits', 'hits'), ('doubles', 'doubles'),
+    ('triples', 'triples'), ('homeRuns', 'home_runs'), ('rbi', 'rbi'), ('baseOnBalls', 'walks'),
+    ('strikeOuts', 'strikeouts'), ('stolenBases', 'stolen_bases'), ('caughtStealing', 'caught_stealing'),
+    ('hitByPitch', 'hit_by_pitch'), ('sacBunts', 'sacrifice_hits'), ('sacFlies', 'sacrifice_flies'),
+    ('leftOnBase', 'left_on_base'),
+]
+
+# live feed stat key -> box_scores_pitching column (innings_pitched handled separately)
+PITCHING_STATS = [
+    ('hits', 'hits_allowed'), ('runs', 'runs_allowed'), ('earnedRuns', 'earned_runs'),
+    ('baseOnBalls', 'walks'), ('strikeOuts', 'strikeouts'), ('homeRuns', 'home_runs_allowed'),
+    ('hitBatsmen', 'hit_batsmen'), ('numberOfPitches', 'pitches_thrown'), ('strikes', 'strikes'),
+    ('balls', 'balls'), ('wins', 'win'), ('losses', 'loss'), ('saves', 'save'), ('holds', 'hold'),
+    ('blownSaves', 'blown_save'),
+]
+
+
+def fetch_game_feed(game_pk):
+    """Fetch the full live feed for a game (one request)"""
+    return statsapi.get('game', {'gamePk': game_pk})
+
+
+def to_int(val):
+    """Convert a feed value to int, None if missing or not numeric"""
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_game_row(feed):
+    """Return the games columns (including weather, attendance and duration) as a dict"""
+    game_data = feed.get('gameData', {})
+    game = game_data.get('game', {})
+    teams = game_data.get('teams', {})
+    venue = game_data.get('venue', {})
+    weather = game_data.get('weather', {})
+    info = game_data.get('gameInfo', {})
+    datetime_info = game_data.get('datetime', {})
+    line_teams = feed.get('liveData', {}).get('linescore', {}).get('teams', {})
+    return {
+        'game_pk': feed.get('gamePk', game.get('pk')),
+        'game_date': datetime_info.get('officialDate'),
+        'game_datetime': datetime_info.get('dateTime'),
+        'season': to_int(game.get('season')),
+        'game_type': game.get('type'),
+        'status': game_data.get('status', {}).get('detailedState'),
+        'home_team_id': teams.get('home', {}).get('id'),
+        'away_team_id': teams.get('away', {}).get('id'),
+        'home_score': line_teams.get('home', {}).get('runs'),
+        'away_score': line_teams.get('away', {}).get('runs'),
+        'venue_name': venue.get('name'),
+        'venue_id': venue.get('id'),
+        'weather_condition': weather.get('condition'),
+        'weather_temp': to_int(weather.get('temp')),
+        'wind': weather.get('wind'),
+        'attendance': to_int(info.get('attendance')),
+        'game_duration_minutes': to_int(info.get('gameDurationMinutes')),
+    }
+
+
+def parse_players(feed):
+    """Return player rows for everyone listed in the game"""
+    rows = []
+    for person in feed.get('gameData', {}).get('players', {}).values():
+        rows.append((
+            person.get('id'),
+            person.get('fullName', ''),
+            person.get('firstName', ''),
+            person.get('lastName', ''),
+            person.get('primaryPosition', {}).get('abbreviation', ''),
+            person.get('batSide', {}).get('code', ''),
+            person.get('pitchHand', {}).get('code', ''),
+        ))
+    return rows
+
+
+def parse_box_scores(feed, game_id):
+    """Return (batting_rows, pitching_rows) as tuples in BATTING_COLUMNS / PITCHING_COLUMNS order"""
+    batting_rows = []
+    pitching_rows = []
+    box_teams = feed.get('liveData', {}).get('boxscore', {}).get('teams', {})
+    for team_key in ['away', 'home']:
+        team = box_teams.get(team_key, {})
+        team_id = team.get('team', {}).get('id')
+        players = team.get('players', {})
+
+        for player_id in team.get('batters', []):
+            player = players.get(f'ID{player_id}', {})
+            stats = player.get('stats', {}).get('batting', {})
+            batting_order = to_int(player.get('battingOrder'))
+            batting_rows.append((
+                game_id,
+                player_id,
+                team_id,
+                batting_order // 100 if batting_order else None,
+                player.get('position', {}).get('abbreviation'),
+                *(stats.get(key, 0) for key, _ in BATTING_STATS),
+            ))
+
+        for player_id in team.get('pitchers', []):
+            player = players.get(f'ID{player_id}', {})
+            stats = player.get('stats', {}).get('pitching', {})
+            try:
+                # Stored the same way the legacy path does: "5.2" -> 5.2
+                innings_pitched = float(stats.get('inningsPitched', 0))
+            except (TypeError, ValueError):
+                innings_pitched = 0.0
+            pitching_rows.append((
+                game_id,
+                player_id,
+                team_id,
+                innings_pitched,
+                *(stats.get(key, 0) for key, _ in PITCHING_STATS),
+            ))
+    return batting_rows, pitching_rows
+
+
+def advance_runners(bases, runners):
+    """
+    Apply a play's runner movements to bases ({'1B': id, ...}, the state before the
+    play); returns the runs scored. runners only lists runners involved in the play,
+    so anyone not moved stays where they were.
+    """
+    runs = 0
+    for r in runners:
+        movement = r.get('movement', {})
+        runner_id = r.get('details', {}).get('runner', {}).get('id')
+        for base, occupant in list(bases.items()):
+            if occupant == runner_id:
+                bases[base] = None
+        end = movement.get('end')
+        if end == 'score':
+            runs += 1
+        elif end in bases and not movement.get('isOut'):
+            bases[end] = runner_id
+    return runs
+
+
+def parse_play(play, game_id, bases=None):
+    """
+    Return one play_by_play row (PLAY_COLUMNS order) for an allPlays entry.
+    bases is the runner state before the play in the same half inning (updated in place).
+    """
+    event = play.get('result', {})
+    matchup = play.get('matchup', {})
+    pitch = play.get('pitchData', {})
+    runners = play.get('runners', [])
+    about = play.get('about', {})
+    count = play.get('count', {})
+
+    runner_ids = bases if bases is not None else {'1B': None, '2B': None, '3B': None}
+    runs_scored = advance_runners(runner_ids, runners)
+
+    balls = count.get('balls')
+    strikes = count.get('strikes')
+    count_str = f"{balls}-{strikes}" if balls is not None and strikes is not None else None
+
+    # Batted ball (hitData) lives on the pitch event that put the ball in play
+    hit_data = None
+    for ev in play.get('playEvents', []):
+        if ev.get('hitData'):
+            hit_data = ev['hitData']
+            break
+    hit_data = hit_data or {}
+    coordinates = hit_data.get('coordinates', {})
+
+    return (
+        game_id,
+        play.get('playId'),
+        about.get('inning'),
+        about.get('halfInning'),
+        play.get('atBatIndex'),
+        play.get('playEndTime', None),  # Not always available
+        event.get('eventType'),
+        event.get('description'),
+        event.get('type'),
+        matchup.get('batter', {}).get('id'),
+        matchup.get('pitcher', {}).get('id'),
+        matchup.get('pitchHand', {}).get('code'),
+        runner_ids['1B'],
+        runner_ids['2B'],
+        runner_ids['3B'],
+        count.get('outs'),
+        balls,
+        strikes,
+        count_str,
+        pitch.get('pitchType') if pitch else None,
+        pitch.get('startSpeed') if pitch else None,
+        runs_scored,
+        event.get('rbi', 0),
+        hit_data.get('launchSpeed'),
+        hit_data.get('launchAngle'),
+        hit_data.get('totalDistance'),
+        hit_data.get('trajectory'),
+        hit_data.get('hardness'),
+        hit_data.get('location'),
+        coordinates.get('coordX'),
+        coordinates.get('coordY'),
+    )
+
+
+def parse_plays(all_plays, game_id):
+    """Return play_by_play rows for a list of allPlays entries, carrying runners through each half inning"""
+    rows = []
+    half_inning = None
+    for play in all_plays:
+        about = play.get('about', {})
+        if (about.get('inning'), about.get('halfInning')) != half_inning:
+            half_inning = (about.get('inning'), about.get('halfInning'))
+            bases = {'1B': None, '2B': None, '3B': None}
+        rows.append(parse_play(play, game_id, bases))
+    return rows
+
+
+def parse_feed(feed, game_id):
+    """Parse everything the collector stores for a game out of one live feed payload"""
+    batting_rows, pitching_rows = parse_box_scores(feed, game_id)
+    all_plays = feed.get('liveData', {}).get('plays', {}).get('allPlays', [])
+    return {
+        'game': parse_game_row(feed),
+        'players': parse_players(feed),
+        'batting': batting_rows,
+        'pitching': pitching_rows,
+        'plays': parse_plays(all_plays, game_id),
+    }
+
+
+def _insert_sql(table, columns, verb='INSERT'):
+    return f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+
+
+INSERT_PLAY_SQL = _insert_sql('play_by_play', PLAY_COLUMNS)
+INSERT_BATTING_SQL = _insert_sql('box_scores_batting', BATTING_COLUMNS, 'INSERT OR REPLACE')
+INSERT_PITCHING_SQL = _insert_sql('box_scores_pitching', PITCHING_COLUMNS, 'INSERT OR REPLACE')
+
+# Fill in handedness/position left blank by earlier box score inserts
+UPSERT_PLAYER_SQL = _insert_sql('players', PLAYER_COLUMNS) + """
+    ON CONFLICT(player_id) DO UPDATE SET
+        bat_side = COALESCE(NULLIF(players.bat_side, ''), excluded.bat_side),
+        pitch_hand = COALESCE(NULLIF(players.pitch_hand, ''), excluded.pitch_hand),
+        position = COALESCE(NULLIF(players.position, ''), excluded.position)
+"""
+
+UPDATE_GAME_SQL = """
+    UPDATE games SET
+        game_datetime = COALESCE(?, game_datetime),
+        status = COALESCE(?, status),
+        home_score = COALESCE(?, home_score),
+        away_score = COALESCE(?, away_score),
+        venue_name = COALESCE(?, venue_name),
+        venue_id = COALESCE(?, venue_id),
+        weather_condition = ?,
+        weather_temp = ?,
+        wind = ?,
+        attendance = ?,
+        game_duration_minutes = ?
+    WHERE game_id = ?
+"""
+
+
+def remove_derived(cursor, game_id):
+    """Drop a game's derived rows before anything they were computed from changes"""
+    compact_play_by_play.ensure_play_columns(cursor)
+    # Versions are bumped before and after, so players dropped from a re-collected game are covered too
+    result_cache.bump_game(cursor, game_id)
+    classify_batted_balls.delete_game(cursor, game_id)
+    splits_cube.remove_game(cursor, game_id)
+    pitcher_summary.remove_game(cursor, game_id)
+    run_expectancy.delete_game(cursor, game_id)
+    x_outcome.delete_game(cursor, game_id)
+
+
+def replace_plays(cursor, game_id, plays):
+    """Replace a game's plays and rebuild its derived rows (after remove_derived)"""
+    # Replace rather than append so re-collecting a game doesn't duplicate plays
+    cursor.execute("DELETE FROM play_by_play WHERE game_id = ?", (game_id,))
+    cursor.executemany(INSERT_PLAY_SQL, plays)
+    splits_cube.mark_runner_state(cursor, game_id)
+    classify_batted_balls.classify_game(cursor, game_id)
+    splits_cube.add_game(cursor, game_id)
+    pitcher_summary.add_game(cursor, game_id)
+    x_outcome.score_game(cursor, game_id)
+
+
+def write_plays(cursor, game_id, plays):
+    """Replace only a game's plays (see parse_plays) in the caller's transaction; returns rows written"""
+    remove_derived(cursor, game_id)
+    replace_plays(cursor, game_id, plays)
+    result_cache.bump_game(cursor, game_id)
+    return len(plays)
+
+
+def write_game(cursor, game_id, parsed):
+    """Write a parsed game (see parse_feed) in the caller's transaction; returns rows written"""
+    remove_derived(cursor, game_id)
+    game = parsed['game']
+    cursor.execute(UPDATE_GAME_SQL, (
+        game['game_datetime'], game['status'], game['home_score'], game['away_score'],
+        game['venue_name'], game['venue_id'], game['weather_condition'], game['weather_temp'],
+        game['wind'], game['attendance'], game['game_duration_minutes'], game_id,
+    ))
+    cursor.executemany(UPSERT_PLAYER_SQL, parsed['players'])
+    cursor.executemany(INSERT_BATTING_SQL, parsed['batting'])
+    cursor.executemany(INSERT_PITCHING_SQL, parsed['pitching'])
+    replace_plays(cursor, game_id, parsed['plays'])
+    audit_games.audit_game(cursor, game_id)
+    result_cache.bump_game(cursor, game_id)
+    return len(parsed['batting']) + len(parsed['pitching']) + len(parsed['plays'])
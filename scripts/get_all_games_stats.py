@@ -10,22 +10,36 @@ import time
 import argparse
 import logging
 
+import async_collector
+import audit_games
+import batted_ball_store
+import game_feed
+import http_session
+import result_cache
+import schedule_sync
+import season_db
+
 
 DB_PATH = "../data/mlb_data.db"
 
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('../logs/mlb_collection.log'),
-        logging.StreamHandler()
-    ]
-)
+LOG_PATH = "../logs/mlb_collection.log"
+
 logger = logging.getLogger(__name__)
 
 
+def setup_logging(log_path=LOG_PATH):
+    """Log to the console and the collection log; called from main() so importers keep their own setup"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_path),
+            logging.StreamHandler()
+        ]
+    )
+
+
 class MLBStatsCollector:
     def collect_play_by_play(self, game_pk, game_id):
         """Collect and insert play-by-play data for a game, including batted ball data"""
@@ -36,101 +50,9 @@ class MLBStatsCollector:
                 logger.warning(f"No play-by-play data for game {game_pk}")
                 return 0
             conn = sqlite3.connect(self.db_path, timeout=30.0)
-            cursor = conn.cursor()
-            inserted = 0
-            for play in all_plays:
-                event = play.get('result', {})
-                matchup = play.get('matchup', {})
-                pitch = play.get('pitchData', {})
-                runners = play.get('runners', [])
-                # Basic info
-                inning = play.get('about', {}).get('inning')
-                half_inning = play.get('about', {}).get('halfInning')
-                at_bat_index = play.get('atBatIndex')
-                pitch_number = play.get('playEndTime', None)  # Not always available
-                event_type = event.get('eventType')
-                event_description = event.get('description')
-                result_type = event.get('type')
-                batter_id = matchup.get('batter', {}).get('id')
-                pitcher_id = matchup.get('pitcher', {}).get('id')
-                runner_on_first_id = None
-                runner_on_second_id = None
-                runner_on_third_id = None
-                if runners:
-                    for r in runners:
-                        base = r.get('movement', {}).get('end')
-                        if base == '1B':
-                            runner_on_first_id = r.get('details', {}).get('runner', {}).get('id')
-                        elif base == '2B':
-                            runner_on_second_id = r.get('details', {}).get('runner', {}).get('id')
-                        elif base == '3B':
-                            runner_on_third_id = r.get('details', {}).get('runner', {}).get('id')
-                outs = play.get('count', {}).get('outs')
-                balls = play.get('count', {}).get('balls')
-                strikes = play.get('count', {}).get('strikes')
-                count_str = f"{balls}-{strikes}" if balls is not None and strikes is not None else None
-                pitch_type = pitch.get('pitchType') if pitch else None
-                pitch_speed = pitch.get('startSpeed') if pitch else None
-                runs_scored = event.get('runners', [{}])[0].get('runs', 0) if event.get('runners') else 0
-                rbi = event.get('rbi', 0)
-
-                # Extract batted ball (hitData) from playEvents
-                hitData = None
-                if 'playEvents' in play:
-                    for ev in play['playEvents']:
-                        if 'hitData' in ev and ev['hitData']:
-                            hitData = ev['hitData']
-                            break
-                launch_speed = hitData.get('launchSpeed') if hitData else None
-                launch_angle = hitData.get('launchAngle') if hitData else None
-                total_distance = hitData.get('totalDistance') if hitData else None
-                trajectory = hitData.get('trajectory') if hitData else None
-                hardness = hitData.get('hardness') if hitData else None
-                location = hitData.get('location') if hitData else None
-                coord_x = hitData.get('coordinates', {}).get('coordX') if hitData and 'coordinates' in hitData else None
-                coord_y = hitData.get('coordinates', {}).get('coordY') if hitData and 'coordinates' in hitData else None
-
-                cursor.execute('''
-                    INSERT INTO play_by_play (
-                        game_id, play_id, inning, half_inning, at_bat_index, pitch_number,
-                        event_type, event_description, result_type, batter_id, pitcher_id,
-                        runner_on_first_id, runner_on_second_id, runner_on_third_id,
-                        outs, balls, strikes, count, pitch_type, pitch_speed, runs_scored, rbi,
-                        launch_speed, launch_angle, total_distance, trajectory, hardness, location, coord_x, coord_y
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    game_id,
-                    play.get('playId'),
-                    inning,
-                    half_inning,
-                    at_bat_index,
-                    pitch_number,
-                    event_type,
-                    event_description,
-                    result_type,
-                    batter_id,
-                    pitcher_id,
-                    runner_on_first_id,
-                    runner_on_second_id,
-                    runner_on_third_id,
-                    outs,
-                    balls,
-                    strikes,
-                    count_str,
-                    pitch_type,
-                    pitch_speed,
-                    runs_scored,
-                    rbi,
-                    launch_speed,
-                    launch_angle,
-                    total_distance,
-                    trajectory,
-                    hardness,
-                    location,
-                    coord_x,
-                    coord_y
-                ))
-                inserted += 1
+            rows = game_feed.parse_plays(all_plays, game_id)
+            # Same replace sequence as the live feed path, so re-running a game doesn't duplicate plays
+            inserted = game_feed.write_plays(conn.cursor(), game_id, rows)
             conn.commit()
             conn.close()
             logger.info(f"Inserted {inserted} play-by-play events for game {game_pk}")
@@ -138,10 +60,31 @@ class MLBStatsCollector:
         except Exception as e:
             logger.error(f"Error collecting play-by-play for game {game_pk}: {e}")
             return 0
+
+    def collect_game_feed(self, game_pk, game_id):
+        """Collect game details, box scores and play-by-play from one live feed request"""
+        try:
+            feed = game_feed.fetch_game_feed(game_pk)
+            parsed = game_feed.parse_feed(feed, game_id)
+            if not parsed['batting'] and not parsed['plays']:
+                logger.warning(f"No box score or play-by-play data in feed for game {game_pk}")
+                return 0, 0
+
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            with conn:
+                game_feed.write_game(conn.cursor(), game_id, parsed)
+            conn.close()
+            return len(parsed['batting']) + len(parsed['pitching']), len(parsed['plays'])
+        except Exception as e:
+            logger.error(f"Error collecting live feed for game {game_pk}: {e}")
+            self.errors += 1
+            return 0, 0
+
     """Comprehensive MLB stats collector"""
     
     def __init__(self, db_path=DB_PATH):
         self.db_path = db_path
+        http_session.install_statsapi()
         self.stats_collected = 0
         self.games_processed = 0
         self.errors = 0
@@ -310,6 +253,7 @@ class MLBStatsCollector:
                         logger.debug(f"Error inserting pitcher {player_id}: {e}")
                         continue
             
+            result_cache.bump_game(cursor, game_id)
             conn.commit()
             conn.close()
             
@@ -321,85 +265,40 @@ class MLBStatsCollector:
             return 0
     
     def collect_season_schedule(self, season, team_id=None):
-        """Collect all games for a season in monthly chunks"""
+        """Sync all games for a season from one ranged schedule request"""
         logger.info(f"Collecting schedule for {season} season...")
-        
-        # MLB season: March (spring) to November (World Series)
-        # Collect in monthly chunks to avoid API timeouts
-        months = [
-            (f"{season}-03-01", f"{season}-03-31"),  # Spring training
-            (f"{season}-04-01", f"{season}-04-30"),  # April
-            (f"{season}-05-01", f"{season}-05-31"),  # May
-            (f"{season}-06-01", f"{season}-06-30"),  # June
-            (f"{season}-07-01", f"{season}-07-31"),  # July
-            (f"{season}-08-01", f"{season}-08-31"),  # August
-            (f"{season}-09-01", f"{season}-09-30"),  # September
-            (f"{season}-10-01", f"{season}-10-31"),  # October (playoffs)
-            (f"{season}-11-01", f"{season}-11-15"),  # November (World Series)
-        ]
-        
-        all_schedule = []
-        for start_date, end_date in months:
-            try:
-                if team_id:
-                    schedule = statsapi.schedule(
-                        start_date=start_date, 
-                        end_date=end_date,
-                        team=team_id
-                    )
-                else:
-                    schedule = statsapi.schedule(
-                        start_date=start_date, 
-                        end_date=end_date
-                    )
-                all_schedule.extend(schedule)
-                logger.info(f"  {start_date} to {end_date}: {len(schedule)} games")
-                time.sleep(1)  # Rate limiting
-            except Exception as e:
-                logger.warning(f"Error fetching {start_date} to {end_date}: {e}")
-                continue
-        
-        schedule = all_schedule
-        
+
+        try:
+            schedule = schedule_sync.fetch_season_schedule(season, team_id)
+        except Exception as e:
+            logger.error(f"Error fetching {season} schedule: {e}")
+            self.errors += 1
+            return None
+        rows = schedule_sync.schedule_rows(schedule)
+
         conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        
-        inserted = 0
-        for game in schedule:
-            try:
-                # Parse game date
-                game_date = datetime.strptime(game['game_date'], '%Y-%m-%d').date()
-                
-                cursor.execute("""
-                    INSERT OR REPLACE INTO games (
-                        game_pk, game_date, season, game_type, status,
-                        home_team_id, away_team_id, home_score, away_score,
-                        venue_name
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    game['game_id'],
-                    game_date,
-                    game.get('season', game_date.year),
-                    game.get('game_type', 'R'),
-                    game.get('status', 'Unknown'),
-                    game['home_id'],
-                    game['away_id'],
-                    game.get('home_score', None),
-                    game.get('away_score', None),
-                    game.get('venue_name', '')
-                ))
-                inserted += 1
-            except Exception as e:
-                logger.error(f"Error inserting game {game.get('game_id')}: {e}")
-        
-        conn.commit()
+        counts = schedule_sync.sync_games(conn, rows)
         conn.close()
-        
-        logger.info(f"Inserted {inserted} games for {season} season")
-        return inserted
+
+        logger.info(f"{season} schedule: {len(rows)} games - {counts['inserted']} inserted, "
+                    f"{counts['updated']} updated, {counts['unchanged']} unchanged")
+        return counts
     
-    def collect_season_stats(self, season, resume_from_game=None):
-        """Collect all stats for a season"""
+    def collect_game(self, game_pk, game_date, home_id, away_id, game_id, use_feed=False):
+        """Collect box score and play-by-play for one game; returns (stats, plays)"""
+        if use_feed:
+            return self.collect_game_feed(game_pk, game_id)
+        stats = self.collect_boxscore(game_pk, game_date, home_id, away_id)
+        plays = self.collect_play_by_play(game_pk, game_id)
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        with conn:
+            audit_games.audit_game(conn.cursor(), game_id)
+        conn.close()
+        return stats, plays
+
+    def collect_season_stats(self, season, resume_from_game=None, use_feed=False,
+                             fetchers=async_collector.DEFAULT_FETCHERS):
+        """Collect all stats for a season (with use_feed, through the async pipeline in async_collector.py)"""
         logger.info(f"="*70)
         logger.info(f"COLLECTING ALL STATS FOR {season} SEASON")
         logger.info(f"="*70)
@@ -431,6 +330,19 @@ class MLBStatsCollector:
         
         if resume_from_game:
             logger.info(f"Resuming from game_pk {resume_from_game}")
+
+        if use_feed:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            todo = async_collector.games_to_collect(conn, season, resume_from_game)
+            conn.close()
+            logger.info(f"{len(games) - len(todo)} games already have stats; fetching {len(todo)} with {fetchers} fetchers")
+            pipeline = async_collector.collect_games(self.db_path, todo, fetchers=fetchers)
+            self.games_processed += len(games)
+            self.stats_collected += pipeline.counts['stats']
+            self.errors += pipeline.counts['errors']
+            logger.info(pipeline.summary_line())
+            logger.info(http_session.stats.summary_line())
+            return
         
         start_time = time.time()
         
@@ -448,11 +360,10 @@ class MLBStatsCollector:
                 self.games_processed += 1
                 continue
             
-            stats = self.collect_boxscore(game_pk, game_date, home_id, away_id)
-            self.collect_play_by_play(game_pk, game_id)
+            stats, plays = self.collect_game(game_pk, game_date, home_id, away_id, game_id, use_feed)
             self.stats_collected += stats
             self.games_processed += 1
-            logger.info(f"[{idx}/{len(games)}] Game {game_pk} ({game_date}) - {stats} stats + play-by-play")
+            logger.info(f"[{idx}/{len(games)}] Game {game_pk} ({game_date}) - {stats} stats + {plays} plays")
             
             # Progress report every 50 games
             if idx % 50 == 0:
@@ -482,6 +393,7 @@ class MLBStatsCollector:
         logger.info(f"Errors: {self.errors}")
         logger.info(f"Time elapsed: {elapsed/3600:.2f} hours")
         logger.info(f"Average rate: {self.games_processed/elapsed*3600:.1f} games/hour")
+        logger.info(http_session.stats.summary_line())
         logger.info(f"{'='*70}")
 
 
@@ -491,30 +403,41 @@ def main():
     parser.add_argument('--season', type=int, required=True, help='Season year (e.g., 2024)')
     parser.add_argument('--resume', type=int, help='Resume from game_pk')
     parser.add_argument('--game_id', type=int, help='Collect only this game_id (for backfill)')
+    parser.add_argument('--pool-size', type=int, default=http_session.DEFAULT_POOL_SIZE,
+                        help='HTTP connection pool size (match the number of concurrent workers)')
+    parser.add_argument('--feed', action='store_true',
+                        help='Fetch each game once from the live feed (box scores, plays, weather, attendance)')
+    parser.add_argument('--fetchers', type=int, default=async_collector.DEFAULT_FETCHERS,
+                        help='Concurrent live feed requests for a --feed season collection')
+    parser.add_argument('--partitioned', action='store_true',
+                        help='Write to the per-season database (data/mlb_<season>.db) instead of mlb_data.db')
 
     args = parser.parse_args()
+    http_session.configure(pool_size=max(args.pool_size, args.fetchers) if args.feed else args.pool_size)
 
     # Create logs directory if it doesn't exist
     import os
     os.makedirs('../logs', exist_ok=True)
+    setup_logging()
 
     # Initialize collector
-    collector = MLBStatsCollector()
+    db_path = season_db.ensure_season_db(args.season) if args.partitioned else DB_PATH
+    collector = MLBStatsCollector(db_path=db_path)
 
     # Collect teams first if needed
-    conn = sqlite3.connect(DB_PATH, timeout=30.0)
+    conn = sqlite3.connect(db_path, timeout=30.0)
     team_count = conn.execute("SELECT COUNT(*) FROM teams").fetchone()[0]
     conn.close()
 
     if team_count == 0:
         logger.info("No teams found, collecting teams first...")
         from collect_mlb_data import MLBDataCollector
-        team_collector = MLBDataCollector()
+        team_collector = MLBDataCollector(db_path=db_path)
         team_collector.collect_teams()
 
     if args.game_id:
         # Backfill only the specified game_id
-        conn = sqlite3.connect(DB_PATH, timeout=30.0)
+        conn = sqlite3.connect(db_path, timeout=30.0)
         row = conn.execute("SELECT game_pk, game_date, home_team_id, away_team_id, status, game_id FROM games WHERE game_id = ?", (args.game_id,)).fetchone()
         conn.close()
         if not row:
@@ -522,12 +445,13 @@ def main():
             return
         game_pk, game_date, home_id, away_id, status, game_id = row
         logger.info(f"Backfilling single game: {args.game_id} (pk={game_pk}, date={game_date})")
-        stats = collector.collect_boxscore(game_pk, game_date, home_id, away_id)
-        collector.collect_play_by_play(game_pk, game_id)
+        collector.collect_game(game_pk, game_date, home_id, away_id, game_id, use_feed=args.feed)
         logger.info(f"Backfill complete for game_id {args.game_id}")
     else:
         # Collect season stats as before
-        collector.collect_season_stats(args.season, resume_from_game=args.resume)
+        collector.collect_season_stats(args.season, resume_from_game=args.resume, use_feed=args.feed,
+                                       fetchers=args.fetchers)
+    batted_ball_store.refresh(db_path, logger.info)
 
 
 if __name__ == "__main__":
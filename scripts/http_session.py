@@ -0,0 +1,198 @@
+"""
+Shared HTTP Session
+Pooled keep-alive session that every collector routes MLB Stats API and Savant calls through.
+
+statsapi calls requests.get() for every request, so each call sets up its own
+connection (and TLS handshake). install_statsapi() points statsapi at the shared
+session instead. Each response is timed so connect time (TCP + TLS) can be told
+apart from transfer time (request, server wait, download).
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 30
+STATSAPI_BASE = "https://statsapi.mlb.com"
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; MLBStatsBot/1.0)',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Connect time for the request currently running on this thread
+_timing = threading.local()
+
+
+def _record_connect(start):
+    _timing.connect_time = getattr(_timing, 'connect_time', 0.0) + time.perf_counter() - start
+    _timing.new_connections = getattr(_timing, 'new_connections', 0) + 1
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(start)
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        # Includes the TLS handshake
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(start)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report how long they took to open"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+class RequestStats:
+    """Thread-safe running totals of request timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+            self.connect_seconds = 0.0
+            self.transfer_seconds = 0.0
+            self.bytes_received = 0
+
+    def record(self, new_connections, connect_time, transfer_time, nbytes):
+        with self._lock:
+            self.requests += 1
+            self.new_connections += new_connections
+            self.connect_seconds += connect_time
+            self.transfer_seconds += transfer_time
+            self.bytes_received += nbytes
+
+    def summary(self):
+        with self._lock:
+            n = self.requests or 1
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': self.requests - self.new_connections,
+                'avg_connect_ms': self.connect_seconds / n * 1000,
+                'avg_transfer_ms': self.transfer_seconds / n * 1000,
+                'bytes_received': self.bytes_received,
+            }
+
+    def summary_line(self):
+        s = self.summary()
+        return (f"HTTP: {s['requests']} requests, {s['new_connections']} new connections, "
+                f"avg connect {s['avg_connect_ms']:.1f} ms, avg transfer {s['avg_transfer_ms']:.1f} ms")
+
+
+stats = RequestStats()
+
+
+class TimedSession(requests.Session):
+    """requests.Session that times each request and can redirect Stats API calls"""
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, base_url=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.headers.update(DEFAULT_HEADERS)
+        self.timeout = timeout
+        self.base_url = base_url.rstrip('/') if base_url else None
+        adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if self.base_url and url.startswith(STATSAPI_BASE):
+            url = self.base_url + url[len(STATSAPI_BASE):]
+        kwargs.setdefault('timeout', self.timeout)
+
+        _timing.connect_time = 0.0
+        _timing.new_connections = 0
+        start = time.perf_counter()
+        response = super().request(method, url, *args, **kwargs)
+        total = time.perf_counter() - start
+
+        # Body is already read unless stream=True was passed
+        response.connect_time = _timing.connect_time
+        response.transfer_time = total - _timing.connect_time
+        nbytes = 0 if kwargs.get('stream') else len(response.content)
+        stats.record(_timing.new_connections, response.connect_time, response.transfer_time, nbytes)
+        return response
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def configure(pool_size=DEFAULT_POOL_SIZE, base_url=None, timeout=DEFAULT_TIMEOUT):
+    """Replace the shared session; pool_size should match the number of concurrent workers"""
+    global _session
+    if base_url is None:
+        base_url = os.environ.get('MLB_API_BASE')
+    with _session_lock:
+        old = _session
+        _session = TimedSession(pool_size=pool_size, base_url=base_url, timeout=timeout)
+    if old is not None:
+        old.close()
+    return _session
+
+
+def get_session():
+    """Return the shared session, creating it with default settings on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = TimedSession(base_url=os.environ.get('MLB_API_BASE'))
+        return _session
+
+
+def get(url, **kwargs):
+    """GET through the shared session"""
+    return get_session().get(url, **kwargs)
+
+
+class _StatsapiTransport:
+    """Stands in for the requests module inside statsapi"""
+
+    def get(self, url, **kwargs):
+        return get_session().get(url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def install_statsapi():
+    """Route every statsapi request (get, schedule, boxscore_data, ...) through the shared session"""
+    import statsapi
+    if not isinstance(statsapi.requests, _StatsapiTransport):
+        statsapi.requests = _StatsapiTransport()
@@ -5,6 +5,8 @@ Initialize MLB Stats Database
 import sqlite3
 import os
 
+from compact_play_by_play import apply_schema
+
 DB_PATH = "../data/mlb_data.db"
 SCHEMA_PATH = "../schema.sql"
 
@@ -22,7 +24,7 @@ def init_database():
     # Create database and execute schema
     print("Creating MLB database...")
     conn = sqlite3.connect(DB_PATH)
-    conn.executescript(schema_sql)
+    apply_schema(conn, schema_sql)
     conn.commit()
     
     # Verify tables created
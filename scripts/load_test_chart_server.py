@@ -0,0 +1,72 @@
+"""
+Chart Server Load Test
+Sends concurrent /spray requests to a running spray_chart_server.py and reports latency percentiles.
+
+The first pass over the query set is cold (every chart rendered); the
+remaining requests repeat the same queries, so they measure the cache.
+
+Usage:
+    python scripts/load_test_chart_server.py --players "Aaron Judge,Shohei Ohtani" --start 2025-04-01 --end 2025-09-30
+"""
+
+import argparse
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import numpy as np
+
+
+def fetch(url):
+    t0 = time.perf_counter()
+    try:
+        with urlopen(url) as resp:
+            resp.read()
+            status = resp.status
+    except HTTPError as e:
+        status = e.code
+    return time.perf_counter() - t0, status
+
+
+def run(label, urls, concurrency):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, urls))
+    elapsed = time.perf_counter() - t0
+    latencies = np.array([r[0] for r in results]) * 1000
+    errors = sum(1 for r in results if r[1] != 200)
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{label:<6} {len(urls):>6} req  {len(urls) / elapsed:8.1f} req/s  "
+          f"p50 {p50:8.1f} ms  p99 {p99:8.1f} ms  max {latencies.max():8.1f} ms  errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the spray chart server')
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help='Server base URL')
+    parser.add_argument('--players', required=True, help='Comma-separated player names or ids')
+    parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--formats', default='png,html,json', help='Comma-separated formats to request')
+    parser.add_argument('--requests', type=int, default=500, help='Requests in the warm pass')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    queries = [
+        {'player': player.strip(), 'start': args.start, 'end': args.end, 'format': fmt}
+        for player in args.players.split(',')
+        for fmt in args.formats.split(',')
+    ]
+    urls = [f"{args.url}/spray?{urlencode(q)}" for q in queries]
+
+    print(f"{len(urls)} distinct queries, concurrency {args.concurrency}")
+    run('cold', urls, args.concurrency)
+    run('warm', list(itertools.islice(itertools.cycle(urls), args.requests)), args.concurrency)
+    with urlopen(f"{args.url}/stats") as resp:
+        print(resp.read().decode())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+MLB Stats Command Line
+Single entry point for the collection, database and chart scripts.
+
+    python scripts/mlb.py spray --player "Bryce Harper" --start 2025-04-01 --end 2025-09-30 --output harper.png
+    python scripts/mlb.py collect --season 2025 --feed
+    python scripts/mlb.py --help
+
+Only the chosen command's module is imported, so `mlb.py --help` and each
+command's own --help stay fast. Each script still works on its own; commands run
+from the directory the script's relative paths expect ("../data/..." scripts from
+scripts/, "data/..." scripts from the repository root), whatever the caller's cwd.
+"""
+
+import os
+import runpy
+import sys
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+
+# command -> (module, directory it runs from, description)
+COMMANDS = {
+    'spray': ('spray_chart_by_player_and_date', ROOT_DIR, 'Static (PNG) spray chart for a player and date range'),
+    'spray-interactive': ('spray_chart_by_player_and_date_interactive', ROOT_DIR, 'Interactive (HTML) spray chart'),
+    'spray-compare': ('spray_chart_compare', ROOT_DIR, 'Compare several players or a team in one chart'),
+    'serve': ('spray_chart_server', ROOT_DIR, 'HTTP spray chart server with a render cache'),
+    'load-test': ('load_test_chart_server', ROOT_DIR, 'Latency load test for the chart server'),
+    'batted-ball-store': ('batted_ball_store', SCRIPTS_DIR, 'Build/update the memory-mapped batted ball store for charts'),
+    'export-games': ('export_games_to_csv', ROOT_DIR, 'Export games to CSV'),
+    'fill-missing-stats': ('fill_missing_game_stats', ROOT_DIR, 'Collect box scores for games missing them'),
+    'init-db': ('init_database', SCRIPTS_DIR, 'Create the database from schema.sql'),
+    'status': ('check_status', SCRIPTS_DIR, 'Database collection status (--watch for live coverage, rate and ETA)'),
+    'audit': ('audit_games', SCRIPTS_DIR, 'Per-game data quality audit, gap reports and backfill work lists'),
+    'collect': ('get_all_games_stats', SCRIPTS_DIR, 'Collect a season of games, box scores and play-by-play'),
+    'collect-async': ('async_collector', SCRIPTS_DIR, 'Collect a season with the concurrent fetch/parse/write pipeline'),
+    'fake-api': ('fake_stats_api', SCRIPTS_DIR, 'Local fake Stats API (schedule and live feeds) for testing'),
+    'bulk-backfill': ('bulk_backfill', SCRIPTS_DIR, 'Archive raw live feeds and load them with parallel parsing'),
+    'collect-data': ('collect_mlb_data', SCRIPTS_DIR, 'Collect teams, schedule and players'),
+    'season-db': ('season_db', SCRIPTS_DIR, 'Split/freeze per-season database files'),
+    'compact': ('compact_play_by_play', SCRIPTS_DIR, 'Migrate play_by_play to the compact layout'),
+    'classify': ('classify_batted_balls', SCRIPTS_DIR, 'Classify batted balls (fair/foul, out, hit type) and anomaly reports'),
+    'rolling': ('rolling_stats', SCRIPTS_DIR, 'Trailing-N-game / N-day batting lines and trends'),
+    'splits': ('splits_cube', SCRIPTS_DIR, 'Platoon, count, inning and base-out splits from the splits cube'),
+    're24': ('run_expectancy', SCRIPTS_DIR, 'Run expectancy matrix and per-play RE24 run values'),
+    'xoutcome': ('x_outcome', SCRIPTS_DIR, 'Train the xBA/xSLG model and score batted balls'),
+    'xoutcome-grid': ('x_outcome_grid', SCRIPTS_DIR, 'Build/compare the launch speed x angle expected outcome lookup grid'),
+    'similar': ('player_similarity', SCRIPTS_DIR, 'Batter-season batted ball profiles and most-similar hitters'),
+    'pitchers': ('pitcher_summary', SCRIPTS_DIR, 'Batted balls allowed per pitcher and season'),
+    'query-api': ('query_api', SCRIPTS_DIR, 'Benchmark the shared read-only query API'),
+    'result-cache': ('result_cache', SCRIPTS_DIR, 'Query result cache: data versions and benchmark'),
+    'benchmark-startup': ('benchmark_startup', ROOT_DIR, 'Measure CLI import/startup time'),
+}
+
+
+def usage():
+    lines = ["usage: mlb.py <command> [args...]", "", "commands:"]
+    width = max(len(name) for name in COMMANDS)
+    for name, (_, _, description) in COMMANDS.items():
+        lines.append(f"  {name:<{width}}  {description}")
+    lines.append("")
+    lines.append("Run `mlb.py <command> --help` for a command's options.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    command = argv[0]
+    if command not in COMMANDS:
+        print(f"Unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module, cwd, _ = COMMANDS[command]
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    os.chdir(cwd)
+    sys.argv[1:] = argv[1:]
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Pitcher Batted Ball Summary
+Batted balls allowed per pitcher and season, pre-aggregated so pitcher reports don't
+scan play_by_play.
+
+pitcher_batted_balls holds one row per pitcher x season with counts of balls in
+play, hits by type, batted ball types (from trajectory), hard-hit balls and launch
+speed/angle/distance sums. Rows are additive like splits_cube: game_feed.write_game
+subtracts a game's contribution before its plays are replaced and adds it back
+afterwards. Run --build to add games not summarized yet.
+
+Usage:
+    python pitcher_summary.py --build
+    python pitcher_summary.py --pitcher "Zack Wheeler" --season 2025
+    python pitcher_summary.py --season 2025 --leaders hard_hit_rate --min-bip 200
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+from classify_batted_balls import IN_PLAY_EVENTS
+from splits_cube import HARD_HIT_SPEED, _in
+
+
+DB_PATH = "../data/mlb_data.db"
+
+MEASURES = [
+    'batted_balls', 'with_coords', 'hits', 'singles', 'doubles', 'triples', 'home_runs',
+    'ground_balls', 'line_drives', 'fly_balls', 'popups', 'hard_hit',
+    'launch_count', 'launch_speed_sum', 'launch_angle_sum', 'distance_count', 'distance_sum',
+]
+
+SUMMARY_SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS pitcher_batted_balls (
+        pitcher_id INTEGER NOT NULL,
+        season INTEGER NOT NULL,
+        {', '.join(f'{m} {"REAL" if m.endswith("_sum") else "INTEGER"} NOT NULL DEFAULT 0' for m in MEASURES)},
+        PRIMARY KEY (pitcher_id, season)
+    ) WITHOUT ROWID
+    """,
+    "CREATE TABLE IF NOT EXISTS pitcher_summary_games (game_id INTEGER PRIMARY KEY)",
+]
+
+_ROWS = f"""
+    SELECT p.pitcher_id,
+           g.season,
+           {{sign}} * COUNT(*),
+           {{sign}} * SUM(p.coord_x IS NOT NULL AND p.coord_y IS NOT NULL),
+           {{sign}} * SUM(p.event_type IN ('single', 'double', 'triple', 'home_run')),
+           {{sign}} * SUM(p.event_type = 'single'),
+           {{sign}} * SUM(p.event_type = 'double'),
+           {{sign}} * SUM(p.event_type = 'triple'),
+           {{sign}} * SUM(p.event_type = 'home_run'),
+           {{sign}} * SUM(p.trajectory = 'ground_ball'),
+           {{sign}} * SUM(p.trajectory = 'line_drive'),
+           {{sign}} * SUM(p.trajectory = 'fly_ball'),
+           {{sign}} * SUM(p.trajectory = 'popup'),
+           {{sign}} * COALESCE(SUM(p.launch_speed >= {HARD_HIT_SPEED}), 0),
+           {{sign}} * COUNT(p.launch_speed),
+           {{sign}} * COALESCE(SUM(p.launch_speed), 0),
+           {{sign}} * COALESCE(SUM(p.launch_angle), 0),
+           {{sign}} * COUNT(p.total_distance),
+           {{sign}} * COALESCE(SUM(p.total_distance), 0)
+    FROM play_by_play p
+    JOIN games g ON g.game_id = p.game_id
+    WHERE p.game_id IN ({{games}})
+      AND p.pitcher_id IS NOT NULL AND p.event_type IN {_in(IN_PLAY_EVENTS)}
+    GROUP BY 1, 2
+"""
+
+MERGE_SQL = f"""
+    INSERT INTO pitcher_batted_balls (pitcher_id, season, {', '.join(MEASURES)})
+    {_ROWS}
+    ON CONFLICT (pitcher_id, season) DO UPDATE SET
+        {', '.join(f'{m} = {m} + excluded.{m}' for m in MEASURES)}
+"""
+
+RATES = ['avg_exit_velo', 'avg_launch_angle', 'avg_distance', 'hard_hit_rate', 'gb_rate', 'fb_rate', 'hr_per_bip']
+
+
+def ensure_schema(cursor):
+    """Create the summary tables if needed (plain statements, safe inside a transaction)"""
+    for statement in SUMMARY_SCHEMA:
+        cursor.execute(statement)
+
+
+def _merge(cursor, games_sql, params=(), sign=1):
+    cursor.execute(MERGE_SQL.format(games=games_sql, sign=sign), params)
+
+
+def remove_game(cursor, game_id):
+    """Subtract a game's batted balls (call before its plays are deleted)"""
+    ensure_schema(cursor)
+    if cursor.execute("DELETE FROM pitcher_summary_games WHERE game_id = ?", (game_id,)).rowcount:
+        _merge(cursor, "?", (game_id,), sign=-1)
+        cursor.execute("DELETE FROM pitcher_batted_balls WHERE batted_balls = 0")
+
+
+def add_game(cursor, game_id):
+    """Add a game's batted balls (call after its plays are inserted)"""
+    ensure_schema(cursor)
+    remove_game(cursor, game_id)
+    _merge(cursor, "?", (game_id,))
+    cursor.execute("INSERT INTO pitcher_summary_games (game_id) VALUES (?)", (game_id,))
+
+
+def build(conn, rebuild=False):
+    """Add every game with plays that isn't summarized yet (all of them with rebuild)"""
+    cursor = conn.cursor()
+    with conn:
+        ensure_schema(cursor)
+        if rebuild:
+            cursor.execute("DELETE FROM pitcher_batted_balls")
+            cursor.execute("DELETE FROM pitcher_summary_games")
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS pitcher_summary_queue (game_id INTEGER PRIMARY KEY)")
+        cursor.execute("DELETE FROM temp.pitcher_summary_queue")
+        cursor.execute("""
+            INSERT INTO temp.pitcher_summary_queue
+            SELECT game_id FROM games
+            WHERE game_id IN (SELECT game_id FROM play_by_play)
+              AND game_id NOT IN (SELECT game_id FROM pitcher_summary_games)
+        """)
+        count = cursor.execute("SELECT COUNT(*) FROM temp.pitcher_summary_queue").fetchone()[0]
+        _merge(cursor, "SELECT game_id FROM temp.pitcher_summary_queue")
+        cursor.execute("INSERT INTO pitcher_summary_games SELECT game_id FROM temp.pitcher_summary_queue")
+        cursor.execute("DELETE FROM temp.pitcher_summary_queue")
+    return count
+
+
+def query(conn, pitcher_ids=None, seasons=None, by_season=True):
+    """Summed batted balls allowed per pitcher (and season) with rates, as a DataFrame"""
+    import pandas as pd
+
+    where, params = [], []
+    for column, values in (('pitcher_id', pitcher_ids), ('season', seasons)):
+        if values is not None:
+            values = list(values)
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    by = ['pitcher_id', 'season'] if by_season else ['pitcher_id']
+    sql = f"SELECT {', '.join(by + [f'SUM({m}) AS {m}' for m in MEASURES])} FROM pitcher_batted_balls"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}"
+    df = pd.read_sql_query(sql, conn, params=params)
+
+    def rate(num, den):
+        return df[num] / df[den].where(df[den] > 0)
+
+    df['avg_exit_velo'] = rate('launch_speed_sum', 'launch_count')
+    df['avg_launch_angle'] = rate('launch_angle_sum', 'launch_count')
+    df['avg_distance'] = rate('distance_sum', 'distance_count')
+    df['hard_hit_rate'] = rate('hard_hit', 'launch_count')
+    typed = df['ground_balls'] + df['line_drives'] + df['fly_balls'] + df['popups']
+    df['gb_rate'] = df['ground_balls'] / typed.where(typed > 0)
+    df['fb_rate'] = df['fly_balls'] / typed.where(typed > 0)
+    df['hr_per_bip'] = rate('home_runs', 'batted_balls')
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batted balls allowed per pitcher and season')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--build', action='store_true', help='Add games not summarized yet')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the summary from play_by_play')
+    parser.add_argument('--pitcher', help='Comma-separated pitcher names')
+    parser.add_argument('--season', type=int, action='append', help='Season(s) to include')
+    parser.add_argument('--leaders', choices=RATES + ['batted_balls', 'home_runs'], help='Sort pitchers by this column')
+    parser.add_argument('--ascending', action='store_true', help='Sort --leaders lowest first')
+    parser.add_argument('--min-bip', type=int, default=0, help='Minimum balls in play')
+    parser.add_argument('--top', type=int, default=25, help='Rows to print with --leaders')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    if args.build or args.rebuild:
+        t0 = time.perf_counter()
+        count = build(conn, args.rebuild)
+        print(f"Summarized {count:,} games in {time.perf_counter() - t0:.1f}s")
+        if not (args.pitcher or args.leaders):
+            conn.close()
+            return
+    ensure_schema(conn.cursor())
+
+    pitcher_ids = None
+    if args.pitcher:
+        from spray_chart_compare import resolve_players
+
+        players = resolve_players(conn, [name.strip() for name in args.pitcher.split(',') if name.strip()])
+        if not players:
+            print('No matching players found.')
+            sys.exit(1)
+        pitcher_ids = [player_id for player_id, _ in players]
+
+    df = query(conn, pitcher_ids, args.season, by_season=not args.leaders)
+    df = df[df['batted_balls'] >= args.min_bip]
+    from rolling_stats import player_names
+
+    df.insert(1, 'name', df['pitcher_id'].map(player_names(conn, df['pitcher_id'].unique())))
+    conn.close()
+    if args.leaders:
+        df = df.sort_values(args.leaders, ascending=args.ascending).head(args.top)
+    if df.empty:
+        print('No batted balls allowed match.')
+        return
+    columns = ['name'] + (['season'] if 'season' in df else []) + [
+        'batted_balls', 'hits', 'home_runs', 'avg_exit_velo', 'avg_launch_angle', 'avg_distance',
+        'hard_hit_rate', 'gb_rate', 'fb_rate']
+    out = df[columns].copy()
+    for column in ('avg_exit_velo', 'avg_launch_angle', 'avg_distance'):
+        out[column] = out[column].round(1)
+    for column in ('hard_hit_rate', 'gb_rate', 'fb_rate'):
+        out[column] = (out[column] * 100).round(1)
+    print(out.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Player Similarity
+Batter-season batted ball profiles as fixed-length vectors, and nearest-neighbor
+search over them ("which hitters have a spray/launch profile most like X").
+
+Each batter-season with at least MIN_BATTED_BALLS balls in play becomes one float32
+vector of shares:
+  - spray angle in 10-degree slices, pull side first (mirrored for left-handed
+    swings; switch hitters bat opposite the pitcher's hand), plus pull/center/oppo
+  - launch angle and exit velocity bands
+  - ground ball / line drive / fly ball / popup rates from trajectory
+The matrix, ids and feature names are saved together in data/player_profiles.npz.
+
+Search z-scores each feature over all profiles, so rare shapes weigh as much as
+common ones, and ranks by cosine similarity: one matrix-vector product and an
+argpartition over every profile. --approximate uses a coarse k-means index instead
+and only scores the profiles in the nearest clusters (for far larger matrices).
+
+Usage:
+    python player_similarity.py --build
+    python player_similarity.py --player "Bryce Harper" --season 2025 --top 10
+    python player_similarity.py --player "Isaac Paredes" --season 2025 --same-season --approximate
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import field_geometry
+from classify_batted_balls import IN_PLAY_EVENTS
+
+
+DB_PATH = "../data/mlb_data.db"
+PROFILES_PATH = "../data/player_profiles.npz"
+MIN_BATTED_BALLS = 50
+
+# Spray angle (pull side negative after mirroring) in 10-degree slices, foul line to foul line
+SPRAY_EDGES = [-45, -35, -25, -15, -5, 5, 15, 25, 35, 45]
+PULL_CENTER_OPPO_EDGES = [-45, -15, 15, 45]
+LAUNCH_ANGLE_EDGES = [-90, -10, 0, 10, 20, 30, 40, 50, 90]
+EXIT_VELO_EDGES = [0, 80, 90, 95, 100, 105, 110, 130]
+TRAJECTORIES = ['ground_ball', 'line_drive', 'fly_ball', 'popup']
+
+
+def _labels(prefix, edges):
+    return [f'{prefix}_{lo}_{hi}' for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+FEATURES = (_labels('spray', SPRAY_EDGES) + ['pull', 'center', 'oppo'] + _labels('la', LAUNCH_ANGLE_EDGES)
+            + _labels('ev', EXIT_VELO_EDGES) + TRAJECTORIES)
+
+SELECT_SQL = f"""
+    SELECT pbp.batter_id, g.season, pbp.coord_x, pbp.coord_y, pbp.launch_speed, pbp.launch_angle,
+           pbp.trajectory, COALESCE(b.bat_side, ''), COALESCE(p.pitch_hand, '')
+    FROM play_by_play pbp
+    JOIN games g ON g.game_id = pbp.game_id
+    LEFT JOIN players b ON b.player_id = pbp.batter_id
+    LEFT JOIN players p ON p.player_id = pbp.pitcher_id
+    WHERE pbp.batter_id IS NOT NULL
+      AND pbp.event_type IN ({', '.join(repr(e) for e in sorted(IN_PLAY_EVENTS))})
+"""
+
+
+def _shares(group, values, edges, n_groups):
+    """Per-group share of values in each [edge, next edge) bin; NaN values are ignored"""
+    import numpy as np
+
+    edges = np.asarray(edges, dtype=float)
+    valid = ~np.isnan(values) & (values >= edges[0]) & (values <= edges[-1])
+    bins = np.clip(np.searchsorted(edges, values[valid], side='right') - 1, 0, len(edges) - 2)
+    counts = np.zeros((n_groups, len(edges) - 1))
+    np.add.at(counts, (group[valid], bins), 1)
+    totals = counts.sum(axis=1, keepdims=True)
+    return np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+
+
+def build_profiles(conn, min_batted_balls=MIN_BATTED_BALLS):
+    """(vectors float32 n x len(FEATURES), batter_ids, seasons, batted_balls) for every qualifying batter-season"""
+    import numpy as np
+
+    rows = conn.execute(SELECT_SQL).fetchall()
+    if not rows:
+        return (np.zeros((0, len(FEATURES)), dtype=np.float32), np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32))
+    batter, season, coord_x, coord_y, speed, angle, trajectory, bat_side, pitch_hand = zip(*rows)
+    key = np.asarray(batter, dtype=np.int64) * 10_000 + np.asarray(season, dtype=np.int64)
+    keys, group, counts = np.unique(key, return_inverse=True, return_counts=True)
+    n = len(keys)
+
+    def floats(values):
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    x, y = field_geometry.statcast_transform(floats(coord_x), floats(coord_y))
+    spray = field_geometry.spray_angle(x, y)
+    # Pull side negative: left-handed swings (and switch hitters facing righties) are mirrored
+    bat_side = np.asarray(bat_side, dtype=object)
+    lefty = (bat_side == 'L') | ((bat_side == 'S') & (np.asarray(pitch_hand, dtype=object) == 'R'))
+    spray = np.where(lefty, -spray, spray)
+
+    trajectory = np.asarray([t or '' for t in trajectory], dtype=object)
+    trajectory_index = np.full(len(trajectory), np.nan)
+    for i, name in enumerate(TRAJECTORIES):
+        trajectory_index[trajectory == name] = i
+
+    vectors = np.hstack([
+        _shares(group, spray, SPRAY_EDGES, n),
+        _shares(group, spray, PULL_CENTER_OPPO_EDGES, n),
+        _shares(group, floats(angle), LAUNCH_ANGLE_EDGES, n),
+        _shares(group, floats(speed), EXIT_VELO_EDGES, n),
+        _shares(group, trajectory_index, np.arange(len(TRAJECTORIES) + 1) - 0.5, n),
+    ]).astype(np.float32)
+    keep = counts >= min_batted_balls
+    return vectors[keep], keys[keep] // 10_000, (keys[keep] % 10_000).astype(np.int32), counts[keep].astype(np.int32)
+
+
+def save_profiles(path, vectors, batter_ids, seasons, batted_balls):
+    import numpy as np
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, vectors=vectors, batter_id=batter_ids, season=seasons, batted_balls=batted_balls,
+             features=np.asarray(FEATURES))
+
+
+class ProfileIndex:
+    """Cosine nearest-neighbor search over z-scored profile vectors (brute force or coarse k-means)"""
+
+    def __init__(self, path=PROFILES_PATH):
+        import numpy as np
+
+        with np.load(path) as data:
+            self.vectors = data['vectors']
+            self.batter_id = data['batter_id']
+            self.season = data['season']
+            self.batted_balls = data['batted_balls']
+            self.features = list(data['features'])
+        mean = self.vectors.mean(axis=0)
+        std = self.vectors.std(axis=0)
+        std[std == 0] = 1
+        z = (self.vectors - mean) / std
+        norms = np.linalg.norm(z, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.unit = (z / norms).astype(np.float32)
+        self.centroids = None
+
+    def __len__(self):
+        return len(self.unit)
+
+    def find(self, batter_id, season):
+        """Row of a batter-season, or None"""
+        import numpy as np
+
+        rows = np.flatnonzero((self.batter_id == batter_id) & (self.season == season))
+        return int(rows[0]) if len(rows) else None
+
+    def build_clusters(self, n_clusters=None, iterations=10, seed=42):
+        """Coarse k-means over the unit vectors for approximate search"""
+        import numpy as np
+
+        n_clusters = n_clusters or max(1, int(np.sqrt(len(self.unit))))
+        rng = np.random.default_rng(seed)
+        centroids = self.unit[rng.choice(len(self.unit), n_clusters, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(self.unit @ centroids.T, axis=1)
+            for c in range(n_clusters):
+                members = self.unit[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        self.centroids = centroids
+        self.assignment = np.argmax(self.unit @ centroids.T, axis=1)
+
+    def search(self, row, k=10, seasons=None, approximate=False, n_probe=3):
+        """The k most similar profiles to profile `row` as [(row, similarity)], best first (excluding itself)"""
+        import numpy as np
+
+        query = self.unit[row]
+        candidates = np.arange(len(self.unit))
+        if approximate:
+            if self.centroids is None:
+                self.build_clusters()
+            nearest = np.argsort(self.centroids @ query)[::-1][:n_probe]
+            candidates = np.flatnonzero(np.isin(self.assignment, nearest))
+        if seasons is not None:
+            candidates = candidates[np.isin(self.season[candidates], list(seasons))]
+        candidates = candidates[candidates != row]
+        if len(candidates) == 0:
+            return []
+        scores = self.unit[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batter-season batted ball profile similarity')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--profiles', default=PROFILES_PATH, help='Profile matrix file (.npz)')
+    parser.add_argument('--build', action='store_true', help='Build the profile matrix from play_by_play')
+    parser.add_argument('--min-bbe', type=int, default=MIN_BATTED_BALLS, help='Minimum balls in play per batter-season')
+    parser.add_argument('--player', help='Player name to find comparables for')
+    parser.add_argument('--season', type=int, help="The player's season (default: their latest profile)")
+    parser.add_argument('--same-season', action='store_true', help='Only compare against the same season')
+    parser.add_argument('--approximate', action='store_true', help='Search the nearest k-means clusters only')
+    parser.add_argument('--top', type=int, default=10, help='Number of comparables')
+    args = parser.parse_args()
+    if not (args.build or args.player):
+        parser.error('pass --build and/or --player')
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    if args.build:
+        t0 = time.perf_counter()
+        vectors, batter_ids, seasons, batted_balls = build_profiles(conn, args.min_bbe)
+        save_profiles(args.profiles, vectors, batter_ids, seasons, batted_balls)
+        print(f"Built {len(vectors):,} batter-season profiles ({len(FEATURES)} features) "
+              f"in {time.perf_counter() - t0:.1f}s -> {args.profiles}")
+    if not args.player:
+        conn.close()
+        return
+
+    from rolling_stats import player_names
+    from spray_chart_compare import resolve_players
+
+    players = resolve_players(conn, [args.player])
+    if not players:
+        sys.exit(1)
+    player_id, player_name = players[0]
+    if not os.path.exists(args.profiles):
+        print('No profiles yet; run player_similarity.py --build first.')
+        sys.exit(1)
+    index = ProfileIndex(args.profiles)
+    season = args.season or max((int(s) for s in index.season[index.batter_id == player_id]), default=None)
+    row = index.find(player_id, season) if season else None
+    if row is None:
+        print(f"No profile for {player_name}{f' in {season}' if season else ''} (needs {args.min_bbe}+ balls in play).")
+        sys.exit(1)
+
+    if args.approximate:
+        index.build_clusters()
+    t0 = time.perf_counter()
+    matches = index.search(row, args.top, [season] if args.same_season else None, args.approximate)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    names = player_names(conn, [index.batter_id[r] for r, _ in matches])
+    conn.close()
+
+    pull, gb, fb = (index.features.index(f) for f in ('pull', 'ground_ball', 'fly_ball'))
+    print(f"Most similar to {player_name} {season} ({index.batted_balls[row]} balls in play; "
+          f"pull {index.vectors[row, pull]:.0%}, GB {index.vectors[row, gb]:.0%}, FB {index.vectors[row, fb]:.0%}):")
+    print(f"{'Player':<28}{'Season':>7}{'Sim':>7}{'BIP':>6}{'Pull':>6}{'GB':>6}{'FB':>6}")
+    for r, similarity in matches:
+        v = index.vectors[r]
+        print(f"{names.get(int(index.batter_id[r]), index.batter_id[r])!s:<28}{index.season[r]:>7}{similarity:>7.3f}"
+              f"{index.batted_balls[r]:>6}{v[pull]:>6.0%}{v[gb]:>6.0%}{v[fb]:>6.0%}")
+    print(f"({len(index):,} profiles searched{' approximately' if args.approximate else ''} in {elapsed_ms:.2f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+"""
+Read-Only Query API
+Named, parameterized queries for the common read paths, and a pool of read-only
+connections to run them on.
+
+Each named query is a base statement plus optional filter clauses. The SQL for a
+given combination of filters is built once and reused verbatim, so sqlite3's
+per-connection statement cache hands back the prepared statement instead of
+parsing it again, and filters never turn into "(:x IS NULL OR ...)" conditions that
+keep SQLite off the indexes.
+
+    conn = query_api.connect()                                 # one read-only connection
+    df = query_api.batted_balls(conn, player_id=547180, season=2025)
+
+    pool = query_api.ReadPool(size=4)                          # shared by threads
+    df = pool.run(query_api.player_season_lines, season=2025)
+
+Connections are opened with mode=ro and PRAGMA query_only, so a reader can't write
+by mistake. The default database path is absolute (repo/data/mlb_data.db) and
+works from any directory; the chart scripts, check_status.py and
+export_games_to_csv.py default to it. Functions also accept any connection, e.g. a
+season_db.connect_seasons() one.
+
+Usage:
+    python query_api.py --benchmark --threads 4
+"""
+
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(ROOT_DIR, 'data', 'mlb_data.db')
+POOL_SIZE = 4
+STATEMENT_CACHE = 256
+
+BATTING_TOTALS = ['at_bats', 'runs', 'hits', 'doubles', 'triples', 'home_runs', 'rbi', 'walks', 'strikeouts', 'stolen_bases']
+PITCHING_TOTALS = ['innings_pitched', 'hits_allowed', 'runs_allowed', 'earned_runs', 'walks', 'strikeouts', 'home_runs_allowed']
+SEASON_LINE_STATS = [
+    'at_bats', 'runs', 'hits', 'doubles', 'triples', 'home_runs', 'rbi', 'walks',
+    'strikeouts', 'stolen_bases', 'hit_by_pitch', 'sacrifice_hits', 'sacrifice_flies',
+]
+
+
+def _team_totals(side):
+    batting = ', '.join(f"COALESCE({side}_b.{c}, 0) AS {side}_{c}" for c in BATTING_TOTALS)
+    pitching = ', '.join(
+        f"COALESCE({side}_p.{c}, 0) AS {side}_{'pitching_' + c if c in ('walks', 'strikeouts') else c}"
+        for c in PITCHING_TOTALS)
+    return f"{batting}, {pitching}"
+
+
+def _team_joins(side):
+    return f"""
+    LEFT JOIN (SELECT game_id, team_id, {', '.join(f'SUM({c}) AS {c}' for c in BATTING_TOTALS)}
+               FROM box_scores_batting WHERE game_id IN (SELECT g.game_id FROM games g WHERE {{where}})
+               GROUP BY game_id, team_id) {side}_b
+           ON {side}_b.game_id = g.game_id AND {side}_b.team_id = g.{side}_team_id
+    LEFT JOIN (SELECT game_id, team_id, {', '.join(f'SUM({c}) AS {c}' for c in PITCHING_TOTALS)}
+               FROM box_scores_pitching WHERE game_id IN (SELECT g.game_id FROM games g WHERE {{where}})
+               GROUP BY game_id, team_id) {side}_p
+           ON {side}_p.game_id = g.game_id AND {side}_p.team_id = g.{side}_team_id
+    """
+
+
+BATTED_BALL_FILTERS = {
+    'player_id': "pbp.batter_id = :player_id",
+    # A JSON array, so any number of batters share one statement
+    'player_ids': "pbp.batter_id IN (SELECT value FROM json_each(:player_ids))",
+    'pitcher_id': "pbp.pitcher_id = :pitcher_id",
+    'season': "g.season = :season",
+    'start': "g.game_date >= :start",
+    'end': "g.game_date <= :end",
+    'outcome': "pbp.event_type = :outcome",
+}
+
+
+def _batted_balls(expected):
+    """Batted balls with hit coordinates; with expected, joined to x_outcome's xba/xslg"""
+    return f"""
+        SELECT pbp.id, pbp.game_id, g.game_date, g.season, pbp.batter_id, pbp.pitcher_id, pbp.event_type,
+               pbp.coord_x, pbp.coord_y, pbp.launch_speed, pbp.launch_angle, pbp.total_distance, pbp.trajectory
+               {', xo.xba, xo.xslg' if expected else ''}
+        FROM play_by_play pbp
+        JOIN games g ON g.game_id = pbp.game_id
+        {'LEFT JOIN x_outcome xo ON xo.play_row_id = pbp.id' if expected else ''}
+        WHERE pbp.coord_x IS NOT NULL AND pbp.coord_y IS NOT NULL AND {{where}}
+        ORDER BY g.game_date, pbp.id
+    """
+
+
+# name -> (statement with a {where} placeholder, {filter param: clause})
+QUERIES = {
+    'player_by_name': ("""
+        SELECT player_id, full_name, position, bat_side, pitch_hand FROM players
+        WHERE {where}
+        ORDER BY full_name = :name COLLATE NOCASE DESC, player_id
+        LIMIT 1
+    """, {
+        'name': "full_name LIKE '%' || :name || '%' COLLATE NOCASE",
+    }),
+    'batted_balls': (_batted_balls(False), BATTED_BALL_FILTERS),
+    'batted_balls_expected': (_batted_balls(True), BATTED_BALL_FILTERS),
+    # One row per game with home and away box score totals (the export_games_to_csv layout)
+    'team_game_totals': (f"""
+        SELECT g.game_id, g.game_pk, g.game_date, g.season, g.game_type, g.status,
+               home.team_name AS home_team, away.team_name AS away_team,
+               g.home_score, g.away_score, g.venue_name, g.weather_condition, g.weather_temp, g.wind,
+               g.attendance, g.game_duration_minutes,
+               {_team_totals('home')},
+               {_team_totals('away')}
+        FROM games g
+        JOIN teams home ON home.team_id = g.home_team_id
+        JOIN teams away ON away.team_id = g.away_team_id
+        {_team_joins('home')}
+        {_team_joins('away')}
+        WHERE {{where}}
+        ORDER BY g.season, g.game_date, g.game_pk
+    """, {
+        'season': "g.season = :season",
+        'team_id': ":team_id IN (g.home_team_id, g.away_team_id)",
+        'exclude_game_type': "g.game_type != :exclude_game_type",
+    }),
+    'player_season_lines': (f"""
+        SELECT b.player_id, p.full_name, g.season, COUNT(*) AS games,
+               {', '.join(f'SUM(COALESCE(b.{c}, 0)) AS {c}' for c in SEASON_LINE_STATS)}
+        FROM box_scores_batting b
+        JOIN games g ON g.game_id = b.game_id
+        LEFT JOIN players p ON p.player_id = b.player_id
+        WHERE {{where}}
+        GROUP BY b.player_id, g.season
+        ORDER BY g.season, b.player_id
+    """, {
+        'player_id': "b.player_id = :player_id",
+        'season': "g.season = :season",
+        'game_type': "g.game_type = :game_type",
+    }),
+}
+
+
+@lru_cache(maxsize=None)
+def statement(name, filters=()):
+    """The SQL text for a named query with these filters (sorted tuple); identical text every time"""
+    sql, clauses = QUERIES[name]
+    unknown = set(filters) - set(clauses)
+    if unknown:
+        raise ValueError(f"{name} has no filter(s): {', '.join(sorted(unknown))}")
+    return sql.format(where=' AND '.join(clauses[f] for f in filters) or '1')
+
+
+def connect(db_path=DB_PATH):
+    """A read-only connection (mode=ro, query_only) usable from any thread, one thread at a time"""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=30.0, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def execute(conn, query, **params):
+    """Run a named query; None-valued params are filters left off. Returns (columns, rows)"""
+    params = {k: v for k, v in params.items() if v is not None}
+    cursor = conn.execute(statement(query, tuple(sorted(params))), params)
+    return [d[0] for d in cursor.description], cursor.fetchall()
+
+
+def frame(conn, query, **params):
+    """Run a named query into a DataFrame"""
+    import pandas as pd
+
+    columns, rows = execute(conn, query, **params)
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def find_player(conn, name):
+    """(player_id, full_name) for an exact, else partial, name match; None if unknown"""
+    _, rows = execute(conn, 'player_by_name', name=name)
+    return tuple(rows[0][:2]) if rows else None
+
+
+def batted_balls(conn, player_id=None, pitcher_id=None, season=None, start=None, end=None, outcome=None,
+                 player_ids=None, expected=False):
+    """
+    Batted balls with hit coordinates, filtered by batter (or several, player_ids),
+    pitcher, season, date range and event type; with expected, plus x_outcome's
+    xba/xslg (NULL where not scored; the table must exist)
+    """
+    if player_ids is not None:
+        player_ids = json.dumps([int(player_id) for player_id in player_ids])
+    return frame(conn, 'batted_balls_expected' if expected else 'batted_balls', player_id=player_id,
+                 player_ids=player_ids, pitcher_id=pitcher_id, season=season, start=start, end=end, outcome=outcome)
+
+
+def team_game_totals(conn, season=None, team_id=None, include_spring=False):
+    """One row per game with team names, scores and home/away batting and pitching totals"""
+    return frame(conn, 'team_game_totals', season=season, team_id=team_id,
+                 exclude_game_type=None if include_spring else 'S')
+
+
+def player_season_lines(conn, player_id=None, season=None, game_type='R'):
+    """Summed box score batting lines per player and season, with AVG/OBP/SLG/OPS/wOBA"""
+    from rolling_stats import add_rates
+
+    return add_rates(frame(conn, 'player_season_lines', player_id=player_id, season=season, game_type=game_type))
+
+
+class ReadPool:
+    """Up to `size` read-only connections shared by threads; each call borrows one"""
+
+    def __init__(self, db_path=DB_PATH, size=POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            conn = connect(self.db_path) if create else self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def run(self, func, *args, **kwargs):
+        """func(conn, *args, **kwargs) on a pooled connection, e.g. pool.run(batted_balls, player_id=1)"""
+        with self.connection() as conn:
+            return func(conn, *args, **kwargs)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def benchmark(db_path, threads=4, repeat=20):
+    """Time the main queries cold and warm, then the same mix from several threads on a pool"""
+    conn = connect(db_path)
+    sample = conn.execute("""
+        SELECT pbp.batter_id, pbp.pitcher_id, g.season FROM play_by_play pbp JOIN games g ON g.game_id = pbp.game_id
+        WHERE pbp.coord_x IS NOT NULL GROUP BY pbp.batter_id ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()
+    if sample is None:
+        print('No batted balls to benchmark with.')
+        return
+    batter_id, pitcher_id, season = sample
+    team_id = conn.execute("SELECT home_team_id FROM games WHERE season = ? LIMIT 1", (season,)).fetchone()[0]
+    conn.close()
+
+    cases = [
+        ('batted_balls (batter, season)', batted_balls, dict(player_id=batter_id, season=season)),
+        ('batted_balls (pitcher, dates)', batted_balls,
+         dict(pitcher_id=pitcher_id, start=f'{season}-01-01', end=f'{season}-12-31')),
+        ('batted_balls (batter, home runs)', batted_balls, dict(player_id=batter_id, outcome='home_run')),
+        ('team_game_totals (team, season)', team_game_totals, dict(season=season, team_id=team_id)),
+        ('player_season_lines (season)', player_season_lines, dict(season=season)),
+        ('player_season_lines (player)', player_season_lines, dict(player_id=batter_id)),
+    ]
+    import pandas  # noqa: F401  imported before timing
+
+    print(f"{'Query':<36}{'rows':>8}{'cold ms':>10}{'warm ms':>10}")
+    for label, func, params in cases:
+        conn = connect(db_path)
+        t0 = time.perf_counter()
+        df = func(conn, **params)
+        cold = time.perf_counter() - t0
+        warm = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            func(conn, **params)
+            warm.append(time.perf_counter() - t0)
+        conn.close()
+        print(f"{label:<36}{len(df):>8,}{cold * 1000:>10.2f}{statistics.median(warm) * 1000:>10.2f}")
+
+    for n in sorted({1, threads}):
+        pool = ReadPool(db_path, size=n)
+
+        def worker():
+            for _ in range(repeat):
+                for _, func, params in cases:
+                    pool.run(func, **params)
+
+        t0 = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(n)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - t0
+        pool.close()
+        print(f"{n} thread(s): {n * repeat * len(cases) / elapsed:,.0f} queries/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared read-only query API')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--benchmark', action='store_true', help='Time the main queries')
+    parser.add_argument('--threads', type=int, default=POOL_SIZE, help='Threads for the pooled benchmark')
+    parser.add_argument('--repeat', type=int, default=20, help='Warm runs per query')
+    args = parser.parse_args()
+    if not args.benchmark:
+        parser.error('nothing to do; pass --benchmark')
+    benchmark(args.db, args.threads, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,18 @@
 """
 Recollect missing batted ball coordinate data for specific play_by_play events.
 Reads missing_batted_ball_coords.csv, fetches play-by-play for each game, and attempts to update coord_x/coord_y for the specified at_bat_index.
+Generate the list with `audit_games.py --work-list coords --output ../data/missing_batted_ball_coords.csv`.
 """
 import csv
 import sqlite3
 import statsapi
 import time
 
+import audit_games
+import classify_batted_balls
+import http_session
+import result_cache
+
 DB_PATH = '../data/mlb_data.db'
 CSV_PATH = '../data/missing_batted_ball_coords.csv'
 
@@ -30,9 +36,14 @@ def update_coords(game_id, at_bat_index, coord_x, coord_y):
             """,
             (coord_x, coord_y, game_id, at_bat_index)
         )
+        # In-place updates don't move the audit watermark, so refresh this game directly
+        classify_batted_balls.classify_game(cur, game_id)
+        audit_games.audit_game(cur, game_id)
+        result_cache.bump_game(cur, game_id)
         conn.commit()
 
 def main():
+    http_session.install_statsapi()
     with open(CSV_PATH) as f:
         reader = csv.reader(f, delimiter='|')
         for row in reader:
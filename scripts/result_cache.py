@@ -0,0 +1,391 @@
+"""
+Query Result Cache
+Memoizes analytics query results and throws them away exactly when the data under
+them changes.
+
+data_versions holds one counter per scope: each player, team and season, plus one
+'all' counter. Every write path that adds or replaces a game (game_feed.write_game,
+the legacy box score and play-by-play collectors, coordinate recollection) calls
+bump_game in its transaction. That bumps the game's season, both teams, every
+player in its box scores or plays, and 'all'. Schedule syncs bump every game they
+insert or update, and writers of players/teams rows bump those keys (bump_keys).
+
+ResultCache keys results by query function and normalized params. Each entry
+stores the versions of the narrowest scope its params name: players (player_id,
+batter_id, pitcher_id), else teams (team_id), else seasons (season/seasons, or
+the years a start/end range covers), else 'all'. A lookup re-reads those few
+counters (one indexed query) and reuses the result only if they haven't moved.
+Entries live in a size-bounded in-memory LRU. With spill_dir, evicted entries are
+pickled to disk and promoted back on the next hit.
+
+    cache = result_cache.ResultCache(max_mb=256, spill_dir='../data/cache')
+    df = cache.run(conn, query_api.batted_balls, player_id=547180, season=2025)
+    df = pool.run(cache.run, query_api.player_season_lines, season=2025)
+
+Results come back as copies (cheap with pandas copy-on-write), so callers may
+modify them. Databases without data_versions (run init_database.py) are queried
+without caching.
+
+Usage:
+    python result_cache.py --versions
+    python result_cache.py --benchmark
+    python result_cache.py --bump-season 2025    # after editing a season's rows by hand
+"""
+
+import argparse
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+
+DB_PATH = "../data/mlb_data.db"
+DEFAULT_MAX_MB = 256
+DEFAULT_SPILL_MB = 2048
+
+PLAYER_PARAMS = ('player_id', 'player_ids', 'batter_id', 'pitcher_id', 'pitcher_ids')
+TEAM_PARAMS = ('team_id', 'team_ids')
+SEASON_PARAMS = ('season', 'seasons')
+
+VERSION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS data_versions (
+        scope TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        PRIMARY KEY (scope, key)
+    ) WITHOUT ROWID
+    """,
+]
+
+BUMP_GAME_SQL = """
+    INSERT INTO data_versions (scope, key, version)
+    SELECT scope, key, 1 FROM (
+        SELECT 'all' AS scope, 0 AS key
+        UNION SELECT 'season', season FROM games WHERE game_id = :game_id
+        UNION SELECT 'team', home_team_id FROM games WHERE game_id = :game_id
+        UNION SELECT 'team', away_team_id FROM games WHERE game_id = :game_id
+        UNION SELECT 'player', player_id FROM box_scores_batting WHERE game_id = :game_id
+        UNION SELECT 'player', player_id FROM box_scores_pitching WHERE game_id = :game_id
+        UNION SELECT 'player', batter_id FROM play_by_play WHERE game_id = :game_id
+        UNION SELECT 'player', pitcher_id FROM play_by_play WHERE game_id = :game_id
+    ) WHERE key IS NOT NULL
+    ON CONFLICT (scope, key) DO UPDATE SET version = version + 1
+"""
+
+BUMP_KEY_SQL = """
+    INSERT INTO data_versions (scope, key, version) VALUES (?, ?, 1)
+    ON CONFLICT (scope, key) DO UPDATE SET version = version + 1
+"""
+
+
+def ensure_schema(cursor):
+    """Create data_versions if needed (plain statements, safe inside a transaction)"""
+    for statement in VERSION_SCHEMA:
+        cursor.execute(statement)
+
+
+def bump_game(cursor, game_id):
+    """Invalidate cached results touching a game; call in the transaction that writes it, after the write"""
+    ensure_schema(cursor)
+    cursor.execute(BUMP_GAME_SQL, {'game_id': game_id})
+
+
+def bump_games(cursor, game_ids):
+    """bump_game for several games (e.g. a schedule sync), in the caller's transaction"""
+    ensure_schema(cursor)
+    cursor.executemany(BUMP_GAME_SQL, [{'game_id': game_id} for game_id in game_ids])
+
+
+def bump_keys(cursor, scope, keys):
+    """Invalidate cached results for players or teams whose own rows changed, plus 'all'"""
+    keys = [key for key in keys if key is not None]
+    if not keys:
+        return
+    ensure_schema(cursor)
+    cursor.executemany(BUMP_KEY_SQL, [(scope, key) for key in keys] + [('all', 0)])
+
+
+def bump_season(cursor, season):
+    """Invalidate everything cached about a season's games (after editing its rows outside the collectors)"""
+    ensure_schema(cursor)
+    game_ids = [row[0] for row in cursor.execute("SELECT game_id FROM games WHERE season = ?", (season,)).fetchall()]
+    bump_games(cursor, game_ids)
+    return len(game_ids)
+
+
+def _values(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sorted(int(v) for v in value)
+    return [int(value)]
+
+
+def dependencies(params):
+    """Sorted (scope, key) pairs a query with these params depends on, narrowest scope first"""
+    for scope, names in (('player', PLAYER_PARAMS), ('team', TEAM_PARAMS), ('season', SEASON_PARAMS)):
+        keys = {k for name in names if params.get(name) is not None for k in _values(params[name])}
+        if keys:
+            return tuple(sorted((scope, k) for k in keys))
+    start, end = params.get('start'), params.get('end')
+    if start is not None and end is not None:
+        return tuple(('season', year) for year in range(int(str(start)[:4]), int(str(end)[:4]) + 1))
+    return (('all', 0),)
+
+
+def _normalize(value):
+    """Hashable, order-independent form of a parameter value"""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(_normalize(v) for v in value))
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # NumPy scalars
+        return value.item()
+    return value
+
+
+def cache_key(func, params):
+    name = func if isinstance(func, str) else f"{func.__module__}.{func.__qualname__}"
+    return (name, tuple(sorted((k, _normalize(v)) for k, v in params.items() if v is not None)))
+
+
+def current_versions(conn, deps):
+    """Versions for each (scope, key) in deps (0 if never bumped); None if the database has no data_versions"""
+    flat = [part for dep in deps for part in dep]
+    try:
+        rows = conn.execute(f"""
+            SELECT scope, key, version FROM data_versions
+            WHERE (scope, key) IN (VALUES {', '.join(['(?, ?)'] * len(deps))})
+        """, flat).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    found = {(scope, key): version for scope, key, version in rows}
+    return tuple(found.get(dep, 0) for dep in deps)
+
+
+def _size(value):
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _copy(value):
+    return value.copy() if hasattr(value, 'copy') else value
+
+
+class ResultCache:
+    """LRU of query results bounded by estimated size, validated against data_versions on every lookup"""
+
+    def __init__(self, max_mb=DEFAULT_MAX_MB, spill_dir=None, spill_mb=DEFAULT_SPILL_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        self.spill_bytes = int(spill_mb * 1024 * 1024)
+        self.size = 0
+        self.entries = OrderedDict()  # key -> (versions, value, size)
+        self.hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def run(self, conn, func, **params):
+        """func(conn, **params), reused while the data it depends on is unchanged"""
+        versions = current_versions(conn, dependencies(params))
+        if versions is None:
+            return func(conn, **params)
+        key = cache_key(func, params)
+        value = self.get(key, versions)
+        if value is None:
+            value = func(conn, **params)
+            self.put(key, versions, value)
+        return _copy(value)
+
+    def get(self, key, versions):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        value = self._load_spilled(key, versions)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.spill_hits += 1
+        self.put(key, versions, value, spilled=True)
+        return value
+
+    def put(self, key, versions, value, spilled=False):
+        size = _size(value)
+        evicted = []
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            if size > self.max_bytes:
+                if not spilled:
+                    evicted.append((key, (versions, value, size)))
+            else:
+                self.entries[key] = (versions, value, size)
+                self.size += size
+                while self.size > self.max_bytes:
+                    evicted.append(self.entries.popitem(last=False))
+                    self.size -= evicted[-1][1][2]
+        if self.spill_dir:
+            for old_key, (old_versions, old_value, _) in evicted:
+                self._spill(old_key, old_versions, old_value)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        if self.spill_dir:
+            for name in os.listdir(self.spill_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.spill_dir, name))
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+
+    def _spill(self, key, versions, value):
+        path = self._spill_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump((key, versions, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._trim_spill()
+
+    def _trim_spill(self):
+        """Delete the least recently used spill files beyond spill_bytes"""
+        files = []
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                files.append((stat.st_atime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.spill_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def _load_spilled(self, key, versions):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, 'rb') as f:
+                spilled_key, spilled_versions, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if spilled_key != key or spilled_versions != versions:
+            if spilled_key == key:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return None
+        os.utime(path)
+        return value
+
+    def summary(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'spill_hits': self.spill_hits,
+                'misses': self.misses,
+            }
+
+
+def print_versions(conn):
+    try:
+        rows = conn.execute("""
+            SELECT scope, COUNT(*), SUM(version), MAX(version) FROM data_versions GROUP BY scope ORDER BY scope
+        """).fetchall()
+    except sqlite3.OperationalError:
+        print('No data_versions table; run init_database.py.')
+        return
+    print(f"{'Scope':<8}{'keys':>8}{'bumps':>10}{'max':>8}")
+    for scope, keys, bumps, highest in rows:
+        print(f"{scope:<8}{keys:>8,}{bumps:>10,}{highest:>8,}")
+    for (season, version) in conn.execute(
+            "SELECT key, version FROM data_versions WHERE scope = 'season' ORDER BY key"):
+        print(f"  season {season}: version {version}")
+
+
+def benchmark(db_path, repeat=20):
+    """Uncached vs cached time for the query_api queries"""
+    import statistics
+    import query_api
+
+    conn = query_api.connect(db_path)
+    if current_versions(conn, (('all', 0),)) is None:
+        print('No data_versions table; run init_database.py.')
+        return
+    sample = conn.execute("""
+        SELECT pbp.batter_id, g.season, g.home_team_id FROM play_by_play pbp JOIN games g ON g.game_id = pbp.game_id
+        WHERE pbp.coord_x IS NOT NULL GROUP BY pbp.batter_id ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()
+    if sample is None:
+        print('No batted balls to benchmark with.')
+        return
+    batter_id, season, team_id = sample
+    cases = [
+        ('batted_balls (batter, season)', query_api.batted_balls, dict(player_id=batter_id, season=season)),
+        ('team_game_totals (team, season)', query_api.team_game_totals, dict(season=season, team_id=team_id)),
+        ('player_season_lines (season)', query_api.player_season_lines, dict(season=season)),
+        ('team_game_totals (all games)', query_api.team_game_totals, {}),
+    ]
+    cache = ResultCache()
+    print(f"{'Query':<36}{'query ms':>10}{'cached ms':>11}")
+    for label, func, params in cases:
+        timings = {}
+        for name, call in (('query', lambda: func(conn, **params)), ('cached', lambda: cache.run(conn, func, **params))):
+            call()
+            runs = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                call()
+                runs.append(time.perf_counter() - t0)
+            timings[name] = statistics.median(runs)
+        print(f"{label:<36}{timings['query'] * 1000:>10.2f}{timings['cached'] * 1000:>11.3f}")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query result cache and data versions')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--versions', action='store_true', help='Show data version counters')
+    parser.add_argument('--benchmark', action='store_true', help='Time queries with and without the cache')
+    parser.add_argument('--bump-season', type=int, action='append', help='Invalidate cached results for a season')
+    args = parser.parse_args()
+    if not (args.versions or args.benchmark or args.bump_season):
+        parser.error('pass --versions, --benchmark or --bump-season')
+
+    if args.bump_season:
+        conn = sqlite3.connect(args.db, timeout=30.0)
+        with conn:
+            for season in args.bump_season:
+                print(f"Season {season}: bumped {bump_season(conn.cursor(), season):,} games")
+        conn.close()
+    if args.versions:
+        conn = sqlite3.connect(args.db, timeout=30.0)
+        print_versions(conn)
+        conn.close()
+    if args.benchmark:
+        benchmark(args.db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Rolling Batting Stats
+Trailing-N-game and trailing-N-day batting lines for every player at once.
+
+Box score rows are loaded once into NumPy arrays sorted by (player, date) with a
+prefix sum of each counting stat, so any window is two lookups and a subtraction:
+    window(start, end) = prefix[end] - prefix[start]
+Window bounds come from np.searchsorted on a (player, day) key, so a query over all
+players is a handful of vectorized calls. update() pulls only box score rows
+newer than the last id seen (a replaced row gets a new id and supersedes the old one).
+
+AVG/OBP/SLG/OPS and wOBA are derived from the summed counting stats, never
+averaged from per-game rates.
+
+Usage:
+    python rolling_stats.py --player "Bryce Harper" --games 15
+    python rolling_stats.py --days 30 --leaders ops --min-pa 50 --as-of 2025-07-31
+    python rolling_stats.py --player "Bryce Harper" --days 30 --trend --output harper_30d.csv
+"""
+
+import argparse
+import sqlite3
+import sys
+from datetime import date
+
+
+DB_PATH = "../data/mlb_data.db"
+
+STAT_COLUMNS = [
+    'at_bats', 'runs', 'hits', 'doubles', 'triples', 'home_runs', 'rbi', 'walks',
+    'strikeouts', 'stolen_bases', 'hit_by_pitch', 'sacrifice_hits', 'sacrifice_flies',
+]
+
+# Fixed linear weights (FanGraphs, recent seasons). Box scores don't split out
+# intentional walks, so all walks get the unintentional weight.
+WOBA_WEIGHTS = {'walks': 0.69, 'hit_by_pitch': 0.72, 'singles': 0.88, 'doubles': 1.25,
+                'triples': 1.58, 'home_runs': 2.03}
+
+RATE_STATS = ['avg', 'obp', 'slg', 'ops', 'woba']
+
+# (player, day) packed into one sortable int64 key
+DAY_BITS = 20
+
+
+def to_days(dates):
+    """'YYYY-MM-DD' strings -> int days since 1970-01-01"""
+    import numpy as np
+
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def add_rates(df):
+    """Add plate appearances, total bases and rate stats computed from summed counting stats"""
+    import numpy as np
+
+    def ratio(num, den):
+        num = np.asarray(num, dtype=float)
+        den = np.asarray(den, dtype=float)
+        return np.divide(num, den, out=np.full(len(num), np.nan), where=den > 0)
+
+    singles = df['hits'] - df['doubles'] - df['triples'] - df['home_runs']
+    df['pa'] = df['at_bats'] + df['walks'] + df['hit_by_pitch'] + df['sacrifice_hits'] + df['sacrifice_flies']
+    df['total_bases'] = singles + 2 * df['doubles'] + 3 * df['triples'] + 4 * df['home_runs']
+    on_base_den = df['at_bats'] + df['walks'] + df['hit_by_pitch'] + df['sacrifice_flies']
+    df['avg'] = ratio(df['hits'], df['at_bats'])
+    df['obp'] = ratio(df['hits'] + df['walks'] + df['hit_by_pitch'], on_base_den)
+    df['slg'] = ratio(df['total_bases'], df['at_bats'])
+    df['ops'] = df['obp'] + df['slg']
+    woba_num = (WOBA_WEIGHTS['walks'] * df['walks'] + WOBA_WEIGHTS['hit_by_pitch'] * df['hit_by_pitch']
+                + WOBA_WEIGHTS['singles'] * singles + WOBA_WEIGHTS['doubles'] * df['doubles']
+                + WOBA_WEIGHTS['triples'] * df['triples'] + WOBA_WEIGHTS['home_runs'] * df['home_runs'])
+    df['woba'] = ratio(woba_num, on_base_den)
+    return df
+
+
+class RollingStats:
+    """Prefix-summed batting lines for all players; call update() to pick up new games"""
+
+    def __init__(self, conn):
+        import numpy as np
+
+        self.conn = conn
+        self.last_id = 0
+        self.row_id = np.zeros(0, dtype=np.int64)
+        self.player = np.zeros(0, dtype=np.int64)
+        self.game_id = np.zeros(0, dtype=np.int64)
+        self.day = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros((0, len(STAT_COLUMNS)), dtype=np.int64)
+        self.update()
+
+    def update(self):
+        """Load box score rows added since the last call; returns how many were new"""
+        import numpy as np
+
+        rows = self.conn.execute(f"""
+            SELECT b.id, b.player_id, b.game_id, g.game_date,
+                   {', '.join(f'COALESCE(b.{c}, 0)' for c in STAT_COLUMNS)}
+            FROM box_scores_batting b
+            JOIN games g ON b.game_id = g.game_id
+            WHERE b.id > ?
+        """, (self.last_id,)).fetchall()
+        if not rows:
+            return 0
+        columns = list(zip(*rows))
+        row_id = np.asarray(columns[0], dtype=np.int64)
+        player = np.asarray(columns[1], dtype=np.int64)
+        game_id = np.asarray(columns[2], dtype=np.int64)
+        day = to_days(columns[3])
+        counts = np.column_stack([np.asarray(c, dtype=np.int64) for c in columns[4:]])
+
+        # A re-collected game replaces its rows (INSERT OR REPLACE gives them new ids)
+        keep = ~np.isin(self.game_id * (1 << 32) + self.player, game_id * (1 << 32) + player)
+        self.row_id = np.concatenate([self.row_id[keep], row_id])
+        self.player = np.concatenate([self.player[keep], player])
+        self.game_id = np.concatenate([self.game_id[keep], game_id])
+        self.day = np.concatenate([self.day[keep], day])
+        self.counts = np.concatenate([self.counts[keep], counts])
+        self.last_id = max(self.last_id, int(row_id.max()))
+        self._index()
+        return len(rows)
+
+    def _index(self):
+        import numpy as np
+
+        order = np.lexsort((self.game_id, self.day, self.player))
+        for name in ('row_id', 'player', 'game_id', 'day', 'counts'):
+            setattr(self, name, getattr(self, name)[order])
+        self.key = (self.player << DAY_BITS) + self.day
+        self.prefix = np.vstack([np.zeros((1, len(STAT_COLUMNS)), dtype=np.int64), np.cumsum(self.counts, axis=0)])
+        # Index of each row's player's first row
+        self.player_start = np.searchsorted(self.player, self.player, side='left')
+
+    def _players(self, player_ids):
+        import numpy as np
+
+        if player_ids is None:
+            return np.unique(self.player)
+        return np.asarray(sorted(set(player_ids)), dtype=np.int64)
+
+    def _as_of_day(self, as_of):
+        if as_of is None:
+            return int(self.day.max()) if len(self.day) else 0
+        return int(to_days(as_of))
+
+    def _frame(self, players, start, end, extra=None):
+        """Batting lines for windows [start, end) of the sorted arrays"""
+        import pandas as pd
+
+        sums = self.prefix[end] - self.prefix[start]
+        df = pd.DataFrame(sums, columns=STAT_COLUMNS)
+        df.insert(0, 'player_id', players)
+        df.insert(1, 'games', end - start)
+        for name, values in (extra or {}).items():
+            df[name] = values
+        return add_rates(df)
+
+    def last_games(self, games, player_ids=None, as_of=None):
+        """Each player's last `games` games on or before as_of (default: their latest game)"""
+        import numpy as np
+
+        players = self._players(player_ids)
+        first = np.searchsorted(self.player, players, side='left')
+        end = np.searchsorted(self.key, (players << DAY_BITS) + self._as_of_day(as_of), side='right')
+        start = np.maximum(first, end - games)
+        played = end > start
+        return self._window_frame(players[played], start[played], end[played])
+
+    def last_days(self, days, player_ids=None, as_of=None):
+        """Each player's games in the `days` days ending on as_of (default: the latest date loaded)"""
+        import numpy as np
+
+        players = self._players(player_ids)
+        as_of_day = self._as_of_day(as_of)
+        end = np.searchsorted(self.key, (players << DAY_BITS) + as_of_day, side='right')
+        start = np.searchsorted(self.key, (players << DAY_BITS) + as_of_day - days + 1, side='left')
+        played = end > start
+        return self._window_frame(players[played], start[played], end[played])
+
+    def _window_frame(self, players, start, end):
+        import numpy as np
+
+        first_day = self.day[start] if len(start) else np.zeros(0, dtype=np.int64)
+        last_day = self.day[end - 1] if len(end) else np.zeros(0, dtype=np.int64)
+        return self._frame(players, start, end, {
+            'first_date': first_day.astype('datetime64[D]'),
+            'last_date': last_day.astype('datetime64[D]'),
+        })
+
+    def trend(self, games=None, days=None, player_ids=None):
+        """The trailing window ending at every game of the selected players (all players by default)"""
+        import numpy as np
+
+        if (games is None) == (days is None):
+            raise ValueError("Pass exactly one of games or days")
+        rows = np.arange(len(self.player))
+        if player_ids is not None:
+            rows = rows[np.isin(self.player, list(player_ids))]
+        end = rows + 1
+        if games is not None:
+            start = np.maximum(self.player_start[rows], end - games)
+        else:
+            start = np.searchsorted(self.key, self.key[rows] - days + 1, side='left')
+        return self._frame(self.player[rows], start, end, {
+            'date': self.day[rows].astype('datetime64[D]'),
+            'game_id': self.game_id[rows],
+        })
+
+
+def player_names(conn, player_ids):
+    ids = [int(p) for p in player_ids]
+    if not ids:
+        return {}
+    placeholders = ', '.join('?' * len(ids))
+    return dict(conn.execute(f"SELECT player_id, full_name FROM players WHERE player_id IN ({placeholders})", ids))
+
+
+def format_table(df):
+    formatted = df.copy()
+    for column in RATE_STATS:
+        if column in formatted:
+            formatted[column] = formatted[column].map(lambda v: '-' if v != v else f"{v:.3f}".removeprefix('0'))
+    return formatted.to_string(index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trailing-window batting lines from box scores')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    window = parser.add_mutually_exclusive_group(required=True)
+    window.add_argument('--games', type=int, help='Trailing N games')
+    window.add_argument('--days', type=int, help='Trailing N days')
+    parser.add_argument('--player', help='Comma-separated player names (default: all players)')
+    parser.add_argument('--as-of', help='Window end date YYYY-MM-DD (default: latest date loaded)')
+    parser.add_argument('--trend', action='store_true', help='The trailing window at every game instead of one line')
+    parser.add_argument('--leaders', choices=RATE_STATS + ['home_runs', 'hits', 'rbi'], help='Sort by this stat')
+    parser.add_argument('--min-pa', type=int, default=0, help='Minimum plate appearances in the window')
+    parser.add_argument('--top', type=int, default=25, help='Rows to print with --leaders')
+    parser.add_argument('--output', help='Write the result to this CSV file')
+    args = parser.parse_args()
+
+    if args.as_of:
+        try:
+            date.fromisoformat(args.as_of)
+        except ValueError:
+            print('Invalid date format. Use YYYY-MM-DD.')
+            sys.exit(1)
+
+    conn = sqlite3.connect(args.db)
+    player_ids = None
+    if args.player:
+        from spray_chart_compare import resolve_players
+
+        players = resolve_players(conn, [name.strip() for name in args.player.split(',') if name.strip()])
+        if not players:
+            print('No matching players found.')
+            sys.exit(1)
+        player_ids = [player_id for player_id, _ in players]
+
+    engine = RollingStats(conn)
+    if args.trend:
+        df = engine.trend(args.games, args.days, player_ids)
+    elif args.games:
+        df = engine.last_games(args.games, player_ids, args.as_of)
+    else:
+        df = engine.last_days(args.days, player_ids, args.as_of)
+    df = df[df['pa'] >= args.min_pa]
+    names = player_names(conn, df['player_id'].unique())
+    conn.close()
+    df.insert(1, 'name', df['player_id'].map(names))
+
+    if args.leaders:
+        df = df.sort_values(args.leaders, ascending=False).head(args.top)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"{len(df):,} rows written to {args.output}")
+        return
+    if df.empty:
+        print('No games in that window.')
+        return
+    columns = ['name', 'date' if args.trend else 'last_date', 'games', 'pa', 'at_bats', 'hits', 'doubles',
+               'home_runs', 'walks', 'strikeouts'] + RATE_STATS
+    print(format_table(df[columns]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""
+Run Expectancy (RE24)
+Base-out run expectancy per season and the run value of every play.
+
+One game-ordered pass walks each half inning and records, per play_by_play row:
+  - the base-out state at the start (previous play's end state) and at the end
+  - runs scored on the play
+  - runs scored from the start of the play to the end of the half inning
+into play_run_values. The walk is independent per game, so batches of games are
+handed to a process pool and their rows written as they come back.
+
+The run_expectancy matrix is then an average over play_run_values per
+season x base_state x outs (plate appearances in half innings that reached three
+outs), and each play's
+    run_value = RE(end state) - RE(start state) + runs on the play
+with RE = 0 once the third out is made. Batter RE24 sums run_value over their plate
+appearances; pitcher RE24 is minus the sum over every play they were pitching.
+
+Base states and runs on a play come from play_by_play's runner columns and
+runs_scored, which are only complete for games in runner_state_games (plays parsed
+with runners carried through the half inning). Plays stored before that list only
+the runners who moved on each play and no runs, so those games are skipped, and
+dropped from play_run_values, until they are re-collected.
+
+Only games not in play_run_values yet are walked; matrices and run values are then
+refreshed for the seasons those games belong to. game_feed.write_game drops a game's
+rows when its plays are replaced, so re-collected games are walked again.
+
+Usage:
+    python run_expectancy.py                                    # walk new games, refresh matrices
+    python run_expectancy.py --rebuild --workers 8
+    python run_expectancy.py --matrix --season 2025
+    python run_expectancy.py --leaders batters --season 2025 --min-pa 300
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from pathlib import Path
+
+from splits_cube import BASE_STATES, NON_PA_EVENTS, ensure_runner_state
+
+
+DB_PATH = "../data/mlb_data.db"
+CHUNK_GAMES = 200
+
+COLUMNS = [
+    'play_row_id', 'game_id', 'season', 'batter_id', 'pitcher_id', 'is_pa', 'base_state', 'outs',
+    'end_base_state', 'end_outs', 'runs', 'runs_to_end',
+]
+
+RE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS play_run_values (
+        play_row_id INTEGER PRIMARY KEY,
+        game_id INTEGER NOT NULL,
+        season INTEGER NOT NULL,
+        batter_id INTEGER,
+        pitcher_id INTEGER,
+        is_pa INTEGER NOT NULL,
+        base_state INTEGER NOT NULL,
+        outs INTEGER NOT NULL,
+        end_base_state INTEGER NOT NULL,
+        end_outs INTEGER NOT NULL,
+        runs INTEGER NOT NULL,
+        runs_to_end INTEGER,
+        run_value REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_prv_game ON play_run_values(game_id)",
+    "CREATE INDEX IF NOT EXISTS idx_prv_batter ON play_run_values(batter_id, season)",
+    "CREATE INDEX IF NOT EXISTS idx_prv_pitcher ON play_run_values(pitcher_id, season)",
+    "CREATE INDEX IF NOT EXISTS idx_prv_state ON play_run_values(season, base_state, outs)",
+    """
+    CREATE TABLE IF NOT EXISTS run_expectancy (
+        season INTEGER NOT NULL,
+        base_state INTEGER NOT NULL,
+        outs INTEGER NOT NULL,
+        occurrences INTEGER NOT NULL,
+        runs_to_end INTEGER NOT NULL,
+        run_expectancy REAL NOT NULL,
+        PRIMARY KEY (season, base_state, outs)
+    ) WITHOUT ROWID
+    """,
+]
+
+# Top before bottom, then allPlays order
+PLAYS_SQL = """
+    SELECT p.id, p.game_id, g.season, p.inning, p.half_inning, p.batter_id, p.pitcher_id, p.event_type,
+           (p.runner_on_first_id IS NOT NULL) + 2 * (p.runner_on_second_id IS NOT NULL)
+               + 4 * (p.runner_on_third_id IS NOT NULL),
+           p.outs, COALESCE(p.runs_scored, 0)
+    FROM play_by_play p
+    JOIN games g ON g.game_id = p.game_id
+    WHERE p.game_id IN ({games})
+    ORDER BY p.game_id, p.inning, p.half_inning = 'bottom', p.at_bat_index, p.id
+"""
+
+INSERT_SQL = f"""
+    INSERT OR REPLACE INTO play_run_values ({', '.join(COLUMNS)})
+    VALUES ({', '.join(['?'] * len(COLUMNS))})
+"""
+
+MATRIX_SQL = """
+    INSERT OR REPLACE INTO run_expectancy (season, base_state, outs, occurrences, runs_to_end, run_expectancy)
+    SELECT season, base_state, outs, COUNT(*), SUM(runs_to_end), AVG(runs_to_end)
+    FROM play_run_values
+    WHERE is_pa = 1 AND runs_to_end IS NOT NULL AND outs < 3 AND season IN ({seasons})
+    GROUP BY season, base_state, outs
+"""
+
+RUN_VALUE_SQL = """
+    UPDATE play_run_values SET run_value = runs
+        + CASE WHEN end_outs >= 3 THEN 0 ELSE COALESCE((
+              SELECT re.run_expectancy FROM run_expectancy re
+              WHERE re.season = play_run_values.season AND re.base_state = play_run_values.end_base_state
+                AND re.outs = play_run_values.end_outs), 0) END
+        - COALESCE((
+              SELECT re.run_expectancy FROM run_expectancy re
+              WHERE re.season = play_run_values.season AND re.base_state = play_run_values.base_state
+                AND re.outs = play_run_values.outs), 0)
+    WHERE season IN ({seasons})
+"""
+
+LEADERS_SQL = {
+    'batters': """
+        SELECT v.batter_id AS player_id, SUM(v.is_pa) AS pa, SUM(v.run_value) AS re24
+        FROM play_run_values v
+        WHERE v.is_pa = 1 AND v.batter_id IS NOT NULL {where}
+        GROUP BY v.batter_id
+        HAVING SUM(v.is_pa) >= ?
+    """,
+    'pitchers': """
+        SELECT v.pitcher_id AS player_id, SUM(v.is_pa) AS pa, -SUM(v.run_value) AS re24
+        FROM play_run_values v
+        WHERE v.pitcher_id IS NOT NULL {where}
+        GROUP BY v.pitcher_id
+        HAVING SUM(v.is_pa) >= ?
+    """,
+}
+
+
+def ensure_schema(cursor):
+    """Create the run value tables if needed (plain statements, safe inside a transaction)"""
+    for statement in RE_SCHEMA:
+        cursor.execute(statement)
+    ensure_runner_state(cursor)
+
+
+def delete_game(cursor, game_id):
+    """Drop a game's run values before its plays are replaced (it is walked again on the next run)"""
+    ensure_schema(cursor)
+    cursor.execute("DELETE FROM play_run_values WHERE game_id = ?", (game_id,))
+
+
+def walk_half_inning(plays):
+    """
+    Run value rows (COLUMNS order) for one half inning's plays, in order.
+    Each play is (id, game_id, season, inning, half, batter_id, pitcher_id, event_type, base_state, outs, runs).
+    """
+    rows = []
+    base_state, outs = 0, 0
+    for play_id, game_id, season, _, _, batter_id, pitcher_id, event_type, end_base_state, end_outs, runs in plays:
+        is_pa = int(batter_id is not None and event_type is not None and event_type not in NON_PA_EVENTS)
+        end_outs = outs if end_outs is None else end_outs
+        rows.append([play_id, game_id, season, batter_id, pitcher_id, is_pa, base_state, min(outs, 3),
+                     end_base_state, min(end_outs, 3), runs, None])
+        base_state, outs = (0, 3) if end_outs >= 3 else (end_base_state, end_outs)
+
+    complete = outs >= 3
+    remaining = sum(row[10] for row in rows)
+    for row in rows:
+        if complete:
+            row[11] = remaining
+        remaining -= row[10]
+    return rows
+
+
+def walk_games(db_path, game_ids):
+    """Run value rows for a batch of games, streamed one half inning at a time (runs in a worker)"""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=30.0)
+    try:
+        cursor = conn.execute(PLAYS_SQL.format(games=', '.join('?' * len(game_ids))), game_ids)
+        rows = []
+        for _, game_plays in groupby(cursor, key=lambda p: p[1]):
+            for _, half in groupby(game_plays, key=lambda p: (p[3], p[4])):
+                rows.extend(walk_half_inning(half))
+        return rows
+    finally:
+        conn.close()
+
+
+def refresh(conn, seasons):
+    """Recompute the matrix and every play's run value for these seasons"""
+    seasons = sorted(seasons)
+    if not seasons:
+        return
+    placeholders = ', '.join('?' * len(seasons))
+    with conn:
+        conn.execute(f"DELETE FROM run_expectancy WHERE season IN ({placeholders})", seasons)
+        conn.execute(MATRIX_SQL.format(seasons=placeholders), seasons)
+        conn.execute(RUN_VALUE_SQL.format(seasons=placeholders), seasons)
+
+
+def update(conn, db_path, rebuild=False, workers=None):
+    """
+    Walk every game with trustworthy runner state not in play_run_values yet, then
+    refresh the affected seasons. Returns (games walked, plays walked, games skipped).
+    """
+    cursor = conn.cursor()
+    with conn:
+        ensure_schema(cursor)
+        if rebuild:
+            cursor.execute("DELETE FROM play_run_values")
+            cursor.execute("DELETE FROM run_expectancy")
+        # Walked before runner state was tracked; their seasons are refreshed below
+        untrusted_seasons = {row[0] for row in cursor.execute("""
+            SELECT DISTINCT season FROM play_run_values
+            WHERE game_id NOT IN (SELECT game_id FROM runner_state_games)
+        """)}
+        cursor.execute("DELETE FROM play_run_values WHERE game_id NOT IN (SELECT game_id FROM runner_state_games)")
+    pending = cursor.execute("""
+        SELECT g.game_id, g.season FROM games g
+        WHERE g.game_id IN (SELECT game_id FROM play_by_play)
+          AND g.game_id IN (SELECT game_id FROM runner_state_games)
+          AND g.game_id NOT IN (SELECT game_id FROM play_run_values)
+        ORDER BY g.game_id
+    """).fetchall()
+    skipped = cursor.execute("""
+        SELECT COUNT(*) FROM games
+        WHERE game_id IN (SELECT game_id FROM play_by_play)
+          AND game_id NOT IN (SELECT game_id FROM runner_state_games)
+    """).fetchone()[0]
+    # Seasons walked earlier whose matrix is missing (e.g. a freshly split season database)
+    seasons = {season for _, season in pending} | untrusted_seasons | {row[0] for row in cursor.execute("""
+        SELECT DISTINCT season FROM play_run_values WHERE season NOT IN (SELECT season FROM run_expectancy)
+    """)}
+
+    game_ids = [game_id for game_id, _ in pending]
+    chunks = [game_ids[i:i + CHUNK_GAMES] for i in range(0, len(game_ids), CHUNK_GAMES)]
+    workers = workers or os.cpu_count() or 1
+    total = 0
+    if chunks:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            for rows in pool.map(walk_games, [db_path] * len(chunks), chunks):
+                with conn:
+                    conn.executemany(INSERT_SQL, rows)
+                total += len(rows)
+                print(f"  walked {total:,} plays", end='\r')
+        print()
+    refresh(conn, seasons)
+    return len(game_ids), total, skipped
+
+
+def matrix(conn, season):
+    """The season's run expectancy as {outs: {base_state: (re, occurrences)}}"""
+    result = {outs: {} for outs in range(3)}
+    for base_state, outs, re, occurrences in conn.execute("""
+        SELECT base_state, outs, run_expectancy, occurrences FROM run_expectancy WHERE season = ?
+    """, (season,)):
+        result[outs][base_state] = (re, occurrences)
+    return result
+
+
+def print_matrix(conn, season):
+    cells = matrix(conn, season)
+    print(f"Run expectancy, {season} (runs to the end of the inning; occurrences in parentheses)")
+    print(f"{'Bases':<7}" + "".join(f"{f'{outs} out':>18}" for outs in range(3)))
+    for base_state, label in BASE_STATES.items():
+        line = f"{label:<7}"
+        for outs in range(3):
+            re, occurrences = cells[outs].get(base_state, (None, 0))
+            line += f"{'-' if re is None else f'{re:.3f}':>10} ({occurrences:>5,})"
+        print(line)
+
+
+def leaders(conn, role, seasons=None, min_pa=0):
+    """Batter or pitcher RE24 totals as a DataFrame, best first"""
+    import pandas as pd
+
+    where, params = "", []
+    if seasons:
+        where = f"AND v.season IN ({', '.join('?' * len(seasons))})"
+        params = list(seasons)
+    df = pd.read_sql_query(LEADERS_SQL[role].format(where=where), conn, params=params + [min_pa])
+    return df.sort_values('re24', ascending=False).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Base-out run expectancy (RE24) and per-play run values')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--rebuild', action='store_true', help='Walk every game again')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--matrix', action='store_true', help='Print the run expectancy matrix')
+    parser.add_argument('--leaders', choices=sorted(LEADERS_SQL), help='Print RE24 leaders')
+    parser.add_argument('--season', type=int, action='append', help='Season(s) to include')
+    parser.add_argument('--min-pa', type=int, default=0, help='Minimum plate appearances with --leaders')
+    parser.add_argument('--top', type=int, default=25, help='Rows to print with --leaders')
+    parser.add_argument('--output', help='Write the leaders to this CSV file')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    ensure_schema(conn.cursor())
+    if not (args.matrix or args.leaders) or args.rebuild:
+        t0 = time.perf_counter()
+        games, plays, skipped = update(conn, args.db, args.rebuild, args.workers)
+        print(f"Walked {games:,} games ({plays:,} plays) in {time.perf_counter() - t0:.1f}s")
+        if skipped:
+            print(f"Skipped {skipped:,} games without trustworthy runner state (plays stored before runners "
+                  f"were carried between plays); re-collect them, e.g. async_collector.py --season <year> --refetch")
+
+    if args.matrix:
+        seasons = args.season or [row[0] for row in conn.execute("SELECT MAX(season) FROM run_expectancy")]
+        if seasons == [None]:
+            print('No run expectancy yet; run run_expectancy.py first.')
+            sys.exit(1)
+        for season in seasons:
+            print_matrix(conn, season)
+            print()
+
+    if args.leaders:
+        from rolling_stats import player_names
+
+        df = leaders(conn, args.leaders, args.season, args.min_pa)
+        df.insert(1, 'name', df['player_id'].map(player_names(conn, df['player_id'].unique())))
+        df['re24'] = df['re24'].round(2)
+        if args.output:
+            df.to_csv(args.output, index=False)
+            print(f"{len(df):,} rows written to {args.output}")
+        else:
+            print(df.head(args.top).to_string(index=False))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Schedule Sync
+Fetches a season's schedule in one ranged request and upserts only the games that changed.
+
+INSERT OR REPLACE deletes and re-inserts the row, which gives the game a new
+game_id and orphans box score and play-by-play rows that point at the old one.
+sync_games() updates existing games in place by game_pk instead, and bumps the
+result_cache versions of every game it inserts or updates in the same transaction.
+"""
+
+import statsapi
+
+import audit_games
+import result_cache
+
+
+# Spring training through the end of the World Series
+SEASON_START = "03-01"
+SEASON_END = "11-15"
+
+GAME_COLUMNS = [
+    'game_pk', 'game_date', 'game_datetime', 'season', 'game_type', 'status',
+    'home_team_id', 'away_team_id', 'home_score', 'away_score', 'venue_name', 'venue_id',
+]
+
+# Columns compared to decide whether an existing game changed
+SYNC_COLUMNS = GAME_COLUMNS[1:]
+
+
+def fetch_schedule(start_date, end_date, team_id=None):
+    """Fetch every game between two dates in a single request"""
+    params = {'sportId': 1, 'startDate': start_date, 'endDate': end_date}
+    if team_id:
+        params['teamId'] = team_id
+    return statsapi.get('schedule', params)
+
+
+def fetch_season_schedule(season, team_id=None):
+    """Fetch a whole season (spring training to World Series) in a single request"""
+    return fetch_schedule(f"{season}-{SEASON_START}", f"{season}-{SEASON_END}", team_id)
+
+
+def schedule_rows(schedule):
+    """Flatten a raw schedule response into games rows keyed by game_pk"""
+    rows = {}
+    for day in schedule.get('dates', []):
+        for game in day.get('games', []):
+            teams = game.get('teams', {})
+            home = teams.get('home', {})
+            away = teams.get('away', {})
+            venue = game.get('venue', {})
+            game_date = game.get('officialDate') or day.get('date')
+            # Suspended games are listed on both dates; keep the latest listing
+            rows[game['gamePk']] = (
+                game['gamePk'],
+                game_date,
+                game.get('gameDate'),
+                int(game.get('season') or game_date[:4]),
+                game.get('gameType', 'R'),
+                game.get('status', {}).get('detailedState', 'Unknown'),
+                home.get('team', {}).get('id'),
+                away.get('team', {}).get('id'),
+                home.get('score'),
+                away.get('score'),
+                venue.get('name', ''),
+                venue.get('id'),
+            )
+    return rows
+
+
+def sync_games(conn, rows):
+    """Insert new games and update changed ones in place; returns inserted/updated/unchanged counts"""
+    existing = {
+        row[0]: row[1:]
+        for row in conn.execute(f"SELECT {', '.join(GAME_COLUMNS)}, game_id FROM games")
+    }
+
+    inserts = []
+    updates = []
+    unchanged = 0
+    for game_pk, row in rows.items():
+        current = existing.get(game_pk)
+        if current is None:
+            inserts.append(row)
+        elif tuple(current[:-1]) != row[1:]:
+            updates.append(row[1:] + (game_pk,))
+        else:
+            unchanged += 1
+
+    with conn:
+        cursor = conn.cursor()
+        # Bumped before and after, so a game moved to another season or team invalidates both
+        updated_ids = [existing[game_pk][-1] for *_, game_pk in updates]
+        if updated_ids:
+            result_cache.bump_games(cursor, updated_ids)
+        cursor.executemany(f"""
+            INSERT INTO games ({', '.join(GAME_COLUMNS)})
+            VALUES ({', '.join(['?'] * len(GAME_COLUMNS))})
+        """, inserts)
+        cursor.executemany(f"""
+            UPDATE games SET {', '.join(f'{col} = ?' for col in SYNC_COLUMNS)}
+            WHERE game_pk = ?
+        """, updates)
+        if inserts or updates:
+            # New game_ids are assigned on insert (and moved by a season file's trigger)
+            inserted_pks = {row[0] for row in inserts}
+            inserted_ids = [game_id for game_pk, game_id in cursor.execute("SELECT game_pk, game_id FROM games")
+                            if game_pk in inserted_pks]
+            result_cache.bump_games(cursor, inserted_ids + updated_ids)
+            season = GAME_COLUMNS.index('season')
+            audit_games.refresh_counters(cursor, {row[season] for row in inserts}
+                                         | {row[season - 1] for row in updates})
+
+    return {'inserted': len(inserts), 'updated': len(updates), 'unchanged': unchanged}
@@ -6,9 +6,10 @@ This script is experimental and may be rate-limited or blocked by site changes.
 """
 import csv
 import time
-import requests
 from bs4 import BeautifulSoup
 
+import http_session
+
 CSV_PATH = '../data/missing_batted_ball_coords.csv'
 OUTPUT_PATH = '../data/savant_scraped_coords.csv'
 
@@ -38,7 +39,7 @@ def main():
             url = search_savant_url(batter_id, year)
             print(f"Scraping {url} for game {game_id}, at_bat_index {at_bat_index}")
             try:
-                resp = requests.get(url, headers=HEADERS, timeout=10)
+                resp = http_session.get(url, headers=HEADERS, timeout=10)
                 if resp.status_code != 200:
                     print(f"Failed to fetch {url} (status {resp.status_code})")
                     writer.writerow([game_id, at_bat_index, event_type, batter_id, pitcher_id, event_description, '', '', url])
@@ -53,6 +54,7 @@ def main():
                 print(f"Error scraping {url}: {e}")
                 writer.writerow([game_id, at_bat_index, event_type, batter_id, pitcher_id, event_description, '', '', url])
             time.sleep(1.5)  # Be polite to the server
+    print(http_session.stats.summary_line())
 
 if __name__ == "__main__":
     main()
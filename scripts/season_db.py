@@ -0,0 +1,231 @@
+"""
+Per-Season Database Layout
+Optional layout with one SQLite file per season (data/mlb_2024.db, ...) plus a query layer
+that ATTACHes the seasons a query needs and exposes them through UNION ALL views.
+
+Each season file has the full schema (teams and players included) so the collectors
+can write to it unchanged. Closed seasons can be frozen: they are vacuumed, made
+read-only on disk and then attached with immutable=1, so readers skip locking
+and change detection entirely.
+
+Usage:
+    python season_db.py split                 # split ../data/mlb_data.db into per-season files
+    python season_db.py freeze --season 2023  # vacuum and mark a closed season read-only
+    python season_db.py status
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import stat
+from pathlib import Path
+
+from compact_play_by_play import apply_schema, ensure_play_columns
+
+
+DATA_DIR = "../data"
+SOURCE_DB_PATH = "../data/mlb_data.db"
+SCHEMA_PATH = "../schema.sql"
+
+FACT_TABLES = [
+    'games', 'box_scores_batting', 'box_scores_pitching', 'play_by_play', 'batted_ball_classes', 'play_run_values',
+    'x_outcome', 'runner_state_games',
+]
+SHARED_TABLES = ['teams', 'players']
+
+# game_id is a rowid, so new games in separate files would reuse the same ids.
+# New games in a season file are moved into [season * stride, ...) so ids stay
+# unique when seasons are queried together.
+GAME_ID_STRIDE = 1_000_000
+
+SEASON_FILE_RE = re.compile(r'^mlb_(\d{4})\.db$')
+
+
+def season_db_path(season, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"mlb_{season}.db")
+
+
+def available_seasons(data_dir=DATA_DIR):
+    """Seasons that have a database file in data_dir"""
+    if not os.path.isdir(data_dir):
+        return []
+    return sorted(int(m.group(1)) for m in map(SEASON_FILE_RE.match, os.listdir(data_dir)) if m)
+
+
+def is_frozen(path):
+    """Frozen seasons have the owner write bit cleared"""
+    return os.path.exists(path) and not os.stat(path).st_mode & stat.S_IWUSR
+
+
+def _has_table(conn, schema, table):
+    return conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE name = ? AND type IN ('table', 'view')", (table,)
+    ).fetchone() is not None
+
+
+def _columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _game_id_trigger(season):
+    floor = season * GAME_ID_STRIDE
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS games_season_game_id AFTER INSERT ON games
+        WHEN NEW.game_id < {floor}
+        BEGIN
+            UPDATE games SET game_id = NEW.game_id + {floor} WHERE game_id = NEW.game_id;
+        END;
+    """
+
+
+def ensure_season_db(season, data_dir=DATA_DIR):
+    """Create the season database with the full schema if needed; returns its path"""
+    path = season_db_path(season, data_dir)
+    if is_frozen(path):
+        raise PermissionError(f"{path} is frozen (read-only); unfreeze it before writing")
+    os.makedirs(data_dir, exist_ok=True)
+    with open(SCHEMA_PATH) as f:
+        schema_sql = f.read()
+    conn = sqlite3.connect(path)
+    apply_schema(conn, schema_sql)
+    conn.executescript(_game_id_trigger(season))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+    return path
+
+
+def split_database(source_path=SOURCE_DB_PATH, data_dir=DATA_DIR, seasons=None):
+    """Copy each season's games, box scores and plays (plus teams/players) into its own file"""
+    src = sqlite3.connect(source_path)
+    # Season files get the current schema, so the source needs columns added since it was created
+    ensure_play_columns(src)
+    src.commit()
+    if seasons is None:
+        seasons = [row[0] for row in src.execute("SELECT DISTINCT season FROM games ORDER BY season")]
+    src.close()
+
+    for season in seasons:
+        path = season_db_path(season, data_dir)
+        if os.path.exists(path):
+            print(f"  {season}: {path} already exists, skipping")
+            continue
+        os.makedirs(data_dir, exist_ok=True)
+        with open(SCHEMA_PATH) as f:
+            schema_sql = f.read()
+        conn = sqlite3.connect(path)
+        conn.executescript(schema_sql)
+        conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+        with conn:
+            for table in SHARED_TABLES:
+                conn.execute(f"INSERT INTO main.{table} SELECT * FROM src.{table}")
+            conn.execute("INSERT INTO main.games SELECT * FROM src.games WHERE season = ?", (season,))
+            for table in FACT_TABLES[1:]:
+                if not _has_table(conn, 'src', table):
+                    continue  # e.g. batted_ball_classes before the first classify run
+                conn.execute(f"""
+                    INSERT INTO main.{table}
+                    SELECT * FROM src.{table}
+                    WHERE game_id IN (SELECT game_id FROM main.games)
+                """)
+        conn.execute("DETACH DATABASE src")
+        # Added after the copy so existing game_ids are kept as they are
+        conn.executescript(_game_id_trigger(season))
+        counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in FACT_TABLES}
+        conn.execute("ANALYZE")
+        conn.close()
+        print(f"  {season}: " + ", ".join(f"{t} {n:,}" for t, n in counts.items()))
+
+
+def freeze_season(season, data_dir=DATA_DIR):
+    """Vacuum a closed season and make its file read-only so it is attached with immutable=1"""
+    path = season_db_path(season, data_dir)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=DELETE")  # immutable readers can't see a WAL
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
+    conn.close()
+    mode = os.stat(path).st_mode
+    os.chmod(path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def unfreeze_season(season, data_dir=DATA_DIR):
+    path = season_db_path(season, data_dir)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IWUSR)
+
+
+def season_uri(path):
+    """Read-only URI for a season file; frozen seasons are also immutable"""
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    if is_frozen(path):
+        uri += "&immutable=1"
+    return uri
+
+
+def connect_seasons(seasons, data_dir=DATA_DIR):
+    """
+    Open a read-only connection that sees the given seasons as one database.
+
+    The season files are attached as s2023, s2024, ... and TEMP views named after the
+    regular tables UNION ALL them, so existing queries run unchanged.
+    SQLite allows 10 attached databases by default.
+    """
+    seasons = [s for s in sorted(set(seasons)) if os.path.exists(season_db_path(s, data_dir))]
+    if not seasons:
+        raise FileNotFoundError(f"No season databases found in {data_dir}")
+
+    conn = sqlite3.connect("file::memory:", uri=True)
+    for season in seasons:
+        conn.execute("ATTACH DATABASE ? AS ?", (season_uri(season_db_path(season, data_dir)), f"s{season}"))
+
+    for table in FACT_TABLES:
+        # Season files created before a table (or column) was added to the schema don't have it;
+        # frozen files can't be migrated, so missing columns read as NULL
+        present = {season: _columns(conn, f"s{season}", table) for season in seasons
+                   if _has_table(conn, f"s{season}", table)}
+        columns = max(present.values(), key=len, default=[])
+        parts = [f"SELECT {', '.join(c if c in have else f'NULL AS {c}' for c in columns)} FROM s{season}.{table}"
+                 for season, have in present.items()]
+        if parts:
+            union = "\nUNION ALL\n".join(parts)
+            conn.execute(f"CREATE TEMP VIEW {table} AS {union}")
+    # Teams and players are copied into every season; take one row per id
+    for table, key in (('teams', 'team_id'), ('players', 'player_id')):
+        union = "\nUNION ALL\n".join(f"SELECT * FROM s{season}.{table}" for season in reversed(seasons))
+        conn.execute(f"CREATE TEMP VIEW {table} AS SELECT * FROM ({union}) GROUP BY {key}")
+    return conn
+
+
+def connect_date_range(start_date, end_date, data_dir=DATA_DIR):
+    """connect_seasons() for the seasons a YYYY-MM-DD date range touches"""
+    return connect_seasons(range(int(start_date[:4]), int(end_date[:4]) + 1), data_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the per-season database layout')
+    parser.add_argument('command', choices=['split', 'freeze', 'unfreeze', 'status'])
+    parser.add_argument('--season', type=int, action='append', help='Season(s) to act on (default: all)')
+    parser.add_argument('--source', default=SOURCE_DB_PATH, help='Single-file database to split')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        print(f"Splitting {args.source} into per-season databases in {args.data_dir}")
+        split_database(args.source, args.data_dir, args.season)
+    elif args.command in ('freeze', 'unfreeze'):
+        for season in args.season or available_seasons(args.data_dir):
+            if args.command == 'freeze':
+                freeze_season(season, args.data_dir)
+                print(f"  {season}: frozen (read-only, attached immutable)")
+            else:
+                unfreeze_season(season, args.data_dir)
+                print(f"  {season}: writable")
+    else:
+        for season in available_seasons(args.data_dir):
+            path = season_db_path(season, args.data_dir)
+            state = 'frozen' if is_frozen(path) else 'live'
+            print(f"  {season}: {os.path.getsize(path) / 1e6:8.1f} MB  {state}")
+
+
+if __name__ == '__main__':
+    main()
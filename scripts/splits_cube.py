@@ -0,0 +1,399 @@
+"""
+Splits Cube
+Pre-aggregated plate appearance outcomes for platoon, count, inning and base-out splits.
+
+splits_cube holds one row per
+    batter x season x pitcher hand x count x base state x outs x inning group
+with summed counting stats and launch metrics. A split is a SUM over matching cells
+(grouped by whichever dimensions you ask for), so it never touches play_by_play.
+
+Dimensions, from each plate appearance's play_by_play row:
+  - pitch_hand: the pitcher's hand for the plate appearance as the feed recorded it
+    (play_by_play.pitch_hand: 'L', 'R', or '' if unknown), not the mutable players row
+  - balls/strikes: the count the plate appearance ended on
+  - base_state/outs: runners and outs when the plate appearance started (the
+    previous play's end state in the same half inning), base_state bits 1B=1, 2B=2, 3B=4.
+    base_state is -1 (unknown) for games not in runner_state_games: their plays were
+    stored before runners were carried from play to play, so re-collect them to fill it in
+  - inning_group: 1 (innings 1-3), 2 (4-6), 3 (7-9), 4 (extras)
+
+Cells are additive, so ingestion keeps the cube current per game:
+game_feed.write_game subtracts a game's cells before its plays are replaced and
+adds them back afterwards. Run --build to add games not in the cube yet. A cube
+built with a different CUBE_VERSION is rebuilt the next time it is opened.
+
+Usage:
+    python splits_cube.py --build
+    python splits_cube.py --player "Bryce Harper" --season 2025 --by pitch_hand
+    python splits_cube.py --player "Bryce Harper" --by count --vs L
+    python splits_cube.py --season 2025 --by base_state,outs --leaders ops --min-pa 30 --risp
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+
+from classify_batted_balls import HIT_EVENTS
+from compact_play_by_play import ensure_play_columns
+
+
+DB_PATH = "../data/mlb_data.db"
+
+DIMENSIONS = ['batter_id', 'season', 'pitch_hand', 'balls', 'strikes', 'base_state', 'outs', 'inning_group']
+MEASURES = [
+    'plate_appearances', 'at_bats', 'hits', 'doubles', 'triples', 'home_runs', 'walks', 'strikeouts',
+    'hit_by_pitch', 'sacrifice_hits', 'sacrifice_flies', 'batted_balls', 'launch_speed_sum',
+    'launch_angle_sum', 'hard_hit',
+]
+
+INNING_GROUPS = {1: '1-3', 2: '4-6', 3: '7-9', 4: 'extras'}
+BASE_STATES = {0: '---', 1: '1--', 2: '-2-', 3: '12-', 4: '--3', 5: '1-3', 6: '-23', 7: '123'}
+UNKNOWN_BASE_STATE = -1
+HARD_HIT_SPEED = 95.0
+# Bump when what a cell counts changes; a cube built by another version is rebuilt
+CUBE_VERSION = 3
+
+WALK_EVENTS = frozenset(['walk', 'intent_walk'])
+STRIKEOUT_EVENTS = frozenset(['strikeout', 'strikeout_double_play'])
+SAC_BUNT_EVENTS = frozenset(['sac_bunt', 'sac_bunt_double_play'])
+SAC_FLY_EVENTS = frozenset(['sac_fly', 'sac_fly_double_play'])
+# Plays that end a plate appearance without it counting as an at bat
+NON_AT_BAT_EVENTS = WALK_EVENTS | SAC_BUNT_EVENTS | SAC_FLY_EVENTS | frozenset(['hit_by_pitch', 'catcher_interf'])
+# Plays recorded in allPlays that aren't plate appearances (the inning ended on the bases)
+NON_PA_EVENTS = frozenset([
+    'caught_stealing_2b', 'caught_stealing_3b', 'caught_stealing_home',
+    'pickoff_1b', 'pickoff_2b', 'pickoff_3b', 'pickoff_caught_stealing_2b',
+    'pickoff_caught_stealing_3b', 'pickoff_caught_stealing_home', 'pickoff_error_1b',
+    'pickoff_error_2b', 'pickoff_error_3b', 'stolen_base_2b', 'stolen_base_3b', 'stolen_base_home',
+    'wild_pitch', 'passed_ball', 'balk', 'other_advance', 'runner_double_play', 'defensive_indiff',
+    'game_advisory', 'batter_timeout', 'error',
+])
+
+CUBE_SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS splits_cube (
+        batter_id INTEGER NOT NULL,
+        season INTEGER NOT NULL,
+        pitch_hand TEXT NOT NULL,
+        balls INTEGER NOT NULL,
+        strikes INTEGER NOT NULL,
+        base_state INTEGER NOT NULL,
+        outs INTEGER NOT NULL,
+        inning_group INTEGER NOT NULL,
+        {', '.join(f'{m} {"REAL" if m.endswith("_sum") else "INTEGER"} NOT NULL DEFAULT 0' for m in MEASURES)},
+        PRIMARY KEY ({', '.join(DIMENSIONS)})
+    ) WITHOUT ROWID
+    """,
+    "CREATE TABLE IF NOT EXISTS splits_games (game_id INTEGER PRIMARY KEY)",
+    "CREATE TABLE IF NOT EXISTS splits_version (version INTEGER NOT NULL)",
+]
+
+
+def _in(events):
+    return f"({', '.join(repr(e) for e in sorted(events))})"
+
+
+# One row per plate appearance with its start state; {games} limits the game set
+_PLAYS = f"""
+    SELECT p.game_id, p.batter_id, p.pitch_hand, p.inning, p.balls, p.strikes, p.event_type,
+           p.launch_speed, p.launch_angle,
+           CASE WHEN p.game_id IN (SELECT game_id FROM runner_state_games)
+                THEN COALESCE(LAG((p.runner_on_first_id IS NOT NULL) + 2 * (p.runner_on_second_id IS NOT NULL)
+                                  + 4 * (p.runner_on_third_id IS NOT NULL)) OVER half_inning, 0)
+                ELSE {UNKNOWN_BASE_STATE} END AS base_state,
+           COALESCE(LAG(p.outs) OVER half_inning, 0) AS outs
+    FROM play_by_play p
+    WHERE p.game_id IN ({{games}})
+    WINDOW half_inning AS (PARTITION BY p.game_id, p.inning, p.half_inning ORDER BY p.at_bat_index)
+"""
+
+_CELLS = f"""
+    SELECT pa.batter_id,
+           g.season,
+           COALESCE(pa.pitch_hand, '') AS pitch_hand,
+           COALESCE(pa.balls, 0),
+           COALESCE(pa.strikes, 0),
+           pa.base_state,
+           MIN(pa.outs, 2),
+           CASE WHEN pa.inning <= 3 THEN 1 WHEN pa.inning <= 6 THEN 2 WHEN pa.inning <= 9 THEN 3 ELSE 4 END,
+           {{sign}} * COUNT(*),
+           {{sign}} * SUM(pa.event_type NOT IN {_in(NON_AT_BAT_EVENTS)}),
+           {{sign}} * SUM(pa.event_type IN {_in(HIT_EVENTS)}),
+           {{sign}} * SUM(pa.event_type = 'double'),
+           {{sign}} * SUM(pa.event_type = 'triple'),
+           {{sign}} * SUM(pa.event_type = 'home_run'),
+           {{sign}} * SUM(pa.event_type IN {_in(WALK_EVENTS)}),
+           {{sign}} * SUM(pa.event_type IN {_in(STRIKEOUT_EVENTS)}),
+           {{sign}} * SUM(pa.event_type = 'hit_by_pitch'),
+           {{sign}} * SUM(pa.event_type IN {_in(SAC_BUNT_EVENTS)}),
+           {{sign}} * SUM(pa.event_type IN {_in(SAC_FLY_EVENTS)}),
+           {{sign}} * COUNT(pa.launch_speed),
+           {{sign}} * COALESCE(SUM(pa.launch_speed), 0),
+           {{sign}} * COALESCE(SUM(pa.launch_angle), 0),
+           {{sign}} * COALESCE(SUM(pa.launch_speed >= {HARD_HIT_SPEED}), 0)
+    FROM ({_PLAYS}) pa
+    JOIN games g ON g.game_id = pa.game_id
+    WHERE pa.batter_id IS NOT NULL AND pa.event_type IS NOT NULL AND pa.event_type NOT IN {_in(NON_PA_EVENTS)}
+    GROUP BY 1, 2, 3, 4, 5, 6, 7, 8
+"""
+
+MERGE_SQL = f"""
+    INSERT INTO splits_cube ({', '.join(DIMENSIONS + MEASURES)})
+    {_CELLS}
+    ON CONFLICT ({', '.join(DIMENSIONS)}) DO UPDATE SET
+        {', '.join(f'{m} = {m} + excluded.{m}' for m in MEASURES)}
+"""
+
+
+# Games whose plays were parsed with runners carried through each half inning
+# (game_feed.parse_plays). Older plays only list the runners who moved on each play,
+# so their base-out states are not trusted.
+RUNNER_STATE_SCHEMA = "CREATE TABLE IF NOT EXISTS runner_state_games (game_id INTEGER PRIMARY KEY)"
+
+
+def ensure_runner_state(cursor):
+    cursor.execute(RUNNER_STATE_SCHEMA)
+
+
+def mark_runner_state(cursor, game_id, trusted=True):
+    """Record whether a game's stored plays have trustworthy runners (call after writing them)"""
+    ensure_runner_state(cursor)
+    if trusted:
+        cursor.execute("INSERT OR IGNORE INTO runner_state_games (game_id) VALUES (?)", (game_id,))
+    else:
+        cursor.execute("DELETE FROM runner_state_games WHERE game_id = ?", (game_id,))
+
+
+def _create_tables(cursor):
+    for statement in CUBE_SCHEMA:
+        cursor.execute(statement)
+    ensure_runner_state(cursor)
+    # Cells group on play_by_play.pitch_hand, which older databases don't have yet
+    ensure_play_columns(cursor)
+
+
+def _outdated(cursor):
+    row = cursor.execute("SELECT version FROM splits_version").fetchone()
+    return row is None or row[0] != CUBE_VERSION
+
+
+def _clear(cursor):
+    """Empty the cube and stamp it with this CUBE_VERSION"""
+    cursor.execute("DELETE FROM splits_cube")
+    cursor.execute("DELETE FROM splits_games")
+    cursor.execute("DELETE FROM splits_version")
+    cursor.execute("INSERT INTO splits_version (version) VALUES (?)", (CUBE_VERSION,))
+
+
+def _add_missing(cursor):
+    """Add every game with plays that isn't in the cube yet; returns the number of games"""
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS splits_queue (game_id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM temp.splits_queue")
+    cursor.execute("""
+        INSERT INTO temp.splits_queue
+        SELECT game_id FROM games
+        WHERE game_id IN (SELECT game_id FROM play_by_play)
+          AND game_id NOT IN (SELECT game_id FROM splits_games)
+    """)
+    count = cursor.execute("SELECT COUNT(*) FROM temp.splits_queue").fetchone()[0]
+    _merge(cursor, "SELECT game_id FROM temp.splits_queue")
+    cursor.execute("INSERT INTO splits_games SELECT game_id FROM temp.splits_queue")
+    cursor.execute("DELETE FROM temp.splits_queue")
+    return count
+
+
+def ensure_schema(cursor):
+    """
+    Create the cube tables if needed (plain statements, safe inside a transaction),
+    and rebuild a cube left by another CUBE_VERSION so removals match what was added
+    """
+    _create_tables(cursor)
+    if _outdated(cursor):
+        _clear(cursor)
+        _add_missing(cursor)
+
+
+def _merge(cursor, games_sql, params=(), sign=1):
+    cursor.execute(MERGE_SQL.format(games=games_sql, sign=sign), params)
+
+
+def _prune(cursor, game_id):
+    """Drop emptied cells of the game's batters (merges can leave plate_appearances at 0)"""
+    cursor.execute("""
+        DELETE FROM splits_cube
+        WHERE plate_appearances = 0 AND batter_id IN (SELECT batter_id FROM play_by_play WHERE game_id = ?)
+    """, (game_id,))
+
+
+def remove_game(cursor, game_id):
+    """Subtract a game's cells (call before its plays are deleted)"""
+    ensure_schema(cursor)
+    if cursor.execute("DELETE FROM splits_games WHERE game_id = ?", (game_id,)).rowcount:
+        _merge(cursor, "?", (game_id,), sign=-1)
+        _prune(cursor, game_id)
+
+
+def add_game(cursor, game_id):
+    """Add a game's cells (call after its plays are inserted)"""
+    ensure_schema(cursor)
+    remove_game(cursor, game_id)
+    _merge(cursor, "?", (game_id,))
+    _prune(cursor, game_id)
+    cursor.execute("INSERT INTO splits_games (game_id) VALUES (?)", (game_id,))
+
+
+def build(conn, rebuild=False):
+    """Add every game with plays that isn't in the cube yet (all of them with rebuild)"""
+    cursor = conn.cursor()
+    with conn:
+        _create_tables(cursor)
+        if rebuild or _outdated(cursor):
+            _clear(cursor)
+        return _add_missing(cursor)
+
+
+def query(conn, by=(), batter_ids=None, seasons=None, pitch_hand=None, counts=None,
+          base_states=None, outs=None, inning_groups=None):
+    """
+    Sum cube cells matching the filters, grouped by the `by` dimensions.
+    counts are 'B-S' strings; other filters take lists of dimension values.
+    Returns a DataFrame with the summed stats and AVG/OBP/SLG/OPS, exit velocity and hard-hit rate.
+    """
+    import pandas as pd
+    from rolling_stats import add_rates
+
+    where, params = [], []
+
+    def add_filter(column, values):
+        if values is not None:
+            values = list(values)
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+    add_filter('batter_id', batter_ids)
+    add_filter('season', seasons)
+    add_filter('pitch_hand', [pitch_hand] if isinstance(pitch_hand, str) else pitch_hand)
+    add_filter('base_state', base_states)
+    add_filter('outs', outs)
+    add_filter('inning_group', inning_groups)
+    if counts is not None:
+        pairs = [tuple(int(n) for n in c.split('-')) for c in counts]
+        where.append("(" + " OR ".join("(balls = ? AND strikes = ?)" for _ in pairs) + ")")
+        params.extend(n for pair in pairs for n in pair)
+
+    by = list(by)
+    unknown = set(by) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown split dimension(s): {', '.join(sorted(unknown))}")
+    select = ', '.join(by + [f"SUM({m}) AS {m}" for m in MEASURES])
+    sql = f"SELECT {select} FROM splits_cube"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if by:
+        sql += f" GROUP BY {', '.join(by)} ORDER BY {', '.join(by)}"
+    df = pd.read_sql_query(sql, conn, params=params)
+    df = df[df['plate_appearances'].fillna(0) > 0].reset_index(drop=True)
+    df = add_rates(df)
+    df['pa'] = df['plate_appearances']
+    batted = df['batted_balls'].where(df['batted_balls'] > 0)
+    df['avg_exit_velo'] = df['launch_speed_sum'] / batted
+    df['avg_launch_angle'] = df['launch_angle_sum'] / batted
+    df['hard_hit_rate'] = df['hard_hit'] / batted
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Platoon, count, inning and base-out splits from the splits cube')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--build', action='store_true', help='Add games not in the cube yet')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the cube from play_by_play')
+    parser.add_argument('--player', help='Comma-separated player names (default: all batters)')
+    parser.add_argument('--season', type=int, action='append', help='Season(s) to include')
+    parser.add_argument('--by', default='', help=f"Comma-separated dimensions to split by: {', '.join(DIMENSIONS)} "
+                                                 "(also: count = balls,strikes; inning = inning_group)")
+    parser.add_argument('--vs', choices=['L', 'R'], help='Only plate appearances against this pitcher hand')
+    parser.add_argument('--count', action='append', help='Only plate appearances ending on this count, e.g. 3-2')
+    parser.add_argument('--outs', type=int, action='append', choices=[0, 1, 2], help='Only with these outs')
+    parser.add_argument('--risp', action='store_true', help='Only with runners in scoring position')
+    parser.add_argument('--leaders', choices=['avg', 'obp', 'slg', 'ops', 'home_runs', 'avg_exit_velo'],
+                        help='Sort batters by this stat (adds batter_id to --by)')
+    parser.add_argument('--min-pa', type=int, default=0, help='Minimum plate appearances per row')
+    parser.add_argument('--top', type=int, default=25, help='Rows to print with --leaders')
+    parser.add_argument('--output', help='Write the result to this CSV file')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    if args.build or args.rebuild:
+        t0 = time.perf_counter()
+        count = build(conn, args.rebuild)
+        cells = conn.execute("SELECT COUNT(*) FROM splits_cube").fetchone()[0]
+        print(f"Added {count:,} games to the splits cube ({cells:,} cells) in {time.perf_counter() - t0:.1f}s")
+        unknown = conn.execute("""
+            SELECT COUNT(*) FROM splits_games WHERE game_id NOT IN (SELECT game_id FROM runner_state_games)
+        """).fetchone()[0]
+        if unknown:
+            print(f"{unknown:,} games have no trustworthy runner state (base_state '?'); re-collect them "
+                  f"to split them by base state")
+        if not (args.player or args.by or args.leaders):
+            conn.close()
+            return
+
+    aliases = {'count': ['balls', 'strikes'], 'inning': ['inning_group'], 'hand': ['pitch_hand']}
+    by = [dim for name in args.by.split(',') if name.strip() for dim in aliases.get(name.strip(), [name.strip()])]
+    if args.leaders and 'batter_id' not in by:
+        by.insert(0, 'batter_id')
+
+    batter_ids = None
+    if args.player:
+        from spray_chart_compare import resolve_players
+
+        players = resolve_players(conn, [name.strip() for name in args.player.split(',') if name.strip()])
+        if not players:
+            print('No matching players found.')
+            sys.exit(1)
+        batter_ids = [player_id for player_id, _ in players]
+
+    import pandas  # imported before timing so the reported time is the query itself
+
+    t0 = time.perf_counter()
+    try:
+        df = query(conn, by, batter_ids, args.season, args.vs, args.count,
+                   base_states=[2, 3, 4, 5, 6, 7] if args.risp else None, outs=args.outs)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    df = df[df['pa'] >= args.min_pa]
+    if 'batter_id' in df:
+        from rolling_stats import player_names
+
+        df.insert(df.columns.get_loc('batter_id') + 1, 'name', df['batter_id'].map(player_names(conn, df['batter_id'].unique())))
+    conn.close()
+    if 'base_state' in df:
+        df['base_state'] = df['base_state'].map({**BASE_STATES, UNKNOWN_BASE_STATE: '?'})
+    if 'inning_group' in df:
+        df['inning_group'] = df['inning_group'].map(INNING_GROUPS)
+    if args.leaders:
+        df = df.sort_values(args.leaders, ascending=False).head(args.top)
+
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"{len(df):,} rows written to {args.output}")
+        return
+    if df.empty:
+        print('No plate appearances match.')
+        return
+    from rolling_stats import format_table
+
+    columns = [c for c in by if c in df] + (['name'] if 'name' in df else []) + [
+        'pa', 'at_bats', 'hits', 'home_runs', 'walks', 'strikeouts', 'avg', 'obp', 'slg', 'ops']
+    df = df[columns + ['avg_exit_velo', 'hard_hit_rate']].copy()
+    df['avg_exit_velo'] = df['avg_exit_velo'].round(1)
+    df['hard_hit_rate'] = (df['hard_hit_rate'] * 100).round(1)
+    print(format_table(df.drop(columns=[c for c in ['batter_id'] if c in df and 'name' in df])))
+    print(f"({elapsed_ms:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,90 +1,104 @@
 import argparse
-import sqlite3
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import numpy as np
+import os
 import sys
 from datetime import datetime
 
-DB_PATH = 'data/mlb_data.db'
-
-# --- Field geometry (simple MLB field) ---
-def draw_field(ax):
-    home_plate = np.array([0, 0])
-    first_base = np.array([90, 0])
-    second_base = np.array([90, 90])
-    third_base = np.array([0, 90])
-    mound = np.array([60.5, 0])
-    # Outfield fence: 400ft to center, 330ft to corners
-    fence_points = []
-    for angle in np.linspace(45, 135, 200):
-        rad = np.deg2rad(angle)
-        dist = 330 + (400-330)*np.cos(np.deg2rad(angle-90))
-        x = dist * np.cos(rad)
-        y = dist * np.sin(rad)
-        fence_points.append([x, y])
-    fence_points = np.array(fence_points)
-    # Outfield grass
-    outfield_poly = plt.Polygon(fence_points, closed=True, color='#cbe7ea', zorder=1)
+import batted_ball_store
+import field_geometry
+import query_api
+import season_db
+
+# Absolute, so the chart scripts find the database from any directory
+DB_PATH = query_api.DB_PATH
+DATA_DIR = os.path.dirname(DB_PATH)
+
+POINT_STYLE = dict(alpha=0.85, c='#e6550d', edgecolors='white', linewidths=1.5, s=60, zorder=20)
+
+# pandas, numpy and matplotlib are imported where they are used so --help and
+# "player not found" exit without loading them.
+
+# --- Field (park geometry from field_geometry, feet from home plate) ---
+def draw_field(ax, venue=None):
+    """Draw a park (a field_geometry.VenueGeometry; default the generic field)"""
+    import matplotlib.patches as patches
+    import numpy as np
+
+    venue = venue or field_geometry.get_venue()
+    fence = venue.fence
+    home_plate, first_base, second_base, third_base = venue.bases
+    # Outfield grass: fair territory inside the fence
+    outfield_poly = patches.Polygon(np.vstack([home_plate, fence]), closed=True, color='#cbe7ea', zorder=1)
     ax.add_patch(outfield_poly)
     # Basepaths
     ax.plot([home_plate[0], first_base[0], second_base[0], third_base[0], home_plate[0]],
             [home_plate[1], first_base[1], second_base[1], third_base[1], home_plate[1]], color='gray', lw=2)
     # Bases
     base_size = 5
-    for base in [home_plate, first_base, second_base, third_base]:
+    for base in venue.bases:
         ax.add_patch(patches.Rectangle(base - base_size/2, base_size, base_size, color='white', ec='black', zorder=10))
     # Mound
     mound_radius = 9
-    ax.add_patch(patches.Circle(mound, mound_radius, edgecolor='gray', facecolor='#e6d3b3', lw=1, alpha=0.7, zorder=5))
+    ax.add_patch(patches.Circle(venue.mound, mound_radius, edgecolor='gray', facecolor='#e6d3b3', lw=1, alpha=0.7, zorder=5))
     # Outfield fence
-    ax.plot(fence_points[:,0], fence_points[:,1], color='#b2c7c7', lw=2, zorder=6)
+    ax.plot(fence[:,0], fence[:,1], color='#b2c7c7', lw=2, zorder=6)
     # Foul lines
-    ax.plot([home_plate[0], fence_points[0,0]], [home_plate[1], fence_points[0,1]], color='#b2c7c7', lw=2, zorder=7)
-    ax.plot([home_plate[0], fence_points[-1,0]], [home_plate[1], fence_points[-1,1]], color='#b2c7c7', lw=2, zorder=7)
-    # Fence distance labels
-    ax.text(fence_points[0,0], fence_points[0,1]-15, '330', color='#b2c7c7', fontsize=12, ha='center', va='center', fontweight='bold')
-    ax.text(fence_points[-1,0], fence_points[-1,1]-15, '330', color='#b2c7c7', fontsize=12, ha='center', va='center', fontweight='bold')
-    ax.text(0, 410, '410', color='#b2c7c7', fontsize=12, ha='center', va='center', fontweight='bold')
-    ax.set_xlim(-50, 450-125)
-    ax.set_ylim(-50, 450)
+    ax.plot([home_plate[0], fence[0,0]], [home_plate[1], fence[0,1]], color='#b2c7c7', lw=2, zorder=7)
+    ax.plot([home_plate[0], fence[-1,0]], [home_plate[1], fence[-1,1]], color='#b2c7c7', lw=2, zorder=7)
+    # Fence distance labels (LF line, CF, RF line), just inside the fence
+    for i, dist in ((0, venue.dimensions[0]), (len(fence) // 2, venue.dimensions[2]), (-1, venue.dimensions[-1])):
+        x, y = fence[i] * (1 - 20 / np.hypot(*fence[i]))
+        ax.text(x, y, str(dist), color='#b2c7c7', fontsize=12, ha='center', va='center', fontweight='bold')
+    reach = fence[:, 0].max() + 30
+    ax.set_xlim(-reach, reach)
+    ax.set_ylim(-30, fence[:, 1].max() + 30)
     ax.set_aspect('equal', adjustable='box')
     ax.axis('off')
 
 def get_player_id(conn, player_name):
-    # Try exact match, then fallback to LIKE
-    cur = conn.cursor()
-    cur.execute("SELECT player_id, full_name FROM players WHERE full_name = ? COLLATE NOCASE", (player_name,))
-    row = cur.fetchone()
-    if row:
-        return row[0], row[1]
-    cur.execute("SELECT player_id, full_name FROM players WHERE full_name LIKE ? COLLATE NOCASE", (f"%{player_name}%",))
-    row = cur.fetchone()
+    """(player_id, full_name) for an exact, else partial, name match; exits if unknown"""
+    row = query_api.find_player(conn, player_name)
     if row:
-        return row[0], row[1]
+        return row
     print(f"Player '{player_name}' not found in database.")
     sys.exit(1)
 
-def query_batted_balls(conn, player_id, start_date, end_date):
-    sql = '''
-    SELECT pbp.coord_x, pbp.coord_y, pbp.event_type, g.game_date
-    FROM play_by_play pbp
-    JOIN games g ON pbp.game_id = g.game_id
-    WHERE pbp.batter_id = ?
-      AND pbp.coord_x IS NOT NULL AND pbp.coord_y IS NOT NULL
-      AND g.game_date BETWEEN ? AND ?
-    '''
-    df = pd.read_sql_query(sql, conn, params=(player_id, start_date, end_date))
-    return df
+def query_batted_balls(conn, player_id, start_date, end_date, pitcher_id=None):
+    """Batted balls by a batter, allowed by a pitcher (player_id None), or in their matchup"""
+    return query_api.batted_balls(conn, player_id=player_id, pitcher_id=pitcher_id, start=start_date, end=end_date)
+
+def chart_subject(batter_name, pitcher_name):
+    """Title/file name subject: the batter, the pitcher (balls allowed), or 'batter vs pitcher'"""
+    if batter_name and pitcher_name:
+        return f"{batter_name} vs {pitcher_name}"
+    return batter_name or f"{pitcher_name} (allowed)"
+
+def plot_spray_chart(ax, df, title, venue=None):
+    draw_field(ax, venue)
+    x, y = field_geometry.statcast_transform(df['coord_x'], df['coord_y'])
+    ax.scatter(x, y, **POINT_STYLE)
+    # Keep balls hit past the drawn field in frame
+    if len(x):
+        reach = max(ax.get_xlim()[1], abs(x).max() + 15)
+        ax.set_xlim(-reach, reach)
+        ax.set_ylim(min(ax.get_ylim()[0], y.min() - 15), max(ax.get_ylim()[1], y.max() + 15))
+    ax.set_title(title, fontsize=14)
 
 def main():
     parser = argparse.ArgumentParser(description="Create a spray chart for any player and date range.")
-    parser.add_argument('--player', required=True, help='Player full name (case-insensitive)')
+    parser.add_argument('--player', help='Batter full name (case-insensitive)')
+    parser.add_argument('--pitcher', help='Pitcher full name: batted balls allowed (with --player, that matchup)')
     parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
     parser.add_argument('--output', default=None, help='Output PNG file (optional)')
+    parser.add_argument('--partitioned', action='store_true', help='Read from the per-season databases (data/mlb_<season>.db)')
+    parser.add_argument('--venue', default=None, help='Draw this park (venue_id or name, e.g. "Fenway"); default generic field')
+    parser.add_argument('--store', action='store_true',
+                        help='Read batted balls from the memory-mapped store (scripts/batted_ball_store.py)')
     args = parser.parse_args()
+    if not (args.player or args.pitcher):
+        parser.error('pass --player and/or --pitcher')
+    if args.store and args.partitioned:
+        parser.error('--store reads the store built for data/mlb_data.db; drop --partitioned')
 
     # Validate dates
     try:
@@ -94,19 +108,40 @@ def main():
         print('Invalid date format. Use YYYY-MM-DD.')
         sys.exit(1)
 
-    conn = sqlite3.connect(DB_PATH)
-    player_id, player_name = get_player_id(conn, args.player)
-    df = query_batted_balls(conn, player_id, args.start, args.end)
+    if args.partitioned:
+        conn = season_db.connect_date_range(args.start, args.end, DATA_DIR)
+    else:
+        conn = query_api.connect(DB_PATH)
+    player_id, batter_name = get_player_id(conn, args.player) if args.player else (None, None)
+    pitcher_id, pitcher_name = get_player_id(conn, args.pitcher) if args.pitcher else (None, None)
+    player_name = chart_subject(batter_name, pitcher_name)
+    try:
+        venue = field_geometry.find_venue(args.venue, conn)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if args.store:
+        store = batted_ball_store.current_store(DB_PATH)
+        if store is None:
+            print("No batted ball store; build it with: python scripts/mlb.py batted-ball-store --build")
+            sys.exit(1)
+        df = batted_ball_store.query_batted_balls(store, player_id, args.start, args.end, pitcher_id)
+    else:
+        df = query_batted_balls(conn, player_id, args.start, args.end, pitcher_id)
     conn.close()
 
     if df.empty:
         print(f"No batted ball data found for {player_name} between {args.start} and {args.end}.")
         sys.exit(0)
 
+    if args.output:
+        # Writing a file doesn't need a GUI toolkit
+        import matplotlib
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(7, 7))
-    draw_field(ax)
-    ax.scatter(df['coord_x'], df['coord_y'], alpha=0.85, c='#e6550d', edgecolors='white', linewidths=1.5, s=60, zorder=20)
-    ax.set_title(f"Spray Chart: {player_name}\n{args.start} to {args.end}", fontsize=14)
+    plot_spray_chart(ax, df, f"Spray Chart: {player_name}\n{args.start} to {args.end}", venue)
     plt.tight_layout()
     if args.output:
         plt.savefig(args.output, dpi=300, bbox_inches='tight', pad_inches=0.05)
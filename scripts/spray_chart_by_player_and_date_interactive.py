@@ -1,78 +1,253 @@
-import numpy as np
 import sqlite3
-import plotly.graph_objects as go
 import argparse
-import pandas as pd
+import os
+import re
 from datetime import datetime
 
-DB_PATH = 'data/mlb_data.db'
-
-# --- Draw a baseball field with specified base coordinates using Plotly ---
-def get_field_shapes():
-    home = (0, 0)
-    first = (63, 63)
-    second = (0, 126)
-    third = (-63, 63)
-    y_shift = 0 - home[1]
-    home = (home[0], home[1] + y_shift)
-    first = (first[0], first[1] + y_shift)
-    second = (second[0], second[1] + y_shift)
-    third = (third[0], third[1] + y_shift)
-    diamond_x = [home[0], first[0], second[0], third[0], home[0]]
-    diamond_y = [home[1], first[1], second[1], third[1], home[1]]
-    fence_angles = np.linspace(-45, 45, 200)
-    fence_x = []
-    fence_y = []
-    for angle in fence_angles:
-        rad = np.deg2rad(angle)
-        radius = 330 + (400 - 330) * np.cos(np.deg2rad(angle))
-        fence_x.append(radius * np.sin(rad))
-        fence_y.append(radius * np.cos(rad) + y_shift)
-    foul_left_x = [third[0], fence_x[0]]
-    foul_left_y = [third[1], fence_y[0]]
-    foul_right_x = [first[0], fence_x[-1]]
-    foul_right_y = [first[1], fence_y[-1]]
+import batted_ball_store
+import field_geometry
+import query_api
+import season_db
+from field_geometry import statcast_transform
+from spray_chart_by_player_and_date import DB_PATH, chart_subject, get_player_id
+
+DATA_DIR = os.path.dirname(DB_PATH)
+
+# numpy, pandas and plotly are imported where they are used so --help and
+# "player not found" exit without loading them.
+
+# --- Field outline for Plotly, from the park geometry in field_geometry ---
+def get_field_shapes(venue=None):
+    """Diamond, fence and foul line coordinates for a park (field_geometry.VenueGeometry; default generic)"""
+    venue = venue or field_geometry.get_venue()
+    bases = venue.bases
+    fence = venue.fence
+    y_shift = 0
+    diamond_x = [*bases[:, 0], bases[0, 0]]
+    diamond_y = [*bases[:, 1], bases[0, 1]]
+    fence_x = fence[:, 0]
+    fence_y = fence[:, 1]
+    foul_left_x = [bases[0, 0], fence_x[0]]
+    foul_left_y = [bases[0, 1], fence_y[0]]
+    foul_right_x = [bases[0, 0], fence_x[-1]]
+    foul_right_y = [bases[0, 1], fence_y[-1]]
     return diamond_x, diamond_y, fence_x, fence_y, foul_left_x, foul_left_y, foul_right_x, foul_right_y, y_shift
 
-def get_player_id(conn, player_name):
-    cur = conn.cursor()
-    cur.execute("SELECT player_id, full_name FROM players WHERE full_name = ? COLLATE NOCASE", (player_name,))
-    row = cur.fetchone()
-    if row:
-        return row[0], row[1]
-    cur.execute("SELECT player_id, full_name FROM players WHERE full_name LIKE ? COLLATE NOCASE", (f"%{player_name}%",))
-    row = cur.fetchone()
-    if row:
-        return row[0], row[1]
-    print(f"Player '{player_name}' not found in database.")
-    exit(1)
-
-def query_batted_balls(conn, player_id, start_date, end_date):
-    sql = '''
-    SELECT pbp.coord_x, pbp.coord_y, pbp.event_type, g.game_date
-    FROM play_by_play pbp
-    JOIN games g ON pbp.game_id = g.game_id
-    WHERE pbp.batter_id = ?
-      AND pbp.coord_x IS NOT NULL AND pbp.coord_y IS NOT NULL
-      AND g.game_date BETWEEN ? AND ?
-    '''
-    df = pd.read_sql_query(sql, conn, params=(player_id, start_date, end_date))
-    return df
-
-def statcast_transform(hc_x, hc_y):
-    # Statcast to field transformation (same as original script)
-    x = 2.5 * (hc_x - 125.42)
-    y = 2.5 * (198.27 - hc_y)
-    return x, y
+def has_x_outcome(conn):
+    """Whether x_outcome (expected stats from x_outcome.py) can be read on this connection"""
+    try:
+        conn.execute("SELECT 1 FROM x_outcome LIMIT 0")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def query_batted_balls(conn, player_id, start_date, end_date, pitcher_id=None):
+    """
+    Batted balls for one batter, allowed by one pitcher, or their matchup; every batted
+    ball when both are None. Includes xba/xslg when x_outcome has scored them.
+    """
+    return query_api.batted_balls(conn, player_id=player_id, pitcher_id=pitcher_id, start=start_date, end=end_date,
+                                  expected=has_x_outcome(conn))
+
+EVENT_COLORS = {
+    'home_run': 'red',
+    'single': 'green',
+    'double': 'blue',
+    'triple': 'purple',
+}
+
+def event_color(etype):
+    if etype in EVENT_COLORS:
+        return EVENT_COLORS[etype]
+    if etype and 'out' in etype:
+        return 'gray'
+    return 'black'
+
+def field_traces(field=None):
+    """Diamond, fence and foul line traces for a get_field_shapes() result"""
+    import plotly.graph_objects as go
+
+    diamond_x, diamond_y, fence_x, fence_y, foul_left_x, foul_left_y, foul_right_x, foul_right_y, _ = field or get_field_shapes()
+    line = dict(color='black', width=2)
+    return [
+        go.Scatter(x=diamond_x, y=diamond_y, mode='lines', line=line, showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=fence_x, y=fence_y, mode='lines', line=line, showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=foul_left_x, y=foul_left_y, mode='lines', line=line, showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=foul_right_x, y=foul_right_y, mode='lines', line=line, showlegend=False, hoverinfo='skip'),
+    ]
+
+# Above GL_POINT_THRESHOLD batted balls, points are drawn with WebGL as one trace per
+# outcome (typed arrays, no per-point hover strings); above DENSITY_POINT_THRESHOLD
+# they are aggregated into DENSITY_BIN_FEET square bins and hover describes each bin.
+GL_POINT_THRESHOLD = 2000
+DENSITY_POINT_THRESHOLD = 20000
+DENSITY_BIN_FEET = 10
+RENDER_MODES = ['auto', 'points', 'density']
+
+HIT_EVENTS = ('single', 'double', 'triple', 'home_run')
+
+def render_mode(n_points, mode='auto'):
+    if mode != 'auto':
+        return mode
+    return 'density' if n_points > DENSITY_POINT_THRESHOLD else 'points'
+
+def gl_point_traces(x, y, event_types):
+    """One Scattergl trace per outcome color; coordinates go out as float32 typed arrays"""
+    import numpy as np
+    import plotly.graph_objects as go
+
+    colors = np.array([event_color(etype) for etype in event_types])
+    labels = {color: etype for etype, color in EVENT_COLORS.items()}
+    labels.update({'gray': 'out', 'black': 'other'})
+    traces = []
+    for color in ['gray', 'black', 'green', 'blue', 'purple', 'red']:
+        mask = colors == color
+        if not mask.any():
+            continue
+        traces.append(go.Scattergl(
+            x=x[mask].astype(np.float32), y=y[mask].astype(np.float32), mode='markers',
+            marker=dict(color=color, size=4, opacity=0.6),
+            name=f"{labels[color]} ({int(mask.sum())})",
+            hovertemplate='%{fullData.name}<br>x: %{x:.1f} ft<br>y: %{y:.1f} ft<extra></extra>'))
+    return traces
+
+def density_trace(x, y, event_types, bin_feet=DENSITY_BIN_FEET):
+    """
+    Aggregate batted balls into square bins (NumPy, server side) as a heatmap.
+
+    Hover shows per-bin counts instead of individual balls: balls, hit rate,
+    home runs and average distance.
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    # Bins cover only where balls landed; edges are aligned to bin_feet
+    x_edges = np.arange(np.floor(x.min() / bin_feet) * bin_feet, x.max() + bin_feet, bin_feet)
+    y_edges = np.arange(np.floor(y.min() / bin_feet) * bin_feet, y.max() + bin_feet, bin_feet)
+    event_types = np.asarray(event_types, dtype=object)
+    hits = np.isin(event_types, HIT_EVENTS)
+    home_runs = event_types == 'home_run'
+    distance = np.hypot(x, y)
+
+    def binned(weights=None):
+        counts, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges], weights=weights)
+        return counts.T  # heatmap rows are y
+
+    count = binned()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hit_rate = binned(hits.astype(float)) / count
+        avg_distance = binned(distance) / count
+    customdata = np.dstack([count, hit_rate, binned(home_runs.astype(float)), avg_distance]).astype(np.float32)
+    return go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=np.where(count > 0, count, np.nan).astype(np.float32),  # empty bins stay transparent
+        customdata=customdata, colorscale='YlOrRd', colorbar=dict(title='Balls'),
+        hovertemplate=('x: %{x:.0f} ft, y: %{y:.0f} ft<br>Balls: %{customdata[0]:.0f}'
+                       '<br>Hit rate: %{customdata[1]:.3f}<br>Home runs: %{customdata[2]:.0f}'
+                       '<br>Avg distance: %{customdata[3]:.0f} ft<extra></extra>'),
+    )
+
+def expected_stats(df):
+    """
+    xBA/xSLG arrays for the batted balls: x_outcome scores where stored, the lookup
+    grid (x_outcome_grid.py) for the rest when one is built, NaN otherwise.
+    Returns (None, None) when neither is available.
+    """
+    import numpy as np
+    import x_outcome_grid
+
+    n = len(df)
+    xba = np.array(df['xba'], dtype=float) if 'xba' in df else np.full(n, np.nan)
+    xslg = np.array(df['xslg'], dtype=float) if 'xslg' in df else np.full(n, np.nan)
+    grid = x_outcome_grid.current_grid() if 'launch_speed' in df else None
+    if grid is not None:
+        speed = df['launch_speed'].to_numpy(dtype=float)
+        angle = df['launch_angle'].to_numpy(dtype=float)
+        missing = np.isnan(xba) & ~np.isnan(speed) & ~np.isnan(angle)
+        if missing.any():
+            _, xba[missing], xslg[missing] = x_outcome_grid.expected_stats(grid, speed[missing], angle[missing])
+    if 'xba' not in df and grid is None:
+        return None, None
+    return xba, xslg
+
+def build_spray_figure(df, title, field=None, mode='auto'):
+    """Plotly spray chart of batted balls (coord_x, coord_y, event_type columns)
+
+    field is a get_field_shapes() result; pass one in to reuse it across charts.
+    mode is 'points', 'density' or 'auto' (density above DENSITY_POINT_THRESHOLD).
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    # Transform Statcast coordinates
+    statcast_x, statcast_y = statcast_transform(df['coord_x'].to_numpy(dtype=float), df['coord_y'].to_numpy(dtype=float))
+    event_types = df['event_type'].tolist()
+
+    field = field or get_field_shapes()
+    y_shift = field[-1]
+    fig = go.Figure()
+    mode = render_mode(len(df), mode)
+    if mode == 'density':
+        # Under the field lines so they stay visible
+        fig.add_trace(density_trace(statcast_x, statcast_y, event_types))
+    for trace in field_traces(field):
+        fig.add_trace(trace)
+
+    if mode == 'points' and len(df) > GL_POINT_THRESHOLD:
+        for trace in gl_point_traces(statcast_x, statcast_y, event_types):
+            fig.add_trace(trace)
+    elif mode == 'points':
+        colors = [event_color(etype) for etype in event_types]
+        distances = np.sqrt(statcast_x**2 + statcast_y**2)
+        hover_text = [f"Event: {etype}<br>x: {x:.1f} ft<br>y: {y:.1f} ft<br>Distance: {d:.1f} ft" for etype, x, y, d in zip(event_types, statcast_x, statcast_y, distances)]
+        xba, xslg = expected_stats(df)
+        if xba is not None:
+            hover_text = [text if a != a else f"{text}<br>xBA: {a:.3f}<br>xSLG: {s:.3f}"
+                          for text, a, s in zip(hover_text, xba, xslg)]
+        fig.add_trace(go.Scatter(
+            x=statcast_x, y=statcast_y, mode='markers',
+            marker=dict(color=colors, size=8, line=dict(width=1, color='black')),
+            text=hover_text, hoverinfo='text', name='Batted Balls'))
+
+    margin_x = (statcast_x.max() - statcast_x.min()) * 0.1 if len(statcast_x) else 50
+    margin_y = (statcast_y.max() - statcast_y.min()) * 0.1 if len(statcast_y) else 50
+    xmin = min(-350, statcast_x.min(initial=0) - margin_x)
+    xmax = max(350, statcast_x.max(initial=0) + margin_x)
+    ymin = min(-20 + y_shift, statcast_y.min(initial=0) - margin_y)
+    ymax = max(450 + y_shift, statcast_y.max(initial=0) + margin_y)
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title='Feet (x)', range=[xmin, xmax], scaleanchor='y', scaleratio=1),
+        yaxis=dict(title='Feet (y)', range=[ymin, ymax]),
+        width=900, height=900,
+        showlegend=mode == 'points' and len(df) > GL_POINT_THRESHOLD,
+    )
+    return fig
 
 def main():
     parser = argparse.ArgumentParser(description="Create an interactive spray chart for any player and date range.")
-    parser.add_argument('--player', required=True, help='Player full name (case-insensitive)')
+    who = parser.add_mutually_exclusive_group()
+    who.add_argument('--player', help='Batter full name (case-insensitive)')
+    who.add_argument('--league', action='store_true', help='Chart every batted ball in the date range')
+    parser.add_argument('--pitcher', help='Pitcher full name: batted balls allowed (with --player, that matchup)')
     parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
     parser.add_argument('--output', default=None, help='Output HTML file (optional)')
+    parser.add_argument('--partitioned', action='store_true', help='Read from the per-season databases (data/mlb_<season>.db)')
     parser.add_argument('--outcome', default=None, help='Filter by batted ball outcome/event type (e.g., Home Run, Single, Out, etc.)')
+    parser.add_argument('--venue', default=None, help='Draw this park (venue_id or name, e.g. "Fenway"); default generic field')
+    parser.add_argument('--mode', choices=RENDER_MODES, default='auto',
+                        help=f'points, density (binned heatmap), or auto: density above {DENSITY_POINT_THRESHOLD:,} balls')
+    parser.add_argument('--store', action='store_true',
+                        help='Read batted balls from the memory-mapped store (scripts/batted_ball_store.py); '
+                             'xBA/xSLG hover then comes from the lookup grid')
     args = parser.parse_args()
+    if not (args.player or args.league or args.pitcher):
+        parser.error('one of --player, --pitcher or --league is required')
+    if args.league and args.pitcher:
+        parser.error('--league charts every batted ball; use --pitcher on its own for a pitcher')
+    if args.store and args.partitioned:
+        parser.error('--store reads the store built for data/mlb_data.db; drop --partitioned')
 
     try:
         datetime.strptime(args.start, '%Y-%m-%d')
@@ -81,9 +256,29 @@ def main():
         print('Invalid date format. Use YYYY-MM-DD.')
         exit(1)
 
-    conn = sqlite3.connect(DB_PATH)
-    player_id, player_name = get_player_id(conn, args.player)
-    df = query_batted_balls(conn, player_id, args.start, args.end)
+    if args.partitioned:
+        conn = season_db.connect_date_range(args.start, args.end, DATA_DIR)
+    else:
+        conn = query_api.connect(DB_PATH)
+    if args.league:
+        player_id, player_name, pitcher_id = None, 'League', None
+    else:
+        player_id, batter_name = get_player_id(conn, args.player) if args.player else (None, None)
+        pitcher_id, pitcher_name = get_player_id(conn, args.pitcher) if args.pitcher else (None, None)
+        player_name = chart_subject(batter_name, pitcher_name)
+    try:
+        venue = field_geometry.find_venue(args.venue, conn)
+    except ValueError as e:
+        print(e)
+        exit(1)
+    if args.store:
+        store = batted_ball_store.current_store(DB_PATH)
+        if store is None:
+            print("No batted ball store; build it with: python scripts/mlb.py batted-ball-store --build")
+            exit(1)
+        df = batted_ball_store.query_batted_balls(store, player_id, args.start, args.end, pitcher_id)
+    else:
+        df = query_batted_balls(conn, player_id, args.start, args.end, pitcher_id)
     if args.outcome:
         df = df[df['event_type'].str.lower() == args.outcome.strip().lower()]
     conn.close()
@@ -92,64 +287,10 @@ def main():
         print(f"No batted ball data found for {player_name} between {args.start} and {args.end}.")
         exit(0)
 
-    # Transform Statcast coordinates
-    statcast_x = []
-    statcast_y = []
-    event_types = []
-    distances = []
-    for _, row in df.iterrows():
-        hc_x = row['coord_x']
-        hc_y = row['coord_y']
-        event_type = row['event_type']
-        x, y = statcast_transform(hc_x, hc_y)
-        statcast_x.append(x)
-        statcast_y.append(y)
-        event_types.append(event_type)
-        distances.append(np.sqrt(x**2 + y**2))
-
-    color_map = {
-        'home_run': 'red',
-        'single': 'green',
-        'double': 'blue',
-        'triple': 'purple',
-    }
-    colors = []
-    for etype in event_types:
-        if etype in color_map:
-            colors.append(color_map[etype])
-        elif 'out' in etype:
-            colors.append('gray')
-        else:
-            colors.append('black')
-
-    diamond_x, diamond_y, fence_x, fence_y, foul_left_x, foul_left_y, foul_right_x, foul_right_y, y_shift = get_field_shapes()
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=diamond_x, y=diamond_y, mode='lines', line=dict(color='black', width=2), showlegend=False))
-    fig.add_trace(go.Scatter(x=fence_x, y=fence_y, mode='lines', line=dict(color='black', width=2), showlegend=False))
-    fig.add_trace(go.Scatter(x=foul_left_x, y=foul_left_y, mode='lines', line=dict(color='black', width=2), showlegend=False))
-    fig.add_trace(go.Scatter(x=foul_right_x, y=foul_right_y, mode='lines', line=dict(color='black', width=2), showlegend=False))
-
-    hover_text = [f"Event: {etype}<br>x: {x:.1f} ft<br>y: {y:.1f} ft<br>Distance: {d:.1f} ft" for etype, x, y, d in zip(event_types, statcast_x, statcast_y, distances)]
-    fig.add_trace(go.Scatter(
-        x=statcast_x, y=statcast_y, mode='markers',
-        marker=dict(color=colors, size=8, line=dict(width=1, color='black')),
-        text=hover_text, hoverinfo='text', name='Batted Balls'))
-
-    margin_x = (max(statcast_x) - min(statcast_x)) * 0.1 if statcast_x else 50
-    margin_y = (max(statcast_y) - min(statcast_y)) * 0.1 if statcast_y else 50
-    xmin = min(-350, min(statcast_x) - margin_x)
-    xmax = max(350, max(statcast_x) + margin_x)
-    ymin = min(-20 + y_shift, min(statcast_y) - margin_y)
-    ymax = max(450 + y_shift, max(statcast_y) + margin_y)
-    fig.update_layout(
-        title=f'Spray Chart: {player_name} {args.start} to {args.end}',
-        xaxis=dict(title='Feet (x)', range=[xmin, xmax], scaleanchor='y', scaleratio=1),
-        yaxis=dict(title='Feet (y)', range=[ymin, ymax]),
-        width=900, height=900,
-        showlegend=False
-    )
+    fig = build_spray_figure(df, f'Spray Chart: {player_name} {args.start} to {args.end}', get_field_shapes(venue), args.mode)
 
-    output_path = args.output or f"data/{player_name.replace(' ', '_').lower()}_spray_chart_{args.start}_to_{args.end}.html"
+    file_name = re.sub(r'[\s()]+', '_', player_name).strip('_').lower()
+    output_path = args.output or f"data/{file_name}_spray_chart_{args.start}_to_{args.end}.html"
     fig.write_html(output_path)
     print(f'Interactive plot saved as {output_path}')
 
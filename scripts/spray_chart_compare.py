@@ -0,0 +1,245 @@
+"""
+Spray Chart Comparison
+Compare several hitters (or a team's batters) in one figure from a single query.
+
+Two layouts:
+  overlay  one field, one trace per player; click legend entries to toggle players
+  grid     small multiples, one field per player, points colored by outcome
+
+With --mode density (or automatically for very large comparisons) each panel is a
+binned heatmap on a shared color scale instead of raw points.
+
+Everything goes into one HTML file. plotly.js is loaded from the CDN by default, or
+written once next to the output with --plotlyjs directory, instead of being
+embedded in every chart. Past GL_POINT_THRESHOLD points in the figure, traces switch
+to WebGL (Scattergl) so large comparisons stay responsive.
+
+Usage:
+    python scripts/spray_chart_compare.py --players "Aaron Judge,Juan Soto,Shohei Ohtani" --start 2025-04-01 --end 2025-09-30
+    python scripts/spray_chart_compare.py --team NYY --start 2025-04-01 --end 2025-09-30 --layout grid --min-balls 50
+"""
+
+import argparse
+import math
+import os
+import sys
+from datetime import datetime
+
+import season_db
+import field_geometry
+import query_api
+from field_geometry import statcast_transform
+from spray_chart_by_player_and_date import DB_PATH
+from spray_chart_by_player_and_date_interactive import (
+    GL_POINT_THRESHOLD, RENDER_MODES, density_trace, event_color, field_traces, get_field_shapes, render_mode,
+)
+
+DATA_DIR = os.path.dirname(DB_PATH)
+
+PLAYER_COLORS = [
+    '#1f77b4', '#d62728', '#2ca02c', '#9467bd', '#ff7f0e',
+    '#17becf', '#8c564b', '#e377c2', '#bcbd22', '#7f7f7f',
+]
+
+# Field extent in feet, shared by every panel so they are directly comparable
+X_RANGE = [-350, 350]
+Y_RANGE = [-20, 470]
+
+
+def resolve_players(conn, names):
+    """Player names (exact, then partial match) -> [(player_id, full_name)]; unknown names are reported and skipped"""
+    players = []
+    for name in names:
+        row = query_api.find_player(conn, name)
+        if row:
+            players.append(row)
+        else:
+            print(f"Player '{name}' not found in database, skipping.")
+    return players
+
+
+def team_roster(conn, team, start_date, end_date):
+    """Batters who appeared for a team (id, abbreviation or name) in the date range, most at-bats first"""
+    row = conn.execute("""
+        SELECT team_id FROM teams
+        WHERE CAST(team_id AS TEXT) = ? OR team_abbr = ? COLLATE NOCASE OR team_name LIKE ? COLLATE NOCASE
+    """, (team, team, f"%{team}%")).fetchone()
+    if not row:
+        return []
+    return [tuple(r) for r in conn.execute("""
+        SELECT p.player_id, p.full_name
+        FROM box_scores_batting b
+        JOIN games g ON b.game_id = g.game_id
+        JOIN players p ON b.player_id = p.player_id
+        WHERE b.team_id = ? AND g.game_date BETWEEN ? AND ?
+        GROUP BY p.player_id
+        ORDER BY SUM(b.at_bats) DESC
+    """, (row[0], start_date, end_date))]
+
+
+def query_batted_balls(conn, player_ids, start_date, end_date):
+    """Batted balls for all players in one query"""
+    df = query_api.batted_balls(conn, player_ids=player_ids, start=start_date, end=end_date)
+    df['x'], df['y'] = statcast_transform(df['coord_x'], df['coord_y'])
+    return df
+
+
+def scatter_class(n_points):
+    import plotly.graph_objects as go
+
+    return go.Scattergl if n_points > GL_POINT_THRESHOLD else go.Scatter
+
+
+def hover_text(df):
+    distance = (df['x'] ** 2 + df['y'] ** 2) ** 0.5
+    return [
+        f"{etype}<br>{game_date}<br>Distance: {d:.1f} ft"
+        for etype, game_date, d in zip(df['event_type'], df['game_date'], distance)
+    ]
+
+
+def build_overlay_figure(df, players, title, field):
+    """One field with a toggleable trace per player"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=field_traces(field))
+    Scatter = scatter_class(len(df))
+    by_player = dict(tuple(df.groupby('batter_id')))
+    for i, (player_id, name) in enumerate(players):
+        points = by_player.get(player_id)
+        if points is None:
+            continue
+        fig.add_trace(Scatter(
+            x=points['x'], y=points['y'], mode='markers',
+            marker=dict(color=PLAYER_COLORS[i % len(PLAYER_COLORS)], size=7, opacity=0.75,
+                        line=dict(width=0.5, color='black')),
+            name=f"{name} ({len(points)})", text=hover_text(points), hoverinfo='text+name',
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title='Feet (x)', range=X_RANGE, scaleanchor='y', scaleratio=1),
+        yaxis=dict(title='Feet (y)', range=Y_RANGE),
+        width=950, height=900,
+        legend=dict(title='Click to toggle'),
+    )
+    return fig
+
+
+def build_small_multiples(df, players, title, field, cols=3, density=False):
+    """One field per player, points colored by outcome (or binned counts when density is set)"""
+    from plotly.subplots import make_subplots
+
+    rows = math.ceil(len(players) / cols)
+    by_player = dict(tuple(df.groupby('batter_id')))
+    counts = {player_id: len(by_player.get(player_id, [])) for player_id, _ in players}
+    fig = make_subplots(
+        rows=rows, cols=cols,
+        subplot_titles=[f"{name} ({counts[player_id]})" for player_id, name in players],
+        horizontal_spacing=0.02, vertical_spacing=0.06,
+    )
+    background = field_traces(field)
+    Scatter = scatter_class(len(df))
+    for i, (player_id, name) in enumerate(players):
+        row, col = divmod(i, cols)
+        points = by_player.get(player_id)
+        if points is not None and density:
+            # Added before the field lines so they are drawn on top of it
+            heatmap = density_trace(points['x'].to_numpy(), points['y'].to_numpy(), points['event_type'])
+            heatmap.update(coloraxis='coloraxis', name=name)
+            fig.add_trace(heatmap, row=row + 1, col=col + 1)
+        for trace in background:
+            fig.add_trace(trace, row=row + 1, col=col + 1)
+        if points is not None and not density:
+            fig.add_trace(Scatter(
+                x=points['x'], y=points['y'], mode='markers',
+                marker=dict(color=[event_color(e) for e in points['event_type']], size=5,
+                            line=dict(width=0.5, color='black')),
+                name=name, text=hover_text(points), hoverinfo='text+name', showlegend=False,
+            ), row=row + 1, col=col + 1)
+    # Same scale in every panel; panel n's y axis is "y{n}"
+    for i in range(1, rows * cols + 1):
+        suffix = '' if i == 1 else str(i)
+        fig.layout[f'xaxis{suffix}'].update(range=X_RANGE, showticklabels=False, scaleanchor=f'y{suffix}', scaleratio=1)
+        fig.layout[f'yaxis{suffix}'].update(range=Y_RANGE, showticklabels=False)
+    fig.update_layout(title=title, width=320 * cols, height=340 * rows + 80)
+    if density:
+        fig.update_layout(coloraxis=dict(colorscale='YlOrRd', colorbar=dict(title='Balls')))
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare spray charts for several players in one figure.')
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument('--players', help='Comma-separated player names (case-insensitive)')
+    who.add_argument('--team', help='Team id, abbreviation or name: compare everyone who batted for it')
+    parser.add_argument('--start', required=True, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end', required=True, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--layout', choices=['overlay', 'grid'], default='overlay')
+    parser.add_argument('--cols', type=int, default=3, help='Columns in the grid layout')
+    parser.add_argument('--mode', choices=RENDER_MODES, default='auto',
+                        help='points, density (binned heatmaps, grid layout) or auto: density for very large comparisons')
+    parser.add_argument('--outcome', default=None, help='Filter by event type (e.g., home_run)')
+    parser.add_argument('--min-balls', type=int, default=1, help='Leave out players with fewer batted balls')
+    parser.add_argument('--plotlyjs', choices=['cdn', 'directory', 'inline'], default='cdn',
+                        help="How to include plotly.js: CDN link, one shared plotly.min.js next to the output, or embedded")
+    parser.add_argument('--output', default=None, help='Output HTML file (optional)')
+    parser.add_argument('--partitioned', action='store_true', help='Read from the per-season databases (data/mlb_<season>.db)')
+    parser.add_argument('--venue', default=None, help='Draw this park (venue_id or name, e.g. "Fenway"); default generic field')
+    args = parser.parse_args()
+
+    try:
+        datetime.strptime(args.start, '%Y-%m-%d')
+        datetime.strptime(args.end, '%Y-%m-%d')
+    except ValueError:
+        print('Invalid date format. Use YYYY-MM-DD.')
+        sys.exit(1)
+
+    if args.partitioned:
+        conn = season_db.connect_date_range(args.start, args.end, DATA_DIR)
+    else:
+        conn = query_api.connect(DB_PATH)
+    if args.players:
+        players = resolve_players(conn, [name.strip() for name in args.players.split(',') if name.strip()])
+        label = ', '.join(name for _, name in players)
+    else:
+        players = team_roster(conn, args.team, args.start, args.end)
+        label = args.team
+    if not players:
+        print('No matching players found.')
+        sys.exit(1)
+    try:
+        venue = field_geometry.find_venue(args.venue, conn)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    df = query_batted_balls(conn, [player_id for player_id, _ in players], args.start, args.end)
+    conn.close()
+    if args.outcome:
+        df = df[df['event_type'].str.lower() == args.outcome.strip().lower()]
+    counts = df['batter_id'].value_counts()
+    players = [(pid, name) for pid, name in players if counts.get(pid, 0) >= args.min_balls]
+    # Players left out by --min-balls don't count toward the render mode or the total
+    df = df[df['batter_id'].isin([pid for pid, _ in players])]
+    if not players:
+        print(f"No batted ball data found between {args.start} and {args.end}.")
+        sys.exit(0)
+
+    title = f'Spray Chart Comparison: {label} {args.start} to {args.end}'
+    field = get_field_shapes(venue)
+    density = render_mode(len(df), args.mode) == 'density'
+    if density and args.layout == 'overlay':
+        print('Density mode draws one panel per player; using the grid layout.')
+    if args.layout == 'grid' or density:
+        fig = build_small_multiples(df, players, title, field, args.cols, density)
+    else:
+        fig = build_overlay_figure(df, players, title, field)
+
+    slug = (args.team or f"{len(players)}_players").replace(' ', '_').lower()
+    output_path = args.output or f"data/{slug}_spray_comparison_{args.start}_to_{args.end}.html"
+    fig.write_html(output_path, include_plotlyjs=args.plotlyjs)
+    print(f"Comparison of {len(players)} players ({len(df)} batted balls) saved as {output_path}")
+
+
+if __name__ == '__main__':
+    main()
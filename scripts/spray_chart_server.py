@@ -0,0 +1,356 @@
+"""
+Spray Chart Server
+Long-running local HTTP service that renders spray charts on request.
+
+Each CLI chart run pays for importing pandas/matplotlib/plotly, opening the
+database and drawing the field before it plots a single point. The server does
+all of that once: it keeps a warm read-only connection, a pre-rendered field
+background for PNGs and the field traces for Plotly, and caches rendered charts
+in a size-bounded LRU keyed by the query.
+
+A cached chart is reused until that batter's plays change. Every lookup checks
+PRAGMA data_version (changes whenever another connection commits); when it moves,
+each batter's count of plays with coordinates and latest play id are re-read and
+charts built from older data are rendered again, so coordinates filled in place
+(recollect_missing_batted_ball_coords.py) show up too.
+
+With --store, batted balls come from the memory-mapped store (batted_ball_store.py)
+instead of SQLite, and a batter's cached charts are reused until an update of the
+store changes that batter's records.
+
+Endpoints:
+    /spray?player=Aaron Judge&start=2025-04-01&end=2025-09-30[&outcome=home_run][&format=png|html|json][&venue=Fenway]
+    /stats   cache and request counters
+
+Usage:
+    python scripts/spray_chart_server.py --port 8050 --cache-mb 64
+    python scripts/spray_chart_server.py --store
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# matplotlib/numpy/plotly load when the service starts, not for --help
+import batted_ball_store
+import field_geometry
+from field_geometry import statcast_transform
+from spray_chart_by_player_and_date import DB_PATH, POINT_STYLE, draw_field, query_batted_balls
+from spray_chart_by_player_and_date_interactive import build_spray_figure, get_field_shapes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8050
+DEFAULT_CACHE_MB = 64
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'html': 'text/html; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+class ChartCache:
+    """LRU of rendered charts bounded by total body size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()  # key -> (body, version)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self.entries[key] = (body, version)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def summary(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class PngRenderer:
+    """
+    Matplotlib renderer that draws one park's field once.
+
+    The field is rasterised on the first draw and the pixels kept; each chart
+    restores that background and only draws the points and title on top of it.
+    The canvas is shared, so renders are serialised.
+    """
+
+    def __init__(self, venue):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.fig = Figure(figsize=(7, 7))
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        draw_field(self.ax, venue)
+        self.title = self.ax.set_title("Spray Chart:\n", fontsize=14)
+        self.fig.tight_layout()
+        self.title.set_text('')
+        # Animated artists are skipped by canvas.draw() and drawn per chart instead
+        self.points = self.ax.scatter([], [], animated=True, **POINT_STYLE)
+        self.title.set_animated(True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.lock = threading.Lock()
+
+    def render(self, df, title):
+        import numpy as np
+        from matplotlib.image import imsave
+
+        with self.lock:
+            self.canvas.restore_region(self.background)
+            self.points.set_offsets(np.column_stack(statcast_transform(df['coord_x'], df['coord_y'])))
+            self.title.set_text(title)
+            self.ax.draw_artist(self.points)
+            self.ax.draw_artist(self.title)
+            buf = io.BytesIO()
+            imsave(buf, np.asarray(self.canvas.buffer_rgba()), format='png')
+        return buf.getvalue()
+
+
+class ChartService:
+    """Warm connection, renderers and cache shared by all request threads"""
+
+    def __init__(self, db_path, cache_bytes, use_store=False):
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self.db_path = db_path
+        self.use_store = use_store
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.db_lock = threading.Lock()
+        self.cache = ChartCache(cache_bytes)
+        self.renderer_lock = threading.Lock()
+        self.png_renderers = {}  # venue_id -> PngRenderer
+        self.data_version = None
+        self.batter_versions = {}
+        # Request threads update the counters concurrently
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.render_seconds = 0.0
+
+    def find_player(self, player):
+        """Player id or (partial) full name -> (player_id, full_name), None if unknown"""
+        with self.db_lock:
+            if player.isdigit():
+                return self.conn.execute(
+                    "SELECT player_id, full_name FROM players WHERE player_id = ?", (int(player),)).fetchone()
+            return (
+                self.conn.execute("SELECT player_id, full_name FROM players WHERE full_name = ? COLLATE NOCASE",
+                                  (player,)).fetchone()
+                or self.conn.execute("SELECT player_id, full_name FROM players WHERE full_name LIKE ? COLLATE NOCASE",
+                                     (f"%{player}%",)).fetchone()
+            )
+
+    def batter_version(self, player_id):
+        """(plays with coordinates, latest play id) for a batter, re-read only after the database changes"""
+        with self.db_lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self.data_version:
+                self.data_version = data_version
+                self.batter_versions.clear()
+            version = self.batter_versions.get(player_id)
+            if version is None:
+                version = self.conn.execute(
+                    "SELECT COUNT(coord_x), MAX(id) FROM play_by_play WHERE batter_id = ?", (player_id,)).fetchone()
+                self.batter_versions[player_id] = version
+            return version
+
+    def find_venue(self, venue):
+        with self.db_lock:
+            return field_geometry.find_venue(venue, self.conn)
+
+    def png_renderer(self, venue):
+        """One renderer (and pre-drawn background) per park, created on first use"""
+        with self.renderer_lock:
+            renderer = self.png_renderers.get(venue.venue_id)
+            if renderer is None:
+                renderer = self.png_renderers[venue.venue_id] = PngRenderer(venue)
+            return renderer
+
+    def render(self, fmt, df, player_name, start, end, venue):
+        if fmt == 'png':
+            return self.png_renderer(venue).render(df, f"Spray Chart: {player_name}\n{start} to {end}")
+        if fmt == 'html':
+            # Park geometry is cached in field_geometry, so this is just slicing
+            fig = build_spray_figure(df, f'Spray Chart: {player_name} {start} to {end}', get_field_shapes(venue))
+            return fig.to_html(include_plotlyjs='cdn').encode('utf-8')
+        x, y = statcast_transform(df['coord_x'].to_numpy(), df['coord_y'].to_numpy())
+        return json.dumps({
+            'player': player_name,
+            'start': start,
+            'end': end,
+            'count': len(df),
+            'points': [
+                {'x': round(float(px), 1), 'y': round(float(py), 1), 'event_type': event,
+                 'distance': round(math.hypot(px, py), 1), 'game_date': game_date}
+                for px, py, event, game_date in zip(x, y, df['event_type'], df['game_date'])
+            ],
+        }).encode('utf-8')
+
+    def spray(self, player_id, player_name, start, end, outcome, fmt, venue):
+        """Rendered chart bytes, from the cache when the batter's plays haven't changed"""
+        with self.stats_lock:
+            self.requests += 1
+        key = (player_id, start, end, outcome, fmt, venue.venue_id)
+        # The store is remapped when an update switches generations
+        store = batted_ball_store.current_store(self.db_path) if self.use_store else None
+        if store is not None:
+            version = ('store', store.batter_generation(player_id))
+        else:
+            version = self.batter_version(player_id)
+        body = self.cache.get(key, version)
+        if body is not None:
+            return body
+
+        t0 = time.perf_counter()
+        if store is not None:
+            df = batted_ball_store.query_batted_balls(store, player_id, start, end)
+        else:
+            with self.db_lock:
+                df = query_batted_balls(self.conn, player_id, start, end)
+        if outcome:
+            df = df[df['event_type'].str.lower() == outcome]
+        body = self.render(fmt, df, player_name, start, end, venue)
+        with self.stats_lock:
+            self.render_seconds += time.perf_counter() - t0
+        self.cache.put(key, version, body)
+        return body
+
+    def summary(self):
+        with self.stats_lock:
+            requests, render_seconds = self.requests, self.render_seconds
+        return {'requests': requests, 'render_seconds': round(render_seconds, 3), 'cache': self.cache.summary()}
+
+
+class ChartServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Default listen backlog of 5 drops connections under concurrent dashboard load
+    request_queue_size = 128
+
+
+class ChartRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    service = None
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_body(status, json.dumps({'error': message}).encode('utf-8'), CONTENT_TYPES['json'])
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            self.send_body(200, json.dumps(self.service.summary()).encode('utf-8'), CONTENT_TYPES['json'])
+        elif url.path == '/spray':
+            self.handle_spray({k: v[0] for k, v in parse_qs(url.query).items()})
+        else:
+            self.send_error_json(404, f"Unknown path {url.path}")
+
+    def handle_spray(self, params):
+        player = params.get('player', '').strip()
+        start = params.get('start', '')
+        end = params.get('end', '')
+        fmt = params.get('format', 'png').lower()
+        outcome = params.get('outcome', '').strip().lower() or None
+        if not player:
+            return self.send_error_json(400, "player is required")
+        if fmt not in CONTENT_TYPES:
+            return self.send_error_json(400, f"format must be one of {', '.join(CONTENT_TYPES)}")
+        try:
+            datetime.strptime(start, '%Y-%m-%d')
+            datetime.strptime(end, '%Y-%m-%d')
+        except ValueError:
+            return self.send_error_json(400, "start and end must be YYYY-MM-DD")
+
+        match = self.service.find_player(player)
+        if match is None:
+            return self.send_error_json(404, f"Player '{player}' not found in database")
+        player_id, player_name = match
+        try:
+            venue = self.service.find_venue(params.get('venue') or None)
+        except ValueError as e:
+            return self.send_error_json(400, str(e))
+        try:
+            body = self.service.spray(player_id, player_name, start, end, outcome, fmt, venue)
+        except Exception as e:
+            logger.exception("Error rendering %s chart for %s", fmt, player_name)
+            return self.send_error_json(500, str(e))
+        self.send_body(200, body, CONTENT_TYPES[fmt])
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve spray charts over HTTP with a rendered-chart cache')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_MB, help='Rendered chart cache size in MB')
+    parser.add_argument('--store', action='store_true',
+                        help='Read batted balls from the memory-mapped store (scripts/batted_ball_store.py)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.store:
+        store = batted_ball_store.current_store(args.db)
+        if store is None:
+            parser.error(f"no batted ball store at {batted_ball_store.store_dir(args.db)}; "
+                         "build it with: python scripts/mlb.py batted-ball-store --build")
+        logger.info(f"Mapped batted ball store generation {store.generation} ({len(store.rows):,} batted balls)")
+    ChartRequestHandler.service = ChartService(args.db, int(args.cache_mb * 1024 * 1024), args.store)
+    server = ChartServer((args.host, args.port), ChartRequestHandler)
+    logger.info(f"Serving spray charts on http://{args.host}:{args.port}/spray (cache {args.cache_mb:g} MB)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
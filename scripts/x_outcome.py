@@ -0,0 +1,350 @@
+"""
+Expected Outcome Model (xBA / xSLG)
+Outcome probabilities for every batted ball from launch speed and launch angle.
+
+train() fits a RandomForestClassifier (scikit-learn, as in the analysis notebook)
+on batted balls read straight into NumPy columns from play_by_play, and pickles it
+with its version, training rows, holdout metrics and the play_by_play ids of the
+holdout rows to data/models/x_outcome_v<N>.pkl.
+The highest version is the current model.
+
+score_all() batch-scores batted balls that have no x_outcome row (or were scored by
+an older model with --rescore) in chunks; each row holds the outcome probabilities
+and
+    xBA  = P(single) + P(double) + P(triple) + P(home run)
+    xSLG = P(single) + 2 P(double) + 3 P(triple) + 4 P(home run)
+game_feed.write_game scores each game as it is written: with the lookup grid
+(x_outcome_grid.py) when one is built, otherwise with the latest model.
+expected_stats(model, launch_speed, launch_angle) scores arrays directly
+(e.g. hover text for points that aren't stored).
+
+scikit-learn is only needed to train and score, not to read x_outcome.
+
+Usage:
+    python x_outcome.py --train                 # fit a new model version and score everything with it
+    python x_outcome.py                         # score batted balls not scored yet
+    python x_outcome.py --rescore               # rescore rows from older model versions
+    python x_outcome.py --benchmark             # training and scoring throughput
+"""
+
+import argparse
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from classify_batted_balls import HIT_EVENTS, IN_PLAY_EVENTS
+
+
+DB_PATH = "../data/mlb_data.db"
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'models')
+BATCH_SIZE = 50_000
+
+FEATURES = ['launch_speed', 'launch_angle']
+# Class index = bases reached (0 = out, errors and fielder's choices included)
+CLASSES = ['out', 'single', 'double', 'triple', 'home_run']
+PROB_COLUMNS = [f'p_{c}' for c in CLASSES]
+COLUMNS = ['play_row_id', 'game_id', 'model_version'] + PROB_COLUMNS + ['xba', 'xslg']
+
+MODEL_PARAMS = {'n_estimators': 100, 'min_samples_leaf': 50, 'n_jobs': -1, 'random_state': 42}
+HOLDOUT_FRACTION = 0.2
+
+X_OUTCOME_SCHEMA = [
+    f"""
+    CREATE TABLE IF NOT EXISTS x_outcome (
+        play_row_id INTEGER PRIMARY KEY,
+        game_id INTEGER NOT NULL,
+        model_version INTEGER NOT NULL,
+        {', '.join(f'{c} REAL NOT NULL' for c in PROB_COLUMNS)},
+        xba REAL NOT NULL,
+        xslg REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_xo_game ON x_outcome(game_id)",
+]
+
+SELECT_SQL = f"""
+    SELECT pbp.id, pbp.game_id, pbp.launch_speed, pbp.launch_angle, pbp.event_type
+    FROM play_by_play pbp
+    WHERE pbp.launch_speed IS NOT NULL AND pbp.launch_angle IS NOT NULL
+      AND pbp.event_type IN ({', '.join(repr(e) for e in sorted(IN_PLAY_EVENTS))})
+"""
+
+INSERT_SQL = f"""
+    INSERT OR REPLACE INTO x_outcome ({', '.join(COLUMNS)})
+    VALUES ({', '.join(['?'] * len(COLUMNS))})
+"""
+
+# Model loaded for ingest scoring, per process: (path, model dict)
+_current = None
+
+
+def ensure_schema(cursor):
+    """Create x_outcome if needed (plain statements, safe inside a transaction)"""
+    for statement in X_OUTCOME_SCHEMA:
+        cursor.execute(statement)
+
+
+def model_versions(model_dir=MODEL_DIR):
+    """{version: path} for the saved models"""
+    if not os.path.isdir(model_dir):
+        return {}
+    versions = {}
+    for name in os.listdir(model_dir):
+        match = re.fullmatch(r'x_outcome_v(\d+)\.pkl', name)
+        if match:
+            versions[int(match.group(1))] = os.path.join(model_dir, name)
+    return versions
+
+
+def load_model(version=None, model_dir=MODEL_DIR):
+    """A saved model dict (the latest version by default), or None if there is none"""
+    versions = model_versions(model_dir)
+    if not versions:
+        return None
+    with open(versions[version or max(versions)], 'rb') as f:
+        return pickle.load(f)
+
+
+def current_model(model_dir=MODEL_DIR):
+    """The latest model, loaded once per process and reloaded when a newer version is saved"""
+    global _current
+    versions = model_versions(model_dir)
+    if not versions:
+        return None
+    path = versions[max(versions)]
+    if _current is None or _current[0] != path:
+        with open(path, 'rb') as f:
+            _current = (path, pickle.load(f))
+    return _current[1]
+
+
+def load_training_data(conn, with_ids=False):
+    """
+    Batted balls as NumPy columns: features (n x 2 float32) and class labels (n int8),
+    preceded by their play_by_play ids (n int64) with with_ids
+    """
+    import numpy as np
+
+    rows = conn.execute(SELECT_SQL).fetchall()
+    if not rows:
+        ids, X, y = np.zeros(0, dtype=np.int64), np.zeros((0, len(FEATURES)), dtype=np.float32), np.zeros(0, dtype=np.int8)
+    else:
+        row_ids, _, speed, angle, events = zip(*rows)
+        ids = np.asarray(row_ids, dtype=np.int64)
+        X = np.column_stack([np.asarray(speed, dtype=np.float32), np.asarray(angle, dtype=np.float32)])
+        y = np.fromiter((HIT_EVENTS.get(e, 0) for e in events), dtype=np.int8, count=len(events))
+    return (ids, X, y) if with_ids else (X, y)
+
+
+def train(conn, model_dir=MODEL_DIR, params=None):
+    """Fit and save a new model version; returns the saved model dict"""
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, log_loss
+
+    ids, X, y = load_training_data(conn, with_ids=True)
+    if len(y) == 0:
+        raise ValueError("No batted balls with launch speed and angle to train on")
+    rng = np.random.default_rng(42)
+    holdout = rng.random(len(y)) < HOLDOUT_FRACTION
+    params = {**MODEL_PARAMS, **(params or {})}
+
+    t0 = time.perf_counter()
+    clf = RandomForestClassifier(**params).fit(X[~holdout], y[~holdout])
+    train_seconds = time.perf_counter() - t0
+
+    metrics = {}
+    if holdout.any():
+        proba = _full_proba(clf, X[holdout])
+        metrics = {
+            'holdout_rows': int(holdout.sum()),
+            'accuracy': float(accuracy_score(y[holdout], proba.argmax(axis=1))),
+            'log_loss': float(log_loss(y[holdout], proba, labels=range(len(CLASSES)))),
+        }
+
+    versions = model_versions(model_dir)
+    version = max(versions, default=0) + 1
+    model = {
+        'version': version,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'features': FEATURES,
+        'classes': CLASSES,
+        'params': params,
+        'training_rows': int((~holdout).sum()),
+        'train_seconds': train_seconds,
+        'metrics': metrics,
+        # So other scorers can be compared on rows the model never saw (x_outcome_grid.py --compare)
+        'holdout_ids': np.sort(ids[holdout]),
+        'estimator': clf,
+    }
+    os.makedirs(model_dir, exist_ok=True)
+    with open(os.path.join(model_dir, f'x_outcome_v{version}.pkl'), 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return model
+
+
+def _full_proba(clf, X):
+    """predict_proba with a column for every class, even ones missing from the training data"""
+    import numpy as np
+
+    proba = np.zeros((len(X), len(CLASSES)))
+    if len(X):
+        proba[:, clf.classes_] = clf.predict_proba(X)
+    return proba
+
+
+def expected_stats(model, launch_speed, launch_angle):
+    """Vectorized scoring: (probabilities n x 5, xba, xslg) for arrays of launch speed and angle"""
+    import numpy as np
+
+    X = np.column_stack([np.asarray(launch_speed, dtype=np.float32), np.asarray(launch_angle, dtype=np.float32)])
+    proba = _full_proba(model['estimator'], X)
+    xba = proba[:, 1:].sum(axis=1)
+    xslg = proba @ np.arange(len(CLASSES))
+    return proba, xba, xslg
+
+
+def score_rows(model, rows):
+    """x_outcome tuples (COLUMNS order) for (id, game_id, launch_speed, launch_angle, event_type) rows"""
+    if not rows:
+        return []
+    ids, game_ids, speed, angle, _ = zip(*rows)
+    proba, xba, xslg = expected_stats(model, speed, angle)
+    version = model['version']
+    return [
+        (play_id, game_id, version, *(round(float(p), 4) for p in probs), round(float(a), 4), round(float(s), 4))
+        for play_id, game_id, probs, a, s in zip(ids, game_ids, proba, xba, xslg)
+    ]
+
+
+def score_game(cursor, game_id):
+    """
+    Score one game's batted balls in the caller's transaction (used at ingest).
+    Uses the lookup grid if one is built, else the latest model; no-op with neither.
+    """
+    import x_outcome_grid
+
+    ensure_schema(cursor)
+    grid = x_outcome_grid.current_grid()
+    model = None
+    if grid is None:
+        try:
+            model = current_model()
+        except ImportError:
+            return 0  # a model exists but scikit-learn isn't installed here
+        if model is None:
+            return 0
+    rows = cursor.execute(SELECT_SQL + " AND pbp.game_id = ?", (game_id,)).fetchall()
+    scored = x_outcome_grid.score_rows(grid, rows) if grid is not None else score_rows(model, rows)
+    cursor.executemany(INSERT_SQL, scored)
+    return len(scored)
+
+
+def delete_game(cursor, game_id):
+    """Drop a game's scores before its plays are replaced"""
+    ensure_schema(cursor)
+    cursor.execute("DELETE FROM x_outcome WHERE game_id = ?", (game_id,))
+
+
+def score_all(conn, model, rescore=False, batch_size=BATCH_SIZE):
+    """Score batted balls without an x_outcome row (and, with rescore, rows from other model versions)"""
+    cursor = conn.cursor()
+    ensure_schema(cursor)
+    missing = "NOT EXISTS (SELECT 1 FROM x_outcome xo WHERE xo.play_row_id = pbp.id)"
+    if rescore:
+        missing = f"""NOT EXISTS (SELECT 1 FROM x_outcome xo WHERE xo.play_row_id = pbp.id
+                                  AND xo.model_version = {int(model['version'])})"""
+    sql = SELECT_SQL + f" AND {missing} AND pbp.id > ? ORDER BY pbp.id LIMIT ?"
+    total = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(sql, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        scored = score_rows(model, rows)
+        with conn:
+            conn.executemany(INSERT_SQL, scored)
+        total += len(scored)
+        last_id = rows[-1][0]
+        print(f"  scored {total:,} batted balls", end='\r')
+    print()
+    return total
+
+
+def benchmark(conn, repeats=3):
+    """Print training and scoring throughput on the database's batted balls"""
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+
+    t0 = time.perf_counter()
+    X, y = load_training_data(conn)
+    load_seconds = time.perf_counter() - t0
+    print(f"Loaded {len(y):,} batted balls in {load_seconds:.2f}s ({len(y) / max(load_seconds, 1e-9):,.0f} rows/s)")
+    if len(y) == 0:
+        return
+
+    t0 = time.perf_counter()
+    clf = RandomForestClassifier(**MODEL_PARAMS).fit(X, y)
+    train_seconds = time.perf_counter() - t0
+    print(f"Training: {train_seconds:.2f}s ({len(y) / train_seconds:,.0f} rows/s)")
+
+    model = {'version': 0, 'estimator': clf}
+    for size in sorted({1, 100, 10_000, len(y)}):
+        sample = X[np.arange(size) % len(X)]
+        best = float('inf')
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            expected_stats(model, sample[:, 0], sample[:, 1])
+            best = min(best, time.perf_counter() - t0)
+        print(f"Scoring batch of {size:>9,}: {best * 1000:9.2f} ms ({size / best:>12,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Expected outcome (xBA/xSLG) model for batted balls')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='Where model versions are saved')
+    parser.add_argument('--train', action='store_true', help='Fit a new model version, then rescore with it')
+    parser.add_argument('--rescore', action='store_true', help='Rescore rows scored by older model versions')
+    parser.add_argument('--benchmark', action='store_true', help='Measure training and scoring throughput')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    try:
+        import sklearn  # noqa: F401
+    except ImportError:
+        print('scikit-learn is required to train and score: pip install scikit-learn')
+        sys.exit(1)
+
+    if args.benchmark:
+        benchmark(conn)
+        conn.close()
+        return
+
+    if args.train:
+        try:
+            model = train(conn, args.model_dir)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        print(f"Trained model v{model['version']} on {model['training_rows']:,} batted balls "
+              f"in {model['train_seconds']:.1f}s")
+        for name, value in model['metrics'].items():
+            print(f"  {name}: {value:,.4f}" if isinstance(value, float) else f"  {name}: {value:,}")
+    else:
+        model = load_model(model_dir=args.model_dir)
+        if model is None:
+            print('No model yet; run x_outcome.py --train first.')
+            sys.exit(1)
+
+    t0 = time.perf_counter()
+    total = score_all(conn, model, rescore=args.train or args.rescore)
+    print(f"Scored {total:,} batted balls with model v{model['version']} in {time.perf_counter() - t0:.1f}s")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
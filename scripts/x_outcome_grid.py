@@ -0,0 +1,256 @@
+"""
+Expected Outcome Lookup Grid
+A precomputed launch speed x launch angle table of outcome probabilities, so scoring
+a batted ball is one array index instead of a walk through a tree ensemble.
+
+build() bins historical batted balls from play_by_play into 1 mph x 1 degree cells,
+counts outcomes per cell, smooths the counts with a Gaussian kernel (SMOOTH_BINS
+cells) and shrinks sparse cells toward the league-wide outcome rates. The grid
+(speed bins x angle bins x 5 outcome classes, float32) is saved with np.save to
+data/models/x_outcome_grid.npy and memory-mapped when first used, so every process
+shares the same pages.
+
+When the grid exists, x_outcome.score_game (called by the collector) scores with it
+and needs no scikit-learn; those rows have model_version 0, and
+`x_outcome.py --rescore` replaces them with model scores. The interactive spray
+chart uses it for hover text on batted balls x_outcome hasn't scored.
+
+Usage:
+    python x_outcome_grid.py --build
+    python x_outcome_grid.py --compare      # accuracy and speed against the current model
+    python x_outcome_grid.py --compare --model-dir /path/to/models
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from x_outcome import CLASSES, DB_PATH, MODEL_DIR, load_model, load_training_data
+
+
+GRID_PATH = os.path.join(MODEL_DIR, 'x_outcome_grid.npy')
+GRID_VERSION = 0  # x_outcome.model_version for grid-scored rows
+
+SPEED_MIN, SPEED_MAX, SPEED_STEP = 0.0, 125.0, 1.0
+ANGLE_MIN, ANGLE_MAX, ANGLE_STEP = -90.0, 90.0, 1.0
+N_SPEED = int((SPEED_MAX - SPEED_MIN) / SPEED_STEP)
+N_ANGLE = int((ANGLE_MAX - ANGLE_MIN) / ANGLE_STEP)
+
+SMOOTH_BINS = 2.0
+# Pseudo-counts of league-wide outcome rates added to every cell
+PRIOR_WEIGHT = 5.0
+
+# Memory-mapped grid for this process: (path, mtime, array)
+_grid = None
+
+
+def cell_index(launch_speed, launch_angle):
+    """Flat (speed, angle) cell indexes for arrays of launch speed and angle (clipped to the grid)"""
+    import numpy as np
+
+    speed = np.asarray(launch_speed, dtype=np.float32)
+    angle = np.asarray(launch_angle, dtype=np.float32)
+    i = np.clip(((speed - SPEED_MIN) / SPEED_STEP).astype(np.int64), 0, N_SPEED - 1)
+    j = np.clip(((angle - ANGLE_MIN) / ANGLE_STEP).astype(np.int64), 0, N_ANGLE - 1)
+    return i * N_ANGLE + j
+
+
+def _smooth(counts, sigma):
+    """Separable Gaussian blur over the speed and angle axes of a (speed, angle, class) array"""
+    import numpy as np
+
+    radius = int(3 * sigma)
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel /= kernel.sum()
+    for axis in (0, 1):
+        counts = np.apply_along_axis(lambda v: np.convolve(v, kernel, mode='same'), axis, counts)
+    return counts
+
+
+def build_grid(X, y, sigma=SMOOTH_BINS, prior_weight=PRIOR_WEIGHT):
+    """Smoothed outcome probabilities per cell from features X (speed, angle) and class labels y"""
+    import numpy as np
+
+    counts = np.zeros((N_SPEED * N_ANGLE, len(CLASSES)))
+    np.add.at(counts, (cell_index(X[:, 0], X[:, 1]), y), 1)
+    counts = counts.reshape(N_SPEED, N_ANGLE, len(CLASSES))
+    if sigma > 0:
+        counts = _smooth(counts, sigma)
+    prior = np.bincount(y, minlength=len(CLASSES)) / len(y)
+    counts += prior_weight * prior
+    return (counts / counts.sum(axis=2, keepdims=True)).astype(np.float32)
+
+
+def build(conn, path=GRID_PATH):
+    """Build the grid from every batted ball in play_by_play and save it; returns the number of rows used"""
+    import numpy as np
+
+    X, y = load_training_data(conn)
+    if len(y) == 0:
+        raise ValueError("No batted balls with launch speed and angle to build the grid from")
+    grid = build_grid(X, y)
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temp file and rename it over the old grid: truncating the file other
+    # processes have memory-mapped (current_grid) would crash them with SIGBUS
+    tmp = os.path.join(directory, f".x_outcome_grid.{os.getpid()}.tmp.npy")
+    np.save(tmp, grid)
+    os.replace(tmp, path)
+    meta_path = os.path.splitext(path)[0] + '.json'
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': int(len(y)),
+            'speed': [SPEED_MIN, SPEED_MAX, SPEED_STEP],
+            'angle': [ANGLE_MIN, ANGLE_MAX, ANGLE_STEP],
+            'smooth_bins': SMOOTH_BINS,
+            'prior_weight': PRIOR_WEIGHT,
+        }, f, indent=2)
+    os.replace(tmp, meta_path)
+    return len(y)
+
+
+def current_grid(path=GRID_PATH):
+    """The saved grid memory-mapped read-only (reopened if rebuilt), or None if there is none"""
+    import numpy as np
+
+    global _grid
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _grid is None or _grid[:2] != (path, mtime):
+        grid = np.load(path, mmap_mode='r')
+        _grid = (path, mtime, grid.reshape(N_SPEED * N_ANGLE, len(CLASSES)))
+    return _grid[2]
+
+
+def expected_stats(grid, launch_speed, launch_angle):
+    """Lookup scoring: (probabilities n x 5, xba, xslg), same shape as x_outcome.expected_stats"""
+    import numpy as np
+
+    proba = np.asarray(grid[cell_index(launch_speed, launch_angle)], dtype=np.float64)
+    return proba, proba[:, 1:].sum(axis=1), proba @ np.arange(len(CLASSES))
+
+
+def lookup(grid, launch_speed, launch_angle):
+    """(xba, xslg) for a single batted ball"""
+    proba = grid[int(cell_index(launch_speed, launch_angle))]
+    xba = float(proba[1:].sum())
+    return xba, xba + float(proba[2] + 2 * proba[3] + 3 * proba[4])
+
+
+def score_rows(grid, rows):
+    """x_outcome tuples for (id, game_id, launch_speed, launch_angle, event_type) rows"""
+    if not rows:
+        return []
+    ids, game_ids, speed, angle, _ = zip(*rows)
+    proba, xba, xslg = expected_stats(grid, speed, angle)
+    return [
+        (play_id, game_id, GRID_VERSION, *(round(float(p), 4) for p in probs), round(float(a), 4), round(float(s), 4))
+        for play_id, game_id, probs, a, s in zip(ids, game_ids, proba, xba, xslg)
+    ]
+
+
+def compare(conn, grid, model_dir=MODEL_DIR):
+    """
+    Print grid vs model accuracy on the model's holdout rows, and per-event and batch
+    scoring speed. The saved grid was built from every batted ball, so accuracy uses a
+    grid rebuilt without the holdout rows; otherwise the grid would be scored in-sample.
+    """
+    import numpy as np
+    import x_outcome
+
+    model = load_model(model_dir=model_dir)
+    ids, X, y = load_training_data(conn, with_ids=True)
+    if len(y) == 0:
+        print('No batted balls to compare on.')
+        return
+    if model is None:
+        print('No model saved; showing the grid alone, in-sample (run x_outcome.py --train to compare).')
+        eval_grid = grid
+    elif 'holdout_ids' not in model:
+        print(f"Model v{model['version']} has no saved holdout rows; comparing in-sample "
+              f"(retrain with x_outcome.py --train to compare on holdout rows).")
+        eval_grid = grid
+    else:
+        holdout = np.isin(ids, model['holdout_ids'])
+        if not holdout.any():
+            print(f"None of model v{model['version']}'s holdout rows are in this database.")
+            return
+        eval_grid = build_grid(X[~holdout], y[~holdout]).reshape(N_SPEED * N_ANGLE, len(CLASSES))
+        X, y = X[holdout], y[holdout]
+        print(f"Scoring model v{model['version']}'s holdout rows; grid rebuilt from the other "
+              f"{int((~holdout).sum()):,} batted balls.")
+    results = {'grid': expected_stats(eval_grid, X[:, 0], X[:, 1])}
+    if model is not None:
+        results[f"model v{model['version']}"] = x_outcome.expected_stats(model, X[:, 0], X[:, 1])
+
+    actual_bases = y.astype(float)
+    print(f"{len(y):,} batted balls; actual BA {np.mean(y > 0):.3f}, SLG {actual_bases.mean():.3f}")
+    print(f"{'Scorer':<12}{'log loss':>10}{'xBA':>8}{'xSLG':>8}{'batch ms':>10}{'per event us':>14}")
+    for name, (proba, xba, xslg) in results.items():
+        loss = -np.mean(np.log(np.clip(proba[np.arange(len(y)), y], 1e-12, None)))
+        if name == 'grid':
+            batch = _best_time(lambda: expected_stats(grid, X[:, 0], X[:, 1]))
+            single = _best_time(lambda: lookup(grid, X[0, 0], X[0, 1]))
+        else:
+            batch = _best_time(lambda: x_outcome.expected_stats(model, X[:, 0], X[:, 1]))
+            single = _best_time(lambda: x_outcome.expected_stats(model, X[:1, 0], X[:1, 1]))
+        print(f"{name:<12}{loss:>10.4f}{xba.mean():>8.3f}{xslg.mean():>8.3f}{batch * 1000:>10.2f}{single * 1e6:>14.1f}")
+
+    if model is not None:
+        _, grid_xba, grid_xslg = results['grid']
+        _, model_xba, model_xslg = results[f"model v{model['version']}"]
+        print(f"Grid vs model: xBA mean abs diff {np.mean(np.abs(grid_xba - model_xba)):.4f} "
+              f"(max {np.max(np.abs(grid_xba - model_xba)):.3f}), "
+              f"xSLG mean abs diff {np.mean(np.abs(grid_xslg - model_xslg)):.4f} "
+              f"(max {np.max(np.abs(grid_xslg - model_xslg)):.3f})")
+
+
+def _best_time(func, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Launch speed x angle lookup grid for expected outcomes')
+    parser.add_argument('--db', default=DB_PATH, help='Database path')
+    parser.add_argument('--grid', default=GRID_PATH, help='Grid file (.npy)')
+    parser.add_argument('--build', action='store_true', help='Build the grid from play_by_play')
+    parser.add_argument('--compare', action='store_true', help='Compare the grid with the current model')
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='Model versions to compare with (--compare)')
+    args = parser.parse_args()
+    if not (args.build or args.compare):
+        parser.error('pass --build and/or --compare')
+
+    conn = sqlite3.connect(args.db, timeout=30.0)
+    if args.build:
+        t0 = time.perf_counter()
+        try:
+            rows = build(conn, args.grid)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        print(f"Built {N_SPEED} x {N_ANGLE} grid from {rows:,} batted balls in {time.perf_counter() - t0:.1f}s -> {args.grid}")
+    if args.compare:
+        grid = current_grid(args.grid)
+        if grid is None:
+            print('No grid yet; run x_outcome_grid.py --build first.')
+            sys.exit(1)
+        compare(conn, grid, args.model_dir)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
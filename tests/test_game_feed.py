@@ -0,0 +1,74 @@
+"""Runner state carried by game_feed.parse_plays through a hand-built half inning"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import game_feed  # noqa: E402
+
+FIRST, SECOND, THIRD, RUNS = (game_feed.PLAY_COLUMNS.index(c) for c in (
+    'runner_on_first_id', 'runner_on_second_id', 'runner_on_third_id', 'runs_scored'))
+
+
+def runner(runner_id, start, end, is_out=False):
+    return {'movement': {'start': start, 'end': end, 'isOut': is_out}, 'details': {'runner': {'id': runner_id}}}
+
+
+def play(index, half, event, batter, runners, inning=1):
+    return {
+        'atBatIndex': index,
+        'about': {'inning': inning, 'halfInning': half},
+        'result': {'eventType': event},
+        'matchup': {'batter': {'id': batter}, 'pitcher': {'id': 99}},
+        'count': {'outs': 0},
+        'runners': runners,
+    }
+
+
+ALL_PLAYS = [
+    play(0, 'top', 'single', 1, [runner(1, None, '1B')]),
+    play(1, 'top', 'walk', 2, [runner(2, None, '1B'), runner(1, '1B', '2B')]),
+    # Nobody moves: the runners on 1st and 2nd aren't listed but stay on base
+    play(2, 'top', 'strikeout', 3, [runner(3, None, None, is_out=True)]),
+    # Runner 1 scores from 2nd on a single; they were last listed two plays ago
+    play(3, 'top', 'single', 4, [runner(1, '2B', 'score'), runner(2, '1B', '2B'), runner(4, None, '1B')]),
+    # Runner 2 is thrown out going to 3rd; the batter reaches on the throw
+    play(4, 'top', 'field_out', 5, [runner(2, '2B', '3B', is_out=True), runner(5, None, '1B')]),
+    # New half inning: nobody is on base
+    play(5, 'bottom', 'field_out', 6, [runner(6, None, None, is_out=True)]),
+]
+
+
+def test_parse_plays_carries_runners_through_the_half_inning():
+    rows = game_feed.parse_plays(ALL_PLAYS, game_id=1)
+    bases = [(row[FIRST], row[SECOND], row[THIRD]) for row in rows]
+    assert bases == [
+        (1, None, None),
+        (2, 1, None),
+        (2, 1, None),
+        (4, 2, None),
+        (5, None, None),
+        (None, None, None),
+    ]
+    assert [row[RUNS] for row in rows] == [0, 0, 0, 1, 0, 0]
+
+
+def test_bases_reset_between_half_innings():
+    rows = game_feed.parse_plays([
+        play(0, 'top', 'double', 1, [runner(1, None, '2B')]),
+        play(1, 'bottom', 'walk', 2, [runner(2, None, '1B')]),
+        play(2, 'top', 'single', 3, [runner(3, None, '1B')], inning=2),
+    ], game_id=1)
+    assert [(row[FIRST], row[SECOND], row[THIRD]) for row in rows] == [
+        (None, 1, None),
+        (2, None, None),
+        (3, None, None),
+    ]
+
+
+def test_advance_runners_leaves_unlisted_runners_and_counts_runs():
+    bases = {'1B': 10, '2B': 20, '3B': 30}
+    runs = game_feed.advance_runners(bases, [runner(30, '3B', 'score'), runner(20, '2B', 'score')])
+    assert runs == 2
+    assert bases == {'1B': 10, '2B': None, '3B': None}